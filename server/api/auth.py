@@ -28,6 +28,7 @@ from api.utils.dependencies import (
     verify_password,
     get_password_hash,
     decode_token,
+    token_expires_at,
 )
 from api.utils.dependencies import SECRET_KEY, ALGORITHM
 
@@ -113,7 +114,9 @@ async def logout_current_user(token: str = Depends(get_current_active_user_token
     Logout the user who is currently logged in. This invalidates the access
     token.
     """
-    await add_to_blacklist(BlacklistToken(**{"access_token": token}))
+    await add_to_blacklist(
+        BlacklistToken(access_token=token, expires_at=token_expires_at(token))
+    )
     return {"message": "Logged out."}
 
 
@@ -1,12 +1,10 @@
 from datetime import date
-from typing import Literal
+from typing import Literal, Awaitable
 
-from dateutil.relativedelta import relativedelta
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from starlette import status
 
 from api.utils.assertions import (
-    assert_model_access,
     assert_model_exists,
     assert_model_access_can_edit,
     assert_model_access_admin,
@@ -17,27 +15,30 @@ from core.dao.models import (
     add_admin_to_model,
     add_editor_to_model,
     add_viewer_to_model,
-    is_admin,
     set_name,
     create_model,
-    is_editor,
     model_exists,
     get_users_for_model,
     get_revenues_sheet,
     get_costs_sheet,
+    get_payroll,
+    sheet_projection,
     update_revenues_sheet,
     update_costs_sheet,
+    patch_sheet_rows,
     set_starting_month,
     update_model_employees,
     delete_model,
     remove_user_from_model,
     set_starting_balance,
+    set_horizon_months,
 )
 from core.exceptions import (
     DoesNotExistException,
     NoAccessException,
     CardinalityConstraintFailedException,
     BusinessLogicException,
+    RevisionConflictException,
 )
 from core.schemas.models import (
     Model,
@@ -46,18 +47,28 @@ from core.schemas.models import (
     Employee,
     Payroll,
     UpdateEmployee,
+    MAX_HORIZON_MONTHS,
 )
-from core.schemas.sheets import Sheet
+from core.schemas.sheets import Sheet, SheetValues, SheetPatch, SheetPatchResult
 from core.schemas.users import User
 from core.schemas.utils import Message, PyObjectId
-from api.utils.dependencies import get_current_active_user
+from api.utils.dependencies import get_current_active_user, ModelLoader
+from api.utils.etags import is_not_modified, not_modified, model_etag
+from api.utils.responses import ModelResponse, trusted_response
 from core.integrations.merge import (
     merge_accounting_integration_data,
     merge_payroll_integration_data,
     aggregate_payroll_info,
+    horizon_months_list,
 )
+from core.calculations.engine import evaluate_sheet, to_values
+from core.calculations.reports import get_profit_loss, get_dashboard
+from core.schemas.profit_loss import ProfitLoss, DashboardData
 
-router = APIRouter()
+router = APIRouter(default_response_class=ModelResponse)
+
+# header of write responses with the revision of the model after the write
+REVISION_HEADER = "X-Model-Revision"
 
 
 @router.get(
@@ -65,23 +76,26 @@ router = APIRouter()
     response_model=ModelMeta,
     tags=["model"],
     responses={
+        304: {"description": "Resource has not been modified."},
         403: {"description": "User does not have access to the resource."},
     },
 )
 async def retrieve_model_meta(
     model_id: str,
-    current_user: User = Depends(get_current_active_user),
+    request: Request,
+    response: Response,
+    model: dict = Depends(ModelLoader(projection={})),
 ):
     """
-    Retrieve metadata of a model.\n
+    Retrieve metadata of a model. Answers 304 if the ETag passed in If-None-Match
+    is current.\n
         model_id: Id of the model whose meta data to retrieve
     """
-
-    await assert_model_exists(model_id)
-    await assert_model_access(current_user.id, model_id)
-    model = await get_model_by_id(model_id)
-
-    return model.meta
+    meta = ModelMeta(**model["meta"])
+    etag = await model_etag(meta, "meta")
+    if is_not_modified(request, response, etag):
+        return not_modified(etag)
+    return meta
 
 
 # GET users of workspace
@@ -251,6 +265,31 @@ async def set_starting_month_of_model(
     return {"message": f"Starting month set ({starting_month})"}
 
 
+@router.post(
+    "/model/horizon",
+    response_model=Message,
+    tags=["model"],
+    responses={
+        403: {"description": "User does not have access to the resource."},
+    },
+)
+async def set_horizon_of_model(
+    model_id: str,
+    horizon_months: int = Query(ge=1, le=MAX_HORIZON_MONTHS),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Set the number of months that are calculated for a model.\n
+        model_id: Model whose horizon to change
+        horizon_months: New number of months
+    """
+    await _assert_model_exists(model_id)
+    # only editor can set horizon
+    await assert_model_access_can_edit(current_user.id, model_id)
+    await set_horizon_months(model_id, horizon_months)
+    return {"message": f"Horizon set ({horizon_months} months)"}
+
+
 @router.post(
     "/model/startingBalance",
     response_model=Message,
@@ -342,30 +381,35 @@ async def delete_existing_model(
     response_model=Sheet,
     tags=["model"],
     responses={
+        304: {"description": "Resource has not been modified."},
         400: {"description": "Model does not exist."},
         403: {"description": "User does not have access to the resource."},
     },
 )
 async def retrieve_revenues_sheet_of_model(
-    model_id: str, current_user: User = Depends(get_current_active_user)
+    model_id: str,
+    request: Request,
+    response: Response,
+    model: dict = Depends(ModelLoader(projection={})),
 ):
     """
-    Retrieve the 'Revenues' sheet of a model.\n
+    Retrieve the 'Revenues' sheet of a model. Answers 304 if the ETag passed in
+    If-None-Match is current.\n
         model_id: Model for which to retrieve the sheet
     """
-    # model must exist
-    await _assert_model_exists(model_id)
+    meta = ModelMeta(**model["meta"])
+    etag = await model_etag(meta, "Revenues", integrations=True)
+    if is_not_modified(request, response, etag):
+        return not_modified(etag)
 
-    # user must have access to model
-    await _assert_access(current_user.id, model_id)
-
-    model = await get_model_by_id(model_id)
+    # the sheet is only loaded if it has to be sent
     sheet = await get_revenues_sheet(model_id)
 
     # merge the data from the integration
-    return await merge_accounting_integration_data(
-        sheet, str(model.meta.workspace), model.meta.starting_month
+    sheet = await merge_accounting_integration_data(
+        sheet, str(meta.workspace), meta.starting_month, meta.horizon_months
     )
+    return trusted_response(sheet, response)
 
 
 @router.post(
@@ -375,33 +419,69 @@ async def retrieve_revenues_sheet_of_model(
     responses={
         400: {"description": "Model does not exist."},
         403: {"description": "User does not have access to the resource."},
+        409: {"description": "Model has been changed since the revision."},
     },
 )
 async def update_revenues_sheet_of_model(
     model_id: str,
     sheet_data: Sheet,
-    current_user: User = Depends(get_current_active_user),
+    response: Response,
+    revision: int | None = None,
+    model: dict = Depends(ModelLoader(projection={}, access="edit")),
 ):
     """
     Update the 'Revenues' sheet of a model.\n
         model_id: Model for which to update the sheet
         sheet_data: New data of the sheet
+        revision: Revision of the model the update is based on, 409 if the model
+            has been changed since. Always updates if omitted.
     """
-    await _assert_model_exists(model_id)
-    # only editor can update sheet
-    await _assert_access_can_edit(current_user.id, model_id)
-
     assert sheet_data.meta.name == "Revenues"
 
-    await update_revenues_sheet(model_id, sheet_data)
+    response.headers[REVISION_HEADER] = str(
+        await _with_revision(update_revenues_sheet(model_id, sheet_data, revision))
+    )
 
-    model = await get_model_by_id(model_id)
-    sheet = await get_revenues_sheet(model_id)
+    meta = ModelMeta(**model["meta"])
 
-    # merge the data from the integration
-    return await merge_accounting_integration_data(
-        sheet, str(model.meta.workspace), model.meta.starting_month
+    # merge the data from the integration, the sheet has been written already
+    sheet = await merge_accounting_integration_data(
+        sheet_data, str(meta.workspace), meta.starting_month, meta.horizon_months
     )
+    return trusted_response(sheet, response)
+
+
+@router.patch(
+    "/model/revenues",
+    response_model=SheetPatchResult,
+    tags=["model"],
+    responses={
+        400: {"description": "Model or row does not exist or invalid operation."},
+        403: {"description": "User does not have access to the resource."},
+        409: {"description": "Model has been changed since the revision."},
+    },
+)
+async def patch_revenues_sheet_of_model(
+    model_id: str,
+    patch: SheetPatch,
+    response: Response,
+    revision: int | None = None,
+    model: dict = Depends(
+        ModelLoader(projection=sheet_projection("Revenues"), access="edit")
+    ),
+):
+    """
+    Add, update, delete or move single rows of the 'Revenues' sheet of a model.\n
+        model_id: Model for which to update the sheet
+        patch: Row operations, applied in order
+        revision: Revision of the model the operations are based on, 409 if the
+            model has been changed since
+    Returns only the changed rows, the ids of the deleted rows and the new revision.
+    """
+    sheet = await get_revenues_sheet(model_id, model)
+    meta = ModelMeta(**model["meta"])
+    result = await _patch_sheet(model_id, meta, sheet, patch, revision)
+    return trusted_response(result, response)
 
 
 @router.get(
@@ -409,29 +489,34 @@ async def update_revenues_sheet_of_model(
     response_model=Sheet,
     tags=["model"],
     responses={
+        304: {"description": "Resource has not been modified."},
         403: {"description": "User does not have access to the resource."},
     },
 )
 async def retrieve_costs_sheet_of_model(
-    model_id: str, current_user: User = Depends(get_current_active_user)
+    model_id: str,
+    request: Request,
+    response: Response,
+    model: dict = Depends(ModelLoader(projection={})),
 ):
     """
-    Retrieve the 'Costs' sheet of a model.\n
+    Retrieve the 'Costs' sheet of a model. Answers 304 if the ETag passed in
+    If-None-Match is current.\n
         model_id: Model for which to retrieve the sheet
     """
-    # model must exist
-    await _assert_model_exists(model_id)
+    meta = ModelMeta(**model["meta"])
+    etag = await model_etag(meta, "Costs", integrations=True)
+    if is_not_modified(request, response, etag):
+        return not_modified(etag)
 
-    # user must have access to model
-    await _assert_access(current_user.id, model_id)
-
-    model = await get_model_by_id(model_id)
+    # the sheet is only loaded if it has to be sent
     sheet = await get_costs_sheet(model_id)
 
     # merge the data from the integration
-    return await merge_accounting_integration_data(
-        sheet, str(model.meta.workspace), model.meta.starting_month
+    sheet = await merge_accounting_integration_data(
+        sheet, str(meta.workspace), meta.starting_month, meta.horizon_months
     )
+    return trusted_response(sheet, response)
 
 
 @router.post(
@@ -440,35 +525,162 @@ async def retrieve_costs_sheet_of_model(
     tags=["model"],
     responses={
         403: {"description": "User does not have access to the resource."},
+        409: {"description": "Model has been changed since the revision."},
     },
 )
 async def update_costs_sheet_of_model(
     model_id: str,
     sheet_data: Sheet,
-    current_user: User = Depends(get_current_active_user),
+    response: Response,
+    revision: int | None = None,
+    model: dict = Depends(ModelLoader(projection={}, access="edit")),
 ):
     """
     Update the 'Costs' sheet of a model.\n
         model_id: Model for which to update the sheet
         sheet_data: New data of the sheet
+        revision: Revision of the model the update is based on, 409 if the model
+            has been changed since. Always updates if omitted.
     """
-    # model must exist
-    await _assert_model_exists(model_id)
-
-    # only editor can update sheet
-    await _assert_access_can_edit(current_user.id, model_id)
-
     assert sheet_data.meta.name == "Costs"
 
-    await update_costs_sheet(model_id, sheet_data)
+    response.headers[REVISION_HEADER] = str(
+        await _with_revision(update_costs_sheet(model_id, sheet_data, revision))
+    )
 
-    model = await get_model_by_id(model_id)
-    sheet = await get_costs_sheet(model_id)
+    meta = ModelMeta(**model["meta"])
 
-    # merge the data from the integration
-    return await merge_accounting_integration_data(
-        sheet, str(model.meta.workspace), model.meta.starting_month
+    # merge the data from the integration, the sheet has been written already
+    sheet = await merge_accounting_integration_data(
+        sheet_data, str(meta.workspace), meta.starting_month, meta.horizon_months
     )
+    return trusted_response(sheet, response)
+
+
+@router.patch(
+    "/model/costs",
+    response_model=SheetPatchResult,
+    tags=["model"],
+    responses={
+        400: {"description": "Model or row does not exist or invalid operation."},
+        403: {"description": "User does not have access to the resource."},
+        409: {"description": "Model has been changed since the revision."},
+    },
+)
+async def patch_costs_sheet_of_model(
+    model_id: str,
+    patch: SheetPatch,
+    response: Response,
+    revision: int | None = None,
+    model: dict = Depends(
+        ModelLoader(projection=sheet_projection("Costs"), access="edit")
+    ),
+):
+    """
+    Add, update, delete or move single rows of the 'Costs' sheet of a model.\n
+        model_id: Model for which to update the sheet
+        patch: Row operations, applied in order
+        revision: Revision of the model the operations are based on, 409 if the
+            model has been changed since
+    Returns only the changed rows, the ids of the deleted rows and the new revision.
+    """
+    sheet = await get_costs_sheet(model_id, model)
+    meta = ModelMeta(**model["meta"])
+    result = await _patch_sheet(model_id, meta, sheet, patch, revision)
+    return trusted_response(result, response)
+
+
+@router.get(
+    "/model/revenues/values",
+    response_model=SheetValues,
+    tags=["model"],
+    responses={
+        400: {"description": "Model does not exist."},
+        403: {"description": "User does not have access to the resource."},
+    },
+)
+async def calculate_revenues_sheet_values_of_model(
+    model_id: str,
+    response: Response,
+    model: dict = Depends(ModelLoader(projection=sheet_projection("Revenues"))),
+):
+    """
+    Calculate the values of all rows of the 'Revenues' sheet of a model.\n
+        model_id: Model for which to calculate the values
+    """
+    sheet = await get_revenues_sheet(model_id, model)
+    values = await _calculate_sheet_values(ModelMeta(**model["meta"]), sheet)
+    return trusted_response(values, response)
+
+
+@router.get(
+    "/model/costs/values",
+    response_model=SheetValues,
+    tags=["model"],
+    responses={
+        400: {"description": "Model does not exist."},
+        403: {"description": "User does not have access to the resource."},
+    },
+)
+async def calculate_costs_sheet_values_of_model(
+    model_id: str,
+    response: Response,
+    model: dict = Depends(ModelLoader(projection=sheet_projection("Costs"))),
+):
+    """
+    Calculate the values of all rows of the 'Costs' sheet of a model.\n
+        model_id: Model for which to calculate the values
+    """
+    sheet = await get_costs_sheet(model_id, model)
+    values = await _calculate_sheet_values(ModelMeta(**model["meta"]), sheet)
+    return trusted_response(values, response)
+
+
+@router.get(
+    "/model/pnl",
+    response_model=ProfitLoss,
+    tags=["model"],
+    responses={
+        400: {"description": "Model does not exist."},
+        403: {"description": "User does not have access to the resource."},
+    },
+)
+async def calculate_profit_loss_of_model(
+    model_id: str,
+    response: Response,
+    model: dict = Depends(ModelLoader(projection={})),
+):
+    """
+    Calculate the profit and loss statement of a model.\n
+        model_id: Model for which to calculate the statement
+    """
+    # the sheets and payroll are only loaded if the result is not cached
+    result = await get_profit_loss(model_id, ModelMeta(**model["meta"]))
+    return trusted_response(result, response)
+
+
+@router.get(
+    "/model/dashboard",
+    response_model=DashboardData,
+    tags=["model"],
+    responses={
+        400: {"description": "Model does not exist."},
+        403: {"description": "User does not have access to the resource."},
+    },
+)
+async def calculate_dashboard_of_model(
+    model_id: str,
+    response: Response,
+    model: dict = Depends(ModelLoader(projection={})),
+):
+    """
+    Calculate the dashboard time series (profit, cash balance, revenues, costs,
+    payroll costs and headcount) of a model.\n
+        model_id: Model for which to calculate the dashboard
+    """
+    # the sheets and payroll are only loaded if the result is not cached
+    result = await get_dashboard(model_id, ModelMeta(**model["meta"]))
+    return trusted_response(result, response)
 
 
 @router.get(
@@ -476,33 +688,29 @@ async def update_costs_sheet_of_model(
     response_model=Payroll,
     tags=["model"],
     responses={
+        304: {"description": "Resource has not been modified."},
         403: {"description": "User does not have access to the resource."},
     },
 )
 async def retrieve_model_payroll(
-    model_id: str, current_user: User = Depends(get_current_active_user)
+    model_id: str,
+    request: Request,
+    response: Response,
+    model: dict = Depends(ModelLoader(projection={})),
 ):
     """
-    Retrieve the payroll information of a model.\n
+    Retrieve the payroll information of a model. Answers 304 if the ETag passed in
+    If-None-Match is current.\n
         model_id: Model for which to retrieve the data
     """
-    await _assert_model_exists(model_id)
-    await _assert_access(current_user.id, model_id)
-
-    model = await get_model_by_id(model_id)
+    meta = ModelMeta(**model["meta"])
+    etag = await model_etag(meta, "payroll", integrations=True)
+    if is_not_modified(request, response, etag):
+        return not_modified(etag)
 
-    # merge the data from the integration
-    await merge_payroll_integration_data(
-        model.payroll.employees, str(model.meta.workspace), model.meta.starting_month
-    )
-
-    from_date = model.meta.starting_month
-    to_date = from_date + relativedelta(months=23)
-
-    model.payroll.payroll_values = aggregate_payroll_info(
-        model.payroll.employees, model.meta.starting_month, to_date
-    )
-    return model.payroll
+    # the payroll is only loaded if it has to be sent
+    payroll = await get_payroll(model_id)
+    return trusted_response(await _merge_payroll(meta, payroll), response)
 
 
 @router.post(
@@ -511,21 +719,23 @@ async def retrieve_model_payroll(
     tags=["model"],
     responses={
         403: {"description": "User does not have access to the resource."},
+        409: {"description": "Model has been changed since the revision."},
     },
 )
 async def update_model_payroll(
     model_id: str,
     employee_data: list[UpdateEmployee],
-    current_user: User = Depends(get_current_active_user),
+    response: Response,
+    revision: int | None = None,
+    model: dict = Depends(ModelLoader(projection={"payroll": 1}, access="edit")),
 ):
     """
     Update the payroll information of a model.\n
         model_id: Model for which to update the payroll
         employee_data: New data of the payroll employees
+        revision: Revision of the model the update is based on, 409 if the model
+            has been changed since. Always updates if omitted.
     """
-    await _assert_model_exists(model_id)
-    # only editor can update sheet
-    await _assert_access_can_edit(current_user.id, model_id)
 
     # filter out integration data
     filtered = [
@@ -534,21 +744,94 @@ async def update_model_payroll(
         if not employee.from_integration
     ]
 
-    await update_model_employees(model_id, filtered)
+    response.headers[REVISION_HEADER] = str(
+        await _with_revision(update_model_employees(model_id, filtered, revision))
+    )
+
+    payroll = await get_payroll(model_id, model)
+    payroll.employees = filtered
+    payroll = await _merge_payroll(ModelMeta(**model["meta"]), payroll)
+    return trusted_response(payroll, response)
+
 
+async def _merge_payroll(meta: ModelMeta, payroll: Payroll) -> Payroll:
     # merge the payroll data from the integration
-    model = await get_model_by_id(model_id)
     await merge_payroll_integration_data(
-        model.payroll.employees, str(model.meta.workspace), model.meta.starting_month
+        payroll.employees, str(meta.workspace), meta.starting_month
     )
 
-    from_date = model.meta.starting_month
-    to_date = from_date + relativedelta(months=23)
+    months = horizon_months_list(meta.starting_month, meta.horizon_months)
 
-    model.payroll.payroll_values = aggregate_payroll_info(
-        model.payroll.employees, from_date, to_date
+    payroll.payroll_values = aggregate_payroll_info(
+        payroll.employees, months[0], months[-1]
+    )
+    return payroll
+
+
+def _conflict(e: RevisionConflictException) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={"message": str(e), "revision": e.revision},
+    )
+
+
+async def _with_revision(write: Awaitable[int | None]) -> int | None:
+    """
+    Await a conditional write of a model and return the new revision. Conflicts are
+    answered with 409 and the current revision of the model.
+    """
+    try:
+        return await write
+    except RevisionConflictException as e:
+        raise _conflict(e)
+
+
+async def _patch_sheet(
+    model_id: str,
+    meta: ModelMeta,
+    sheet: Sheet,
+    patch: SheetPatch,
+    revision: int | None,
+) -> SheetPatchResult:
+    # the operations are resolved against the loaded sheet, which must be the state
+    # the client based them on
+    if revision is not None and revision != meta.revision:
+        raise _conflict(RevisionConflictException(meta.revision))
+
+    try:
+        result = await _with_revision(
+            patch_sheet_rows(model_id, sheet, patch.operations, meta.revision)
+        )
+    except (DoesNotExistException, BusinessLogicException) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # merge the data from the integration into the changed rows only
+    if any(row.var_type == "integration" for row in result.rows):
+        await merge_accounting_integration_data(
+            Sheet(meta=sheet.meta, assumptions=result.rows, sections=[]),
+            str(meta.workspace),
+            meta.starting_month,
+            meta.horizon_months,
+        )
+    return result
+
+
+async def _calculate_sheet_values(meta: ModelMeta, sheet: Sheet) -> SheetValues:
+    starting_month = meta.starting_month
+    horizon = meta.horizon_months
+
+    # integration rows need the integration values
+    await merge_accounting_integration_data(
+        sheet, str(meta.workspace), starting_month, horizon
+    )
+
+    values = evaluate_sheet(sheet, starting_month, horizon)
+
+    return SheetValues(
+        meta=sheet.meta,
+        dates=horizon_months_list(starting_month, horizon),
+        values={row_id: to_values(vector) for row_id, vector in values.items()},
     )
-    return model.payroll
 
 
 async def _assert_model_exists(model_id: str):
@@ -565,19 +848,3 @@ async def _assert_access(user_id: PyObjectId, model_id: str):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User does not have access to this model.",
         )
-
-
-async def _assert_access_admin(user_id: PyObjectId, model_id: str):
-    if not await is_admin(model_id, user_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User is not admin.",
-        )
-
-
-async def _assert_access_can_edit(user_id: PyObjectId, model_id: str):
-    if not await is_admin(model_id, user_id) and not await is_editor(model_id, user_id):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User cannot edit this model.",
-        )
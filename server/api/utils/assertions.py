@@ -2,7 +2,12 @@ from fastapi import HTTPException
 from starlette import status
 
 from core.dao.integrations import workspace_has_integration
-from core.dao.models import model_exists, has_access_to_model, is_admin, is_editor
+from core.dao.models import (
+    model_exists,
+    has_access_to_model,
+    is_admin,
+    get_user_role_in_model,
+)
 from core.dao.users import user_exists
 from core.dao.workspaces import (
     is_user_in_workspace,
@@ -72,7 +77,7 @@ async def assert_model_access_admin(user_id: PyObjectId, model_id: str):
 
 
 async def assert_model_access_can_edit(user_id: PyObjectId, model_id: str):
-    if not await is_admin(model_id, user_id) and not await is_editor(model_id, user_id):
+    if await get_user_role_in_model(model_id, user_id) not in ("Admin", "Editor"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User cannot edit this model.",
@@ -1,14 +1,19 @@
+from datetime import datetime, timedelta
+from typing import Literal
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from core.dao.models import get_model_document, role_in_model
 from core.dao.token_blacklist import is_token_blacklisted
 from core.oauth import OAuth2PasswordBearerURL
+from core.schemas.models import ModelRole
 from core.schemas.tokens import TokenData
 from core.schemas.users import User
 from core.settings import get_settings
-from core.dao.users import get_user_by_username
+from core.dao.users import get_cached_user_by_username
 
 settings = get_settings()
 SECRET_KEY = settings.dict()["AUTH_SECRET"]
@@ -32,6 +37,17 @@ def decode_token(token):
     return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
 
+def token_expires_at(token: str) -> datetime:
+    """
+    Expiry of a token in UTC from its exp claim, without verifying the token.
+    Falls back to the longest possible lifetime if the claim cannot be read.
+    """
+    try:
+        return datetime.utcfromtimestamp(jwt.get_unverified_claims(token)["exp"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     Get the currently logged-in user from the provided token.
@@ -58,7 +74,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = await get_user_by_username(username=token_data.username)
+    user = await get_cached_user_by_username(username=token_data.username)
     if user is None:
         raise credentials_exception
     return user
@@ -99,6 +115,54 @@ async def get_current_active_user_token(token: str = Depends(oauth2_scheme)):
     return token
 
 
+class ModelLoader:
+    """
+    Request-scoped dependency returning the raw document of the model passed as
+    `model_id` query param. The model is fetched once, restricted to the projection,
+    and the existence and role checks of the current user are done in memory.
+    """
+
+    _access: dict[str, tuple[set[ModelRole], str]] = {
+        "view": (
+            {"Admin", "Editor", "Viewer"},
+            "User does not have access to this model.",
+        ),
+        "edit": ({"Admin", "Editor"}, "User cannot edit this model."),
+        "admin": ({"Admin"}, "User is not admin."),
+    }
+
+    def __init__(
+        self,
+        projection: dict | None = None,
+        access: Literal["view", "edit", "admin"] = "view",
+    ):
+        """
+        :param projection: Fields to fetch in addition to the meta data, all if None
+        :param access: Required access level of the current user
+        """
+        self.projection = projection
+        self.roles, self.detail = self._access[access]
+
+    async def __call__(
+        self, model_id: str, current_user: User = Depends(get_current_active_user)
+    ) -> dict:
+        model = await get_model_document(model_id, self.projection)
+
+        if model is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Model does not exist.",
+            )
+
+        if role_in_model(model, current_user.id) not in self.roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=self.detail,
+            )
+
+        return model
+
+
 def verify_password(plain_password: str, hashed_password: str):
     """
     Verify a plain password vs its hash.
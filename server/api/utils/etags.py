@@ -0,0 +1,61 @@
+import hashlib
+import json
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from starlette import status
+
+from core.dao.integrations import get_integration_cache_versions
+from core.integrations.adapters.adapter import FetchAdapter
+from core.schemas.models import ModelMeta
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong entity tag over the json representation of the parts.
+    """
+    serialized = json.dumps(jsonable_encoder(parts), sort_keys=True).encode("utf-8")
+    return f'"{hashlib.sha256(serialized).hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Whether the If-None-Match header of a request matches an entity tag. Weak tags
+    are compared by their value, as required for If-None-Match.
+    """
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def is_not_modified(request: Request, response: Response, etag: str) -> bool:
+    """
+    Set the ETag of a response and return whether the client's copy is current, in
+    which case not_modified should be returned instead of the response.
+    """
+    response.headers["ETag"] = etag
+    return etag_matches(request, etag)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+async def model_etag(meta: ModelMeta, resource: str, integrations: bool = False) -> str:
+    """
+    Entity tag of a resource of a model. Changes with the revision of the model and,
+    if the resource is merged with integration data, whenever an integration cache
+    of the workspace is rebuilt.
+    :param meta: meta data of the model
+    :param resource: name of the resource, e.g. "Revenues"
+    :param integrations: whether the resource contains integration data
+    """
+    versions = {}
+    if integrations:
+        versions = await get_integration_cache_versions(
+            str(meta.workspace), FetchAdapter._cache_date(meta.starting_month)
+        )
+    return make_etag(meta.revision, resource, versions)
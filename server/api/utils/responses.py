@@ -0,0 +1,49 @@
+from functools import cache
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+@cache
+def _aliases(model: type[BaseModel]) -> tuple[tuple[str, str], ...]:
+    return tuple((name, field.alias) for name, field in model.__fields__.items())
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # shallow, orjson calls back for nested models
+        values = obj.__dict__
+        return {alias: values[name] for name, alias in _aliases(type(obj))}
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ModelResponse(ORJSONResponse):
+    """
+    JSON response rendered with orjson. Pydantic models are dumped by their aliases
+    without being validated again, dates and numpy arrays are serialized natively.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+
+
+def trusted_response(content: Any, response: Response) -> ModelResponse:
+    """
+    Send content as it is, skipping the validation against the response model of
+    the endpoint. Only for data that is known to match it, i.e. models built by the
+    endpoint or loaded from the database. Keeps the headers set on the response
+    dependency, which FastAPI ignores for returned responses.
+    """
+    return ModelResponse(
+        content, status_code=response.status_code or 200, headers=response.headers
+    )
@@ -1,7 +1,7 @@
 from datetime import timedelta, datetime
 
 import pyotp
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from starlette import status
 
 from api.utils.assertions import (
@@ -24,6 +24,8 @@ from core.dao.workspaces import (
     change_workspace_admin,
     get_users_of_workspace,
     add_user_to_workspace,
+    get_workspace_revisions_of_user,
+    get_workspace_users_version,
 )
 from core.exceptions import (
     UniqueConstraintFailedException,
@@ -33,6 +35,7 @@ from core.schemas.users import User
 from core.schemas.utils import InviteCode, PyObjectId
 from core.schemas.workspaces import Workspace, WorkspaceUser
 from api.utils.dependencies import get_current_active_user, INVITE_CODE_EXPIRES_MINUTES
+from api.utils.etags import is_not_modified, not_modified, make_etag
 
 router = APIRouter()
 
@@ -42,11 +45,20 @@ router = APIRouter()
     "/workspace",
     response_model=list[Workspace],
     tags=["workspace"],
+    responses={304: {"description": "Resource has not been modified."}},
 )
-async def get_workspace_for_user(current_user: User = Depends(get_current_active_user)):
+async def get_workspace_for_user(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
+):
     """
-    Get all workspaces for the logged-in user.
+    Get all workspaces for the logged-in user. Answers 304 if the ETag passed in
+    If-None-Match is current.
     """
+    etag = make_etag(await get_workspace_revisions_of_user(current_user.id))
+    if is_not_modified(request, response, etag):
+        return not_modified(etag)
     return await get_workspaces_of_user(current_user.id)
 
 
@@ -54,16 +66,25 @@ async def get_workspace_for_user(current_user: User = Depends(get_current_active
     "/workspace/users",
     response_model=list[WorkspaceUser],
     tags=["workspace"],
+    responses={304: {"description": "Resource has not been modified."}},
 )
 async def list_workspace_users(
-    workspace_id: PyObjectId, current_user: User = Depends(get_current_active_user)
+    workspace_id: PyObjectId,
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
 ):
     """
-    Get all users for a workspace.\n
+    Get all users for a workspace. Answers 304 if the ETag passed in If-None-Match
+    is current.\n
         :workspace_id: ID of the workspace
     """
     # user needs to be in workspace
     await assert_workspace_access(current_user.id, workspace_id)
+
+    etag = make_etag(await get_workspace_users_version(workspace_id))
+    if is_not_modified(request, response, etag):
+        return not_modified(etag)
     return await get_users_of_workspace(workspace_id)
 
 
@@ -0,0 +1,27 @@
+"""
+Timing benchmarks, run with `make benchmark`. They are kept out of the tests so
+that `make test` and CI do not run them.
+"""
+
+import time
+from typing import Callable
+
+
+def best_of(func: Callable[[], object], repeat: int = 5) -> float:
+    """
+    Fastest of several runs of a function in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def report(name: str, **timings: float):
+    """
+    Print the timings of a benchmark, shown when pytest runs with -s
+    """
+    results = ", ".join(f"{k}: {v * 1000:.2f} ms" for k, v in timings.items())
+    print(f"\n{name}: {results}")
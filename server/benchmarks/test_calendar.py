@@ -0,0 +1,93 @@
+from datetime import date, datetime
+
+from dateutil.relativedelta import relativedelta
+
+from core.calendar import parse_date
+from core.integrations.adapters.xero_adapter import XeroFetchAdapter
+from core.integrations.merge import months_list_from_date, total_salary_per_month
+from core.utils import last_of_same_month
+from benchmarks import best_of, report
+from benchmarks.test_payroll import _employees
+from tests.factory import _read_json
+
+BATCHES = 100
+
+
+def _months_list_loop(from_date: date, to_date: date) -> list[date]:
+    # previous implementation, one relativedelta step and monthrange per month
+    from_date = last_of_same_month(from_date)
+    to_date = last_of_same_month(to_date)
+    months = []
+    while from_date <= to_date:
+        months.append(from_date)
+        from_date = last_of_same_month(from_date + relativedelta(months=1))
+    return months
+
+
+def test_months_list_benchmark():
+    from_date, to_date = date(2020, 1, 1), date(2024, 12, 31)
+    assert months_list_from_date(from_date, to_date) == _months_list_loop(
+        from_date, to_date
+    )
+
+    loop = best_of(lambda: _months_list_loop(from_date, to_date))
+    numpy = best_of(lambda: months_list_from_date(from_date, to_date))
+    report("months_list_from_date, 60 months", loop=loop, numpy=numpy)
+
+    assert numpy < loop
+
+
+def test_total_salary_per_month_calendar_benchmark():
+    # months and salaries of the payroll values of a model, 100 employees
+    employees = _employees(100)
+    from_date, to_date = date(2020, 1, 1), date(2024, 12, 31)
+
+    def previous():
+        return total_salary_per_month(_months_list_loop(from_date, to_date), employees)
+
+    def calendar():
+        return total_salary_per_month(
+            months_list_from_date(from_date, to_date), employees
+        )
+
+    assert previous() == calendar()
+
+    before = best_of(previous, 20)
+    after = best_of(calendar, 20)
+    report(
+        "months and total_salary_per_month, 100 employees x 60 months",
+        before=before,
+        after=after,
+    )
+
+    assert after < before
+
+
+def test_process_batch_benchmark():
+    xfa = XeroFetchAdapter("")
+    batch = _read_json("resources/xero_profitloss.json")
+    # dates of batch headers are parsed with several formats for every batch
+    formats = ["%d %b %y", "%d %b %Y"]
+    header = [c["Value"] for c in batch["Reports"][0]["Rows"][0]["Cells"] if c["Value"]]
+    assert [parse_date(d, tuple(formats)) for d in header] == [
+        datetime.strptime(d, formats[0]).date() for d in header
+    ]
+
+    def uncached():
+        for _ in range(BATCHES):
+            parse_date.cache_clear()
+            xfa._process_batch(batch)
+
+    def cached():
+        for _ in range(BATCHES):
+            xfa._process_batch(batch)
+
+    before = best_of(uncached)
+    after = best_of(cached)
+    report(
+        f"XeroFetchAdapter._process_batch, {BATCHES} batches",
+        uncached=before,
+        memoized=after,
+    )
+
+    assert after < before
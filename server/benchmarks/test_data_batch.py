@@ -0,0 +1,109 @@
+import random
+from datetime import date, datetime, timezone
+
+import bson
+from dateutil.relativedelta import relativedelta
+
+from core.integrations.merge import process_row
+from core.schemas.cache import DataBatch, DataBatchCache
+from core.schemas.rows import Row, DateValue
+from core.utils import last_of_same_month
+from benchmarks import best_of, report
+
+MONTHS = 60
+ENDPOINTS = 200
+
+
+def _process_row_dicts(row: Row, dates: list[str], data: dict) -> Row:
+    # previous implementation, one dict lookup and date parse per value
+    _, endpoint = row.integration_name[:-1].split("[")
+    row.integration_values = [
+        DateValue(
+            date=datetime.strptime(timestamp, "%Y-%m-%d").date(),
+            value=data[endpoint][timestamp],
+        )
+        for timestamp in dates
+    ]
+    return row
+
+
+def _data(months: int, endpoints: int) -> tuple[list[str], dict]:
+    rng = random.Random(42)
+    dates = [
+        last_of_same_month(date(2020, 1, 1) + relativedelta(months=i)).isoformat()
+        for i in range(months)
+    ]
+    data = {
+        f"Endpoint {e}": {d: round(rng.uniform(-1e5, 1e5), 2) for d in dates}
+        for e in range(endpoints)
+    }
+    return dates, data
+
+
+def _rows(endpoints: int) -> list[Row]:
+    return [
+        Row(
+            name=f"Endpoint {e}",
+            val_type="number",
+            editable=False,
+            var_type="integration",
+            time_series=True,
+            starting_at=0,
+            first_value_diff=False,
+            value="",
+            integration_name=f"Xero[Endpoint {e}]",
+            value_1=None,
+            integration_values=None,
+        )
+        for e in range(endpoints)
+    ]
+
+
+def _cache_document(**fields) -> bytes:
+    cache = DataBatchCache(
+        **fields,
+        integration="Xero",
+        workspace_id="62bc5706a40e85213c27ce29",
+        created_at=datetime.now(timezone.utc),
+        from_date=0,
+    )
+    return bson.encode(cache.dict(by_alias=True))
+
+
+def test_process_row_matches_dicts():
+    dates, data = _data(24, 10)
+    data_batches = {"Xero": DataBatch.from_dict(dates, data)}
+
+    for expected, row in zip(_rows(10), _rows(10)):
+        _process_row_dicts(expected, dates, data)
+        process_row(row, data_batches)
+        assert row.integration_values == expected.integration_values
+
+
+def test_process_row_benchmark():
+    dates, data = _data(MONTHS, ENDPOINTS)
+    data_batches = {"Xero": DataBatch.from_dict(dates, data)}
+    rows = _rows(ENDPOINTS)
+
+    dicts = best_of(lambda: [_process_row_dicts(r, dates, data) for r in rows], 3)
+    columnar = best_of(lambda: [process_row(r, data_batches) for r in rows], 3)
+    report(
+        f"process_row, {ENDPOINTS} rows x {MONTHS} months", dicts=dicts, numpy=columnar
+    )
+
+    assert columnar < dicts
+
+
+def test_cache_document_size():
+    dates, data = _data(MONTHS, ENDPOINTS)
+    data_batch = DataBatch.from_dict(dates, data)
+
+    # documents written before the columnar format
+    legacy = bson.encode({"dates": dates, "data": data})
+    columnar = _cache_document(**data_batch.to_buffers())
+    print(
+        f"\ncache document, {ENDPOINTS} endpoints x {MONTHS} months: "
+        f"dicts: {len(legacy) / 1024:.0f} KiB, columnar: {len(columnar) / 1024:.0f} KiB"
+    )
+
+    assert len(columnar) < len(legacy) / 2
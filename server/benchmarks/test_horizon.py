@@ -0,0 +1,88 @@
+from datetime import date
+
+import numpy as np
+
+from core.calculations.engine import evaluate_sheet
+from core.calculations.profit_loss import calculate_profit_loss
+from core.integrations.merge import horizon_months_list, total_salary_per_month
+from core.schemas.rows import Row
+from core.schemas.sheets import Sheet, SheetMeta, Section
+from benchmarks import best_of, report
+from benchmarks.test_payroll import _employees
+
+STARTING_MONTH = date(2020, 1, 1)
+HORIZONS = (24, 36, 60)
+
+
+def _row(row_id: str, value: str, **kwargs) -> Row:
+    data = dict(
+        _id=row_id,
+        name=row_id,
+        val_type="number",
+        editable=True,
+        var_type="formula",
+        time_series=True,
+        starting_at=0,
+        first_value_diff=False,
+        value=value,
+        integration_name=None,
+        value_1=None,
+        integration_values=None,
+    )
+    data.update(kwargs)
+    return Row(**data)
+
+
+def _sheet(name: str, sections: list[str], rows_per_section: int) -> Sheet:
+    built = []
+    for s, section_name in enumerate(sections):
+        rows = []
+        for r in range(rows_per_section):
+            row_id = f"{name}{s}_{r}"
+            if r % 3 == 0:
+                # grows month over month
+                row = _row(row_id, f"${row_id} * 1.02", first_value_diff=True)
+                row.value_1 = "1000"
+            elif r % 3 == 1:
+                row = _row(row_id, f"#{rows[-1].id} * 0.5 + 10")
+            else:
+                row = _row(row_id, "250", starting_at=r % 12)
+            rows.append(row)
+        total = " + ".join(f"#{row.id}" for row in rows)
+        built.append(
+            Section(name=section_name, rows=rows, end_row=_row(f"{name}{s}", total))
+        )
+    return Sheet(meta=SheetMeta(name=name), assumptions=[], sections=built)
+
+
+def _calculate(revenues: Sheet, costs: Sheet, employees: list, horizon: int):
+    months = horizon_months_list(STARTING_MONTH, horizon)
+    salaries = total_salary_per_month(months, employees)
+    payroll = np.array([salaries[m] for m in months], dtype=float)
+    return calculate_profit_loss(revenues, costs, payroll, STARTING_MONTH, horizon)
+
+
+def test_horizon_benchmark():
+    revenues = _sheet("Revenues", ["A", "B", "C"], 20)
+    costs = _sheet(
+        "Costs", ["Cost of Goods Sold", "Operational Costs", "Other Costs"], 20
+    )
+    employees = _employees(500)
+
+    timings = {}
+    for horizon in HORIZONS:
+        timings[f"{horizon} months"] = best_of(
+            lambda: _calculate(revenues, costs, employees, horizon)
+        )
+    report("profit and loss, 120 rows and 500 employees", **timings)
+
+    # the cost grows at most linearly with the horizon, with room for noise
+    assert timings["60 months"] < timings["24 months"] * 60 / 24 * 2
+
+
+def test_evaluate_sheet_horizon():
+    revenues = _sheet("Revenues", ["A"], 6)
+
+    for horizon in HORIZONS:
+        values = evaluate_sheet(revenues, STARTING_MONTH, horizon)
+        assert all(len(v) == horizon for v in values.values())
@@ -0,0 +1,75 @@
+import random
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+from pytest import approx
+
+from core.integrations.merge import months_list_from_date, total_salary_per_month
+from core.schemas.utils import DateString
+from core.utils import (
+    first_of_same_month,
+    number_of_overlapping_days,
+    share_of_period,
+)
+from benchmarks import best_of, report
+from tests.factory import FakeEmployee
+
+
+def _total_salary_per_month_loop(months: list[date], employees: list[FakeEmployee]):
+    # previous implementation, one iteration per month and employee
+    month_salary_map = {m: 0 for m in months}
+    for eom in months:
+        som = first_of_same_month(eom)
+        for e in employees:
+            if e.end_date is None:
+                end_point = eom + relativedelta(months=1)
+            else:
+                end_point = e.end_date.to_date()
+            overlap = number_of_overlapping_days(
+                (som, eom), (e.start_date.to_date(), end_point)
+            )
+            if overlap > 0:
+                share = share_of_period(overlap, (som, eom))
+                month_salary_map[eom] += share * e.monthly_salary
+    return month_salary_map
+
+
+def _employees(count: int) -> list[FakeEmployee]:
+    rng = random.Random(42)
+    employees = []
+    for _ in range(count):
+        start = date(2019, 1, 1) + timedelta(days=rng.randrange(4 * 365))
+        end = start + timedelta(days=rng.randrange(3 * 365))
+        employees.append(
+            FakeEmployee(
+                start_date=DateString(start),
+                end_date=DateString(end) if rng.random() < 0.5 else None,
+                monthly_salary=rng.randrange(1000, 10000),
+            )
+        )
+    return employees
+
+
+def test_total_salary_per_month_matches_loop():
+    employees = _employees(200)
+    months = months_list_from_date(date(2020, 1, 1), date(2022, 12, 31))
+
+    expected = _total_salary_per_month_loop(months, employees)
+    result = total_salary_per_month(months, employees)
+
+    assert result == approx(expected)
+
+
+def test_total_salary_per_month_benchmark():
+    employees = _employees(1000)
+    months = months_list_from_date(date(2020, 1, 1), date(2022, 12, 31))
+
+    loop = best_of(lambda: _total_salary_per_month_loop(months, employees), 1)
+    vectorized = best_of(lambda: total_salary_per_month(months, employees))
+    report(
+        "total_salary_per_month, 1000 employees x 36 months",
+        loop=loop,
+        numpy=vectorized,
+    )
+
+    assert vectorized < loop
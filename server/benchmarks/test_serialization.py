@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.utils.responses import ModelResponse
+from core.integrations.merge import horizon_months_list
+from core.schemas.rows import DateValue
+from core.schemas.sheets import Sheet
+from core.schemas.utils import construct_trusted
+from benchmarks import best_of, report
+from benchmarks.test_horizon import STARTING_MONTH, _sheet
+
+SECTIONS = 10
+ROWS_PER_SECTION = 50
+MONTHS = 36
+
+
+def _document() -> dict:
+    # 500 rows, every fifth one merged with integration values
+    sheet = _sheet("Revenues", [f"S{s}" for s in range(SECTIONS)], ROWS_PER_SECTION)
+    months = horizon_months_list(STARTING_MONTH, MONTHS)
+    for section in sheet.sections:
+        for row in section.rows[::5]:
+            row.var_type = "integration"
+            row.integration_name = "Xero[Sales]"
+            row.integration_values = [
+                DateValue(date=m, value=str(1000 + i)) for i, m in enumerate(months)
+            ]
+    return jsonable_encoder(sheet)
+
+
+def _validated_response(document: dict) -> bytes:
+    # previous path: validate the document, then FastAPI validates and encodes the
+    # returned sheet against the response model before rendering it
+    sheet = Sheet(**document)
+    field = create_response_field(name="Sheet", type_=Sheet)
+    content = asyncio.run(serialize_response(field=field, response_content=sheet))
+    return JSONResponse(content).body
+
+
+def _trusted_response(document: dict) -> bytes:
+    return ModelResponse(construct_trusted(Sheet, document)).body
+
+
+def test_trusted_response_matches_validated():
+    document = _document()
+
+    assert json.loads(_trusted_response(document)) == json.loads(
+        _validated_response(document)
+    )
+
+
+def test_sheet_response_benchmark():
+    document = _document()
+
+    validated = best_of(lambda: _validated_response(document))
+    trusted = best_of(lambda: _trusted_response(document))
+    report(
+        f"GET sheet, {SECTIONS * ROWS_PER_SECTION} rows",
+        validated=validated,
+        trusted=trusted,
+    )
+
+    assert trusted < validated
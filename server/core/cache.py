@@ -0,0 +1,88 @@
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterator
+
+
+class TTLCache:
+    """
+    Bounded in-process cache. Entries expire `ttl` seconds after they were set and
+    the least recently used entry is evicted once `maxsize` entries are stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value of a key or default if it is not cached or expired.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def items(self) -> Iterator[tuple[Hashable, Any]]:
+        """
+        Iterate over the entries that have not expired yet.
+        """
+        now = time.monotonic()
+        for key, (expires, value) in list(self._data.items()):
+            if expires > now:
+                yield key, value
+
+    def __len__(self):
+        return len(self._data)
+
+
+class BloomFilter:
+    """
+    Probabilistic set of strings. Membership tests never return false negatives,
+    false positives occur at roughly `error_rate` while at most `capacity` items
+    are added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, item: str) -> list[int]:
+        # double hashing, two 64-bit halves of one digest give all positions
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(item)
+        )
@@ -0,0 +1,293 @@
+from collections import deque
+from datetime import date
+
+import numpy as np
+
+from core.calculations.formulas import Node, Reference, parse_formula
+from core.exceptions import FormulaException
+from core.logger import logger
+from core.schemas.models import HORIZON_MONTHS
+from core.schemas.rows import Row
+from core.schemas.sheets import Sheet
+
+
+class ParsedRow:
+    """
+    A row whose formulas have been parsed into syntax trees. Parsing happens once per
+    row, the trees are then evaluated for all months of the horizon at once.
+    """
+
+    def __init__(self, row: Row):
+        self.row = row
+        self.formula: Node | None = None
+        self.first_formula: Node | None = None
+        self.error: FormulaException | None = None
+
+        try:
+            self.formula = parse_formula(row.value)
+            if row.first_value_diff and row.value_1 is not None:
+                self.first_formula = parse_formula(row.value_1)
+        except FormulaException as e:
+            self.error = e
+
+    @property
+    def id(self) -> str:
+        return self.row.id
+
+    def references(self) -> list[Reference]:
+        refs = []
+        for formula in (self.formula, self.first_formula):
+            if formula is not None:
+                refs.extend(formula.references())
+        return refs
+
+    def dependencies(self) -> set[str]:
+        """
+        IDs of the rows that must be evaluated before this row
+        """
+        return {ref.row_id for ref in self.references() if not ref.internal}
+
+    def is_recursive(self) -> bool:
+        """
+        True if the formula references previous values of the row itself, in which
+        case the months must be evaluated one after another.
+        """
+        return self.formula is not None and any(
+            ref.internal for ref in self.formula.references()
+        )
+
+
+def sheet_rows(sheet: Sheet) -> list[Row]:
+    """
+    Return all rows of a sheet, i.e. the assumptions and the rows and end rows of
+    all sections
+    :param sheet: the sheet
+    :return: list of rows
+    """
+    rows = [*sheet.assumptions]
+    for section in sheet.sections:
+        rows.extend(section.rows)
+        if section.end_row is not None:
+            rows.append(section.end_row)
+    return rows
+
+
+def creation_order(parsed_rows: list[ParsedRow]) -> tuple[list[str], set[str]]:
+    """
+    Order the rows such that each row comes after all rows it references
+    (Kahn's algorithm). References to rows that are not in the list are ignored here
+    and fail during the evaluation instead.
+    :param parsed_rows: the parsed rows
+    :return: ordered row IDs, IDs of rows that are part of a circular reference
+    """
+    row_ids = [p.id for p in parsed_rows]
+    known = set(row_ids)
+
+    referenced_in: dict[str, list[str]] = {row_id: [] for row_id in row_ids}
+    in_degrees: dict[str, int] = {row_id: 0 for row_id in row_ids}
+
+    for parsed in parsed_rows:
+        for dependency in parsed.dependencies() & known:
+            referenced_in[dependency].append(parsed.id)
+            in_degrees[parsed.id] += 1
+
+    queue = deque(row_id for row_id in row_ids if in_degrees[row_id] == 0)
+    order = []
+    while queue:
+        row_id = queue.popleft()
+        order.append(row_id)
+        for dependent in referenced_in[row_id]:
+            in_degrees[dependent] -= 1
+            if in_degrees[dependent] == 0:
+                queue.append(dependent)
+
+    return order, known.difference(order)
+
+
+def evaluate_sheet(
+    sheet: Sheet, starting_month: date, horizon: int = HORIZON_MONTHS
+) -> dict[str, np.ndarray]:
+    """
+    Calculate the values of all rows of a sheet
+    :param sheet: the sheet, integration values must already be merged
+    :param starting_month: first month of the model
+    :param horizon: number of months to calculate
+    :return: dictionary mapping row IDs to the row values
+    """
+    return evaluate_rows(sheet_rows(sheet), starting_month, horizon)
+
+
+def evaluate_rows(
+    rows: list[Row], starting_month: date, horizon: int = HORIZON_MONTHS
+) -> dict[str, np.ndarray]:
+    """
+    Calculate the values of a list of rows that may reference each other. Each
+    formula is parsed once and evaluated as a vector over the whole horizon.
+    Months without a value (before starting_at, rows without time series,
+    invalid formulas or circular references) are NaN.
+    :param rows: the rows
+    :param starting_month: first month of the model
+    :param horizon: number of months to calculate
+    :return: dictionary mapping row IDs to the row values
+    """
+    parsed_rows = {row.id: ParsedRow(row) for row in rows}
+    order, circular = creation_order(list(parsed_rows.values()))
+
+    evaluator = _Evaluator(starting_month, horizon)
+
+    for row_id in circular:
+        logger.info(f"Circular reference in row {row_id}")
+        evaluator.set_invalid(row_id)
+
+    for row_id in order:
+        evaluator.evaluate(parsed_rows[row_id])
+
+    return evaluator.values
+
+
+def to_values(vector: np.ndarray) -> list[float | None]:
+    """
+    Convert a vector of row values into a JSON compatible list
+    :param vector: row values
+    :return: list of floats where NaN is replaced by None
+    """
+    return [None if np.isnan(v) else float(v) for v in vector]
+
+
+def _month_index(the_date: date, starting_month: date) -> int:
+    return (the_date.year - starting_month.year) * 12 + (
+        the_date.month - starting_month.month
+    )
+
+
+class _Evaluator:
+    """
+    Evaluates parsed rows in creation order and keeps track of the results.
+    """
+
+    def __init__(self, starting_month: date, horizon: int):
+        self.starting_month = starting_month
+        self.horizon = horizon
+        self.values: dict[str, np.ndarray] = {}
+
+        # rows without time series have a single value that other rows can reference
+        self.constants: dict[str, float] = {}
+
+    def set_invalid(self, row_id: str):
+        self.values[row_id] = np.full(self.horizon, np.nan)
+        self.constants[row_id] = np.nan
+
+    def evaluate(self, parsed: ParsedRow):
+        if parsed.error is not None:
+            logger.info(f"Cannot evaluate row {parsed.id}: {parsed.error}")
+            self.set_invalid(parsed.id)
+            return
+
+        try:
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                if parsed.row.time_series:
+                    vector = self._evaluate_time_series(parsed)
+                else:
+                    self.constants[parsed.id] = float(
+                        parsed.formula.evaluate(self._resolve_constant)
+                    )
+                    vector = np.full(self.horizon, np.nan)
+        except FormulaException as e:
+            logger.info(f"Cannot evaluate row {parsed.id}: {e}")
+            self.set_invalid(parsed.id)
+            return
+
+        vector[~np.isfinite(vector)] = np.nan
+        self.values[parsed.id] = vector
+
+    def _evaluate_time_series(self, parsed: ParsedRow) -> np.ndarray:
+        row = parsed.row
+        values = np.full(self.horizon, np.nan)
+        integration = self._integration_vector(row)
+        start = row.starting_at
+
+        if start >= self.horizon:
+            return values
+
+        # first value, from the integration if available, else from value_1
+        if row.first_value_diff:
+            if not np.isnan(integration[start]):
+                values[start] = integration[start]
+            elif parsed.first_formula is not None:
+                values[start] = parsed.first_formula.evaluate(
+                    self._scalar_resolver(values, start)
+                )
+            values[start] = np.round(values[start], row.decimal_places)
+            start += 1
+
+        if parsed.is_recursive():
+            # each month depends on the previous ones
+            for t in range(start, self.horizon):
+                if np.isnan(integration[t]):
+                    value = parsed.formula.evaluate(self._scalar_resolver(values, t))
+                else:
+                    value = integration[t]
+                values[t] = np.round(value, row.decimal_places)
+        else:
+            # all months at once
+            vector = parsed.formula.evaluate(self._resolve_vector)
+            vector = np.where(np.isnan(integration), vector, integration)
+            values[start:] = np.round(vector, row.decimal_places)[start:]
+
+        return values
+
+    def _integration_vector(self, row: Row) -> np.ndarray:
+        """
+        Align the integration values of a row to the months of the horizon
+        """
+        vector = np.full(self.horizon, np.nan)
+        if row.var_type != "integration" or row.integration_values is None:
+            return vector
+
+        for date_value in row.integration_values:
+            index = _month_index(date_value.date, self.starting_month)
+            if 0 <= index < self.horizon and date_value.value is not None:
+                vector[index] = float(date_value.value)
+        return vector
+
+    def _referenced_values(self, ref: Reference) -> np.ndarray | float:
+        if ref.row_id in self.constants:
+            return self.constants[ref.row_id]
+        if ref.row_id in self.values:
+            return self.values[ref.row_id]
+        raise FormulaException(f"Reference to unknown row {ref.row_id}")
+
+    def _resolve_constant(self, ref: Reference) -> float:
+        value = None if ref.internal else self._referenced_values(ref)
+        if not isinstance(value, float):
+            raise FormulaException("Values without time series cannot reference rows")
+        return value
+
+    def _resolve_vector(self, ref: Reference) -> np.ndarray | float:
+        if ref.internal:
+            raise FormulaException("Internal references must be evaluated per month")
+        referenced = self._referenced_values(ref)
+        if isinstance(referenced, float):
+            return referenced
+        if ref.lag == 0:
+            return referenced
+        shifted = np.full(self.horizon, np.nan)
+        if ref.lag < self.horizon:
+            shifted[ref.lag :] = referenced[: -ref.lag]
+        return shifted
+
+    def _scalar_resolver(self, values: np.ndarray, t: int):
+        """
+        Create a resolver for the values of month t, internal references point
+        to the values of the row that is currently evaluated
+        """
+
+        def resolve(ref: Reference) -> float:
+            referenced = values if ref.internal else self._referenced_values(ref)
+            if isinstance(referenced, float):
+                return referenced
+            if t - ref.lag < 0:
+                return np.nan
+            return referenced[t - ref.lag]
+
+        return resolve
@@ -0,0 +1,203 @@
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from core.exceptions import FormulaException
+
+# a value resolver returns either a scalar or a vector for a reference
+Resolver = Callable[["Reference"], float | np.ndarray]
+
+_TOKEN_PATTERN = re.compile(
+    r"\s*(?:"
+    r"(?P<number>\d+(?:\.\d*)?|\.\d+)"
+    r"|(?P<external>#\d+(?:\$\d+)?)"
+    r"|(?P<internal>\$\d+)"
+    r"|(?P<operator>[-+*/^()])"
+    r")"
+)
+
+_BINARY_OPERATIONS = {
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": np.divide,
+    "^": np.power,
+}
+
+
+class Node:
+    """
+    Node of the abstract syntax tree of a formula.
+    """
+
+    def evaluate(self, resolve: Resolver) -> float | np.ndarray:
+        raise NotImplementedError("Abstract method must be implemented by child class.")
+
+    def references(self) -> list["Reference"]:
+        return []
+
+
+@dataclass(frozen=True)
+class Number(Node):
+    value: float
+
+    def evaluate(self, resolve: Resolver) -> float | np.ndarray:
+        return self.value
+
+
+@dataclass(frozen=True)
+class Reference(Node):
+    """
+    Reference to a value of a row. Internal references ($1) point to a previous value
+    of the same row and have no row_id, external references (#id or #id$1) point to
+    another row.
+    """
+
+    row_id: str | None
+    lag: int
+
+    def evaluate(self, resolve: Resolver) -> float | np.ndarray:
+        return resolve(self)
+
+    def references(self) -> list["Reference"]:
+        return [self]
+
+    @property
+    def internal(self) -> bool:
+        return self.row_id is None
+
+
+@dataclass(frozen=True)
+class UnaryOperation(Node):
+    operator: str
+    operand: Node
+
+    def evaluate(self, resolve: Resolver) -> float | np.ndarray:
+        value = self.operand.evaluate(resolve)
+        return np.negative(value) if self.operator == "-" else value
+
+    def references(self) -> list["Reference"]:
+        return self.operand.references()
+
+
+@dataclass(frozen=True)
+class BinaryOperation(Node):
+    operator: str
+    left: Node
+    right: Node
+
+    def evaluate(self, resolve: Resolver) -> float | np.ndarray:
+        return _BINARY_OPERATIONS[self.operator](
+            self.left.evaluate(resolve), self.right.evaluate(resolve)
+        )
+
+    def references(self) -> list["Reference"]:
+        return self.left.references() + self.right.references()
+
+
+def tokenize(formula: str) -> list[tuple[str, str]]:
+    """
+    Split a formula string into (kind, text) tokens
+    :param formula: formula string, e.g. "#123$1 * 1.05 + $1"
+    :return: list of tokens
+    """
+    tokens = []
+    position = 0
+    formula = formula.rstrip()
+    while position < len(formula):
+        match = _TOKEN_PATTERN.match(formula, position)
+        if match is None or match.end() == position:
+            raise FormulaException(f"Invalid formula {formula}")
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser for the formula grammar used in the sheets:
+
+        expression := term (("+" | "-") term)*
+        term       := power (("*" | "/") power)*
+        power      := unary ("^" power)?
+        unary      := ("+" | "-") unary | primary
+        primary    := number | reference | "(" expression ")"
+    """
+
+    def __init__(self, formula: str):
+        self.formula = formula
+        self.tokens = tokenize(formula)
+        self.position = 0
+
+    def parse(self) -> Node:
+        if len(self.tokens) == 0:
+            raise FormulaException("Empty formula")
+        node = self._expression()
+        if self.position != len(self.tokens):
+            raise FormulaException(f"Invalid formula {self.formula}")
+        return node
+
+    def _peek(self) -> str | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position][1]
+
+    def _next(self) -> tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise FormulaException(f"Unexpected end of formula {self.formula}")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _expression(self) -> Node:
+        node = self._term()
+        while self._peek() in ("+", "-"):
+            operator = self._next()[1]
+            node = BinaryOperation(operator, node, self._term())
+        return node
+
+    def _term(self) -> Node:
+        node = self._power()
+        while self._peek() in ("*", "/"):
+            operator = self._next()[1]
+            node = BinaryOperation(operator, node, self._power())
+        return node
+
+    def _power(self) -> Node:
+        node = self._unary()
+        if self._peek() == "^":
+            self._next()
+            node = BinaryOperation("^", node, self._power())
+        return node
+
+    def _unary(self) -> Node:
+        if self._peek() in ("+", "-"):
+            operator = self._next()[1]
+            return UnaryOperation(operator, self._unary())
+        return self._primary()
+
+    def _primary(self) -> Node:
+        kind, text = self._next()
+        if kind == "number":
+            return Number(float(text))
+        if kind == "internal":
+            return Reference(None, int(text[1:]))
+        if kind == "external":
+            row_id, _, lag = text[1:].partition("$")
+            return Reference(row_id, int(lag) if lag else 0)
+        if text == "(":
+            node = self._expression()
+            if self._next()[1] != ")":
+                raise FormulaException(f"Unbalanced parentheses in {self.formula}")
+            return node
+        raise FormulaException(f"Unexpected token {text} in {self.formula}")
+
+
+def parse_formula(formula: str) -> Node:
+    """
+    Parse a formula string of a row into an abstract syntax tree
+    :param formula: formula string
+    :return: root node of the syntax tree
+    """
+    return _Parser(formula).parse()
@@ -0,0 +1,189 @@
+from datetime import date
+
+import numpy as np
+
+from core.calculations.engine import evaluate_sheet, to_values, HORIZON_MONTHS
+from core.schemas.models import Employee
+from core.schemas.profit_loss import (
+    ProfitLoss,
+    ProfitLossRow,
+    GrossIncome,
+    DashboardData,
+    DashboardSeriesElement,
+)
+from core.schemas.sheets import Sheet
+
+
+def calculate_profit_loss(
+    revenues: Sheet,
+    costs: Sheet,
+    payroll_costs: np.ndarray,
+    starting_month: date,
+    horizon: int = HORIZON_MONTHS,
+) -> ProfitLoss:
+    """
+    Calculate the profit and loss statement of a model. The end row of each section
+    of the revenues sheet is a revenue stream, the end rows of the sections of the
+    costs sheet are the cost of goods sold, the operating costs and other costs.
+    :param revenues: Revenues sheet, integration values must already be merged
+    :param costs: Costs sheet, integration values must already be merged
+    :param payroll_costs: Total payroll cost per month
+    :param starting_month: First month of the model
+    :param horizon: Number of months to calculate
+    :return: profit and loss statement
+    """
+    revenue_streams = _section_totals(revenues, starting_month, horizon)
+    cost_sections = _section_totals(costs, starting_month, horizon)
+
+    zeros = np.zeros(horizon)
+    cost_of_goods_sold = cost_sections[0][1] if len(cost_sections) > 0 else zeros
+    operating_cost = cost_sections[1][1] if len(cost_sections) > 1 else zeros
+    other_cost = cost_sections[2][1] if len(cost_sections) > 2 else zeros
+
+    gross_income = np.sum([values for _, values in revenue_streams], axis=0)
+    if len(revenue_streams) == 0:
+        gross_income = zeros
+
+    gross_margin = gross_income - cost_of_goods_sold
+    operating_income = gross_margin - operating_cost - payroll_costs
+    net_income = operating_income - other_cost
+
+    return ProfitLoss(
+        gross_income=GrossIncome(
+            revenue_streams=[_row(name, values) for name, values in revenue_streams],
+            total=_row("Gross Income", gross_income),
+        ),
+        cost_of_goods_sold=_row(_section_name(costs, 0), cost_of_goods_sold),
+        gross_margin=_row("Gross Margin", gross_margin),
+        payroll_cost=_row("Payroll Cost", payroll_costs),
+        operating_cost=_row(_section_name(costs, 1), operating_cost),
+        operating_income=_row("Operating Income", operating_income),
+        other_cost=_row(_section_name(costs, 2), other_cost),
+        net_income=_row("Net Income", net_income),
+    )
+
+
+def calculate_dashboard(
+    profit_loss: ProfitLoss,
+    employees: list[Employee],
+    starting_month: date,
+    starting_balance: float,
+    horizon: int = HORIZON_MONTHS,
+) -> DashboardData:
+    """
+    Calculate the dashboard time series of a model from its profit and loss statement
+    and its employees.
+    :param profit_loss: Profit and loss statement of the model
+    :param employees: Employees of the model including those from integrations
+    :param starting_month: First month of the model
+    :param starting_balance: Cash balance before the first month
+    :param horizon: Number of months to calculate
+    :return: dashboard data
+    """
+    months = month_starts(starting_month, horizon)
+    timestamps = months.astype("datetime64[ms]").astype(np.int64)
+
+    def series(name: str, values) -> DashboardSeriesElement:
+        values = to_values(np.asarray(values, dtype=float))
+        return DashboardSeriesElement(
+            name=name, data=list(zip(timestamps.tolist(), values))
+        )
+
+    def vector(row: ProfitLossRow) -> np.ndarray:
+        return np.array(row.values, dtype=float)
+
+    net_income = vector(profit_loss.net_income)
+    cash_balance = starting_balance + np.cumsum(net_income)
+
+    payroll, headcount = department_payroll(employees, months)
+
+    return DashboardData(
+        profit=[series("Profits", net_income)],
+        cash_balance=[series("Cash Balance", cash_balance)],
+        revenues=[
+            series(row.name, vector(row))
+            for row in profit_loss.gross_income.revenue_streams
+        ],
+        costs=[
+            series("Payroll Costs", vector(profit_loss.payroll_cost)),
+            series("Cost of Goods Sold", vector(profit_loss.cost_of_goods_sold)),
+            series("Operating Cost", vector(profit_loss.operating_cost)),
+            series("Other Cost", vector(profit_loss.other_cost)),
+        ],
+        payroll_costs=[series(dep, values) for dep, values in payroll.items()],
+        headcount=[series(dep, values) for dep, values in headcount.items()],
+    )
+
+
+def month_starts(starting_month: date, horizon: int = HORIZON_MONTHS) -> np.ndarray:
+    """
+    First day of each month of the horizon
+    :param starting_month: First month of the model
+    :param horizon: Number of months
+    :return: array of datetime64[D]
+    """
+    first = np.datetime64(starting_month.strftime("%Y-%m"), "M")
+    return (first + np.arange(horizon)).astype("datetime64[D]")
+
+
+def department_payroll(
+    employees: list[Employee], months: np.ndarray
+) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+    """
+    Aggregate the monthly salaries and the headcount per department. An employee
+    counts towards a month if they are employed on the first day of the month.
+    Employees without department are grouped as "Other".
+    :param employees: List of employees
+    :param months: First day of each month
+    :return: salaries per department, headcount per department
+    """
+    departments = [e.department if e.department else "Other" for e in employees]
+    department_names = list(dict.fromkeys([*departments, "Other"]))
+
+    if len(employees) == 0:
+        zeros = np.zeros(len(months))
+        return {"Other": zeros}, {"Other": zeros}
+
+    starts = np.array([e.start_date for e in employees], dtype="datetime64[D]")
+    ends = np.array(
+        [e.end_date if e.end_date else "NaT" for e in employees],
+        dtype="datetime64[D]",
+    )
+    salaries = np.array([e.monthly_salary for e in employees], dtype=float)
+
+    # employees x months matrix, true if employed on the first of the month
+    employed = (starts[:, None] <= months[None, :]) & (
+        np.isnat(ends)[:, None] | (months[None, :] <= ends[:, None])
+    )
+
+    departments = np.array(departments)
+    payroll, headcount = {}, {}
+    for name in department_names:
+        in_department = employed[departments == name]
+        payroll[name] = (in_department * salaries[departments == name, None]).sum(0)
+        headcount[name] = in_department.sum(0)
+
+    return payroll, headcount
+
+
+def _section_totals(
+    sheet: Sheet, starting_month: date, horizon: int
+) -> list[tuple[str, np.ndarray]]:
+    values = evaluate_sheet(sheet, starting_month, horizon)
+    totals = []
+    for section in sheet.sections:
+        if section.end_row is None:
+            totals.append((section.name, np.zeros(horizon)))
+        else:
+            totals.append((section.name, values[section.end_row.id]))
+    return totals
+
+
+def _section_name(sheet: Sheet, index: int) -> str:
+    if index < len(sheet.sections):
+        return sheet.sections[index].name
+    return ""
+
+
+def _row(name: str, values: np.ndarray) -> ProfitLossRow:
+    return ProfitLossRow(name=name, values=to_values(values))
@@ -0,0 +1,154 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Literal, Callable, Awaitable
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from core.calculations.profit_loss import calculate_profit_loss, calculate_dashboard
+from core.dao.calculation_cache import get_calculation_cache, set_calculation_cache
+from core.dao.integrations import get_integration_cache_versions
+from core.dao.models import get_model_by_id
+from core.exceptions import DoesNotExistException
+from core.integrations.adapters.adapter import FetchAdapter
+from core.integrations.merge import (
+    merge_accounting_integration_data,
+    merge_payroll_integration_data,
+    horizon_months_list,
+    total_salary_per_month,
+)
+from core.schemas.cache import CalculationCache
+from core.schemas.models import Model, ModelMeta, Employee
+from core.schemas.profit_loss import ProfitLoss, DashboardData
+from core.schemas.sheets import Sheet
+from core.schemas.utils import construct_trusted
+
+
+async def get_profit_loss(model_id: str, meta: ModelMeta) -> ProfitLoss:
+    """
+    Return the profit and loss statement of a model, from the cache if the model
+    and its integration data have not changed since the last calculation.
+    :param model_id: Id of the model
+    :param meta: current meta data of the model
+    :return: profit and loss statement
+    """
+
+    async def calculate(model: Model):
+        profit_loss, _ = await _calculate_profit_loss(model)
+        return profit_loss
+
+    return await _cached(model_id, meta, "profit_loss", ProfitLoss, calculate)
+
+
+async def get_dashboard(model_id: str, meta: ModelMeta) -> DashboardData:
+    """
+    Return the dashboard data of a model, from the cache if the model and its
+    integration data have not changed since the last calculation.
+    :param model_id: Id of the model
+    :param meta: current meta data of the model
+    :return: dashboard data
+    """
+
+    async def calculate(model: Model):
+        profit_loss, employees = await _calculate_profit_loss(model)
+        return calculate_dashboard(
+            profit_loss,
+            employees,
+            model.meta.starting_month,
+            model.meta.starting_balance,
+            model.meta.horizon_months,
+        )
+
+    return await _cached(model_id, meta, "dashboard", DashboardData, calculate)
+
+
+async def calculation_cache_key(model_id: str, meta: ModelMeta) -> str:
+    """
+    Cache key of a model: a hash of the model revision, which every write increments,
+    and the creation times of the integration caches that the calculations are
+    based on. Only needs the meta data of the model.
+    :param model_id: Id of the model
+    :param meta: meta data of the model
+    :return: hex digest
+    """
+    versions = await get_integration_cache_versions(
+        str(meta.workspace), FetchAdapter._cache_date(meta.starting_month)
+    )
+    content = {
+        "model": model_id,
+        "revision": meta.revision,
+        "integrations": jsonable_encoder(versions),
+        "horizon": meta.horizon_months,
+    }
+    serialized = json.dumps(content, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(serialized).hexdigest()
+
+
+async def _cached(
+    model_id: str,
+    meta: ModelMeta,
+    kind: Literal["profit_loss", "dashboard"],
+    schema: type[BaseModel],
+    calculate: Callable[[Model], Awaitable[BaseModel]],
+):
+    key = await calculation_cache_key(model_id, meta)
+
+    if cached := await get_calculation_cache(model_id, kind, key):
+        return construct_trusted(schema, cached.data)
+
+    # the sheets and the payroll are only loaded for a calculation
+    model = await get_model_by_id(model_id)
+    if model is None:
+        raise DoesNotExistException("Model does not exist")
+    if model.meta.revision != meta.revision:
+        # changed in the meantime, the result belongs to the loaded revision
+        key = await calculation_cache_key(model_id, model.meta)
+
+    result = await calculate(model)
+
+    await set_calculation_cache(
+        CalculationCache(
+            model_id=model_id,
+            kind=kind,
+            key=key,
+            created_at=datetime.now().astimezone(timezone.utc),
+            data=jsonable_encoder(result),
+        )
+    )
+    return result
+
+
+async def _calculate_profit_loss(model: Model) -> tuple[ProfitLoss, list[Employee]]:
+    workspace_id = str(model.meta.workspace)
+    starting_month = model.meta.starting_month
+
+    horizon = model.meta.horizon_months
+
+    revenues = _get_sheet(model, "Revenues")
+    costs = _get_sheet(model, "Costs")
+    await merge_accounting_integration_data(
+        revenues, workspace_id, starting_month, horizon
+    )
+    await merge_accounting_integration_data(
+        costs, workspace_id, starting_month, horizon
+    )
+
+    employees = [*model.payroll.employees]
+    await merge_payroll_integration_data(employees, workspace_id, starting_month)
+
+    months = horizon_months_list(starting_month, horizon)
+    salaries = total_salary_per_month(months, employees)
+    payroll_costs = np.array([salaries[m] for m in months], dtype=float)
+
+    profit_loss = calculate_profit_loss(
+        revenues, costs, payroll_costs, starting_month, horizon
+    )
+    return profit_loss, employees
+
+
+def _get_sheet(model: Model, sheet_name: str) -> Sheet:
+    for sheet in model.sheets:
+        if sheet.meta.name == sheet_name:
+            return sheet
@@ -0,0 +1,91 @@
+"""
+Calendar helpers for the month based calculations of models and integrations.
+Month boundaries are looked up in a table computed once, parsed date strings are
+memoized and ranges of months are generated with numpy.
+"""
+
+from calendar import monthrange
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
+
+# days since 1970-01-01 are the values of datetime64[D]
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def _month_bounds(year: int, month: int) -> tuple[date, date]:
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+# first and last day of each month by (year, month), other years are computed
+MONTHS: dict[tuple[int, int], tuple[date, date]] = {
+    (year, month): _month_bounds(year, month)
+    for year in range(1970, 2101)
+    for month in range(1, 13)
+}
+
+
+def month_bounds(year: int, month: int) -> tuple[date, date]:
+    """
+    First and last day of a month
+    """
+    if (bounds := MONTHS.get((year, month))) is not None:
+        return bounds
+    return _month_bounds(year, month)
+
+
+def first_of_month(the_date: date) -> date:
+    return month_bounds(the_date.year, the_date.month)[0]
+
+
+def last_of_month(the_date: date) -> date:
+    return month_bounds(the_date.year, the_date.month)[1]
+
+
+def days_in_month(year: int, month: int) -> int:
+    return month_bounds(year, month)[1].day
+
+
+@lru_cache(maxsize=65536)
+def parse_date(value: str, formats: tuple[str, ...] = ("%Y-%m-%d",)) -> date:
+    """
+    Parse a date string with the first matching format. Results are memoized, the
+    same dates are parsed over and over again.
+    :param value: date string
+    :param formats: formats to try, e.g. ("%d %b %y", "%d %b %Y")
+    :return: date
+    :raises ValueError: if no format matches
+    """
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+
+    raise ValueError(f"Date {value} could not be matched.")
+
+
+def to_datetime64(dates: list[date]) -> np.ndarray:
+    """
+    Convert dates to a datetime64[D] array, much faster than numpy's conversion of
+    date objects.
+    """
+    ordinals = np.fromiter((d.toordinal() for d in dates), np.int64, len(dates))
+    return (ordinals - _EPOCH).astype("datetime64[D]")
+
+
+def month_ends_array(from_date: date, to_date: date) -> np.ndarray:
+    """
+    Last days of all months from the month of from_date to the month of to_date.
+    :return: datetime64[D] array, empty if to_date is in an earlier month
+    """
+    months = np.arange(np.datetime64(from_date, "M"), np.datetime64(to_date, "M") + 1)
+    return (months + 1).astype("datetime64[D]") - 1
+
+
+def month_ends(from_date: date, to_date: date) -> list[date]:
+    """
+    Last days of all months from the month of from_date to the month of to_date.
+    """
+    return month_ends_array(from_date, to_date).tolist()
@@ -0,0 +1,42 @@
+from typing import Literal
+
+from core.dao.database import db
+from core.schemas.cache import CalculationCache
+
+
+async def get_calculation_cache(
+    model_id: str, kind: Literal["profit_loss", "dashboard"], key: str
+) -> CalculationCache | None:
+    """
+    Get a cached calculation result of a model
+    :param model_id: ID of the model
+    :param kind: Kind of the calculation
+    :param key: Cache key of the current model state
+    :return: Cached result if the key matches, else None
+    """
+    cached = await db.calculation_cache.find_one(
+        {"model_id": model_id, "kind": kind, "key": key}
+    )
+    if cached:
+        return CalculationCache(**cached)
+
+
+async def set_calculation_cache(cache_obj: CalculationCache):
+    """
+    Cache a calculation result. Only the most recent result per model and kind is
+    kept.
+    :param cache_obj: The cache object
+    """
+    return await db.calculation_cache.replace_one(
+        {"model_id": cache_obj.model_id, "kind": cache_obj.kind},
+        cache_obj.dict(),
+        upsert=True,
+    )
+
+
+async def delete_calculation_cache(model_id: str):
+    """
+    Remove all cached calculation results of a model
+    :param model_id: ID of the model
+    """
+    return await db.calculation_cache.delete_many({"model_id": str(model_id)})
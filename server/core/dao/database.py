@@ -28,6 +28,8 @@ class _DAO:
     integration_access = _db["integration_access"]
     accounting_cache = _db["accounting_cache"]
     payroll_cache = _db["payroll_cache"]
+    calculation_cache = _db["calculation_cache"]
+    integration_leases = _db["integration_leases"]
 
     @staticmethod
     def get_collection(collection):
@@ -37,5 +39,16 @@ class _DAO:
     def get_db():
         return _DAO._db
 
+    @staticmethod
+    async def with_transaction(callback):
+        """
+        Await callback(session) in a transaction, all its operations have to pass the
+        session. Retried as a whole on transient errors, e.g. write conflicts with
+        concurrent transactions. Transactions need a replica set.
+        :return: the result of the callback
+        """
+        async with await _DAO._client.start_session() as session:
+            return await session.with_transaction(callback)
+
 
 db = _DAO()
@@ -0,0 +1,115 @@
+from pymongo import IndexModel, ASCENDING
+from pymongo.errors import OperationFailure
+
+from core.dao.database import db
+from core.logger import logger
+
+# error codes of an existing index with the same name but different options
+_OPTIONS_CONFLICT = (85, 86)
+
+_CACHE_KEY = [("workspace_id", ASCENDING), ("integration", ASCENDING)]
+
+# indexes backing the queries of the DAO, by collection
+INDEXES: dict[str, list[IndexModel]] = {
+    "users": [IndexModel("username", unique=True)],
+    "workspaces": [
+        IndexModel("users"),
+        IndexModel("admin"),
+        IndexModel("name"),
+    ],
+    "models": [
+        IndexModel("meta.admins"),
+        IndexModel("meta.editors"),
+        IndexModel("meta.viewers"),
+        IndexModel("meta.workspace"),
+    ],
+    # parts of normalized models, see core/dao/model_storage.py
+    "model_rows": [
+        IndexModel(
+            [
+                ("model_id", ASCENDING),
+                ("sheet", ASCENDING),
+                ("section", ASCENDING),
+                ("position", ASCENDING),
+            ]
+        ),
+        # unique, single rows are written by their id
+        IndexModel(
+            [("model_id", ASCENDING), ("sheet", ASCENDING), ("row._id", ASCENDING)],
+            unique=True,
+        ),
+    ],
+    "model_employees": [IndexModel([("model_id", ASCENDING), ("position", ASCENDING)])],
+    "invite_codes": [IndexModel("invite_code")],
+    "token_blacklist": [
+        IndexModel("token_digest", unique=True),
+        # remove tokens once they have expired
+        IndexModel("expires_at", expireAfterSeconds=0),
+    ],
+    # unique, the DAO upserts on these keys
+    "integration_access": [IndexModel(_CACHE_KEY, unique=True)],
+    "accounting_cache": [
+        IndexModel([*_CACHE_KEY, ("from_date", ASCENDING)], unique=True)
+    ],
+    "payroll_cache": [IndexModel([*_CACHE_KEY, ("from_date", ASCENDING)], unique=True)],
+    "calculation_cache": [
+        IndexModel([("model_id", ASCENDING), ("kind", ASCENDING)], unique=True)
+    ],
+    "integration_leases": [IndexModel("expires_at", expireAfterSeconds=0)],
+}
+
+
+async def create_indexes():
+    """
+    Create the indexes of all collections. Existing indexes are left untouched, so
+    this can run on every startup, unless their options differ from the declared
+    ones, in which case they are rebuilt. Failures, e.g. duplicates preventing a
+    unique index, are logged and do not stop the remaining indexes from being
+    created.
+    """
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                try:
+                    await db.get_collection(collection).create_indexes([index])
+                except OperationFailure as e:
+                    if e.code not in _OPTIONS_CONFLICT:
+                        raise
+                    name = index.document["name"]
+                    await db.get_collection(collection).drop_index(name)
+                    await db.get_collection(collection).create_indexes([index])
+            except OperationFailure as e:
+                logger.error(
+                    f"Index {index.document['name']} on {collection} failed: {e}"
+                )
+
+
+async def index_report() -> dict[str, dict[str, list[str]]]:
+    """
+    Compare the indexes in the database to the declared ones.
+    :return: per collection the declared indexes that are missing, the indexes that
+        exist but are not declared, and the indexes that have not been used since the
+        database server started (empty if the usage statistics are not accessible)
+    """
+    report = {}
+    for collection, indexes in INDEXES.items():
+        declared = {index.document["name"] for index in indexes}
+        existing = set(await db.get_collection(collection).index_information())
+        existing.discard("_id_")
+
+        report[collection] = {
+            "missing": sorted(declared - existing),
+            "undeclared": sorted(existing - declared),
+            "unused": sorted(await _unused_indexes(collection) & existing),
+        }
+    return report
+
+
+async def _unused_indexes(collection: str) -> set[str]:
+    try:
+        cursor = db.get_collection(collection).aggregate([{"$indexStats": {}}])
+        stats = await cursor.to_list(length=None)
+    except OperationFailure:
+        # the user may lack the privilege to read index statistics
+        return set()
+    return {s["name"] for s in stats if s["accesses"]["ops"] == 0}
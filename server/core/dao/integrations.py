@@ -1,5 +1,8 @@
-from fastapi.encoders import jsonable_encoder
+from datetime import datetime, timedelta
 
+from pymongo.errors import DuplicateKeyError
+
+from core.cache import TTLCache
 from core.dao.database import db
 from core.schemas.integrations import IntegrationProvider, IntegrationAccess
 from core.schemas.cache import DataBatchCache, EmployeeListCache
@@ -7,6 +10,10 @@ from core.settings import get_settings
 
 settings = get_settings()
 
+_access_cache = TTLCache(
+    settings.INTEGRATION_ACCESS_CACHE_SIZE, settings.INTEGRATION_ACCESS_CACHE_TTL
+)
+
 
 async def get_integrations_for_workspace(
     workspace_id: str,
@@ -22,6 +29,18 @@ async def get_integrations_for_workspace(
     return [IntegrationAccess(**obj) for obj in integrations]
 
 
+async def get_connected_integrations() -> list[tuple[str, IntegrationProvider]]:
+    """
+    Get all integrations that are set up and do not require a reconnect
+    :return: list of (workspace id, integration) tuples
+    """
+    integrations = await db.integration_access.find(
+        {"requires_reconnect": {"$ne": True}},
+        {"_id": 0, "workspace_id": 1, "integration": 1},
+    ).to_list(length=None)
+    return [(obj["workspace_id"], obj["integration"]) for obj in integrations]
+
+
 async def get_integration_for_workspace(
     workspace_id: str, integration: IntegrationProvider
 ) -> IntegrationAccess | None:
@@ -38,6 +57,31 @@ async def get_integration_for_workspace(
         return IntegrationAccess(**res)
 
 
+async def get_cached_integration_for_workspace(
+    workspace_id: str, integration: IntegrationProvider
+) -> IntegrationAccess | None:
+    """
+    Same as get_integration_for_workspace but served from an in-process cache until
+    shortly before the token expires. Changes made through this module invalidate
+    the cache, changes made by other processes become visible after
+    INTEGRATION_ACCESS_CACHE_TTL seconds.
+    """
+    key = (workspace_id, integration)
+    integration_access = _access_cache.get(key)
+    if integration_access is None or integration_access.has_expired():
+        integration_access = await get_integration_for_workspace(
+            workspace_id, integration
+        )
+        if integration_access is None:
+            return None
+        _access_cache.set(key, integration_access)
+    return integration_access.copy(deep=True)
+
+
+def clear_integration_access_cache():
+    _access_cache.clear()
+
+
 async def remove_integration_for_workspace(
     workspace_id: str, integration: IntegrationProvider
 ):
@@ -46,6 +90,7 @@ async def remove_integration_for_workspace(
     :param workspace_id: the id of the workspace
     :param integration: the name of the integration
     """
+    _access_cache.invalidate((workspace_id, integration))
     return await db.integration_access.delete_one(
         {"workspace_id": workspace_id, "integration": integration}
     )
@@ -73,20 +118,18 @@ async def add_integration_for_workspace(integration_access: IntegrationAccess):
     Add an integration access object to the database
     :param integration_access: the new object
     """
-    # replace existing integration access
-    if await workspace_has_integration(
-        integration_access.workspace_id, integration_access.integration
-    ):
-        return await db.integration_access.replace_one(
-            {
-                "workspace_id": integration_access.workspace_id,
-                "integration": integration_access.integration,
-            },
-            {**integration_access.dict()},
-        )
-    # add new integration access
-    else:
-        return db.integration_access.insert_one(jsonable_encoder(integration_access))
+    _access_cache.invalidate(
+        (integration_access.workspace_id, integration_access.integration)
+    )
+    # replace existing integration access or add a new one
+    return await db.integration_access.replace_one(
+        {
+            "workspace_id": integration_access.workspace_id,
+            "integration": integration_access.integration,
+        },
+        integration_access.dict(by_alias=True),
+        upsert=True,
+    )
 
 
 async def set_requires_reconnect(
@@ -98,6 +141,7 @@ async def set_requires_reconnect(
     :param integration: Name of the integration
     :param requires_reconnect: True / False
     """
+    _access_cache.invalidate((workspace_id, integration))
     return await db.integration_access.update_one(
         {"workspace_id": workspace_id, "integration": integration},
         {"$set": {"requires_reconnect": requires_reconnect}},
@@ -119,26 +163,7 @@ async def get_accounting_cache(
 
 
 async def set_accounting_cache(cache_obj: DataBatchCache):
-    if (
-        await db.accounting_cache.count_documents(
-            {
-                "workspace_id": cache_obj.workspace_id,
-                "integration": cache_obj.integration,
-                "from_date": cache_obj.from_date,
-            }
-        )
-        > 0
-    ):
-        return await db.accounting_cache.replace_one(
-            {
-                "workspace_id": cache_obj.workspace_id,
-                "integration": cache_obj.integration,
-                "from_date": cache_obj.from_date,
-            },
-            {**cache_obj.dict()},
-        )
-    else:
-        return await db.accounting_cache.insert_one(jsonable_encoder(cache_obj))
+    return await _set_cache("accounting_cache", cache_obj)
 
 
 async def get_payroll_cache(
@@ -156,23 +181,65 @@ async def get_payroll_cache(
 
 
 async def set_payroll_cache(cache_obj: EmployeeListCache):
-    if (
-        await db.payroll_cache.count_documents(
-            {
-                "workspace_id": cache_obj.workspace_id,
-                "integration": cache_obj.integration,
-                "from_date": cache_obj.from_date,
-            }
+    return await _set_cache("payroll_cache", cache_obj)
+
+
+async def _set_cache(collection: str, cache_obj: DataBatchCache | EmployeeListCache):
+    # replace the existing cache or add a new one, the unique index on the
+    # filter fields prevents duplicates under concurrent writes
+    return await db.get_collection(collection).replace_one(
+        {
+            "workspace_id": cache_obj.workspace_id,
+            "integration": cache_obj.integration,
+            "from_date": cache_obj.from_date,
+        },
+        cache_obj.dict(by_alias=True),
+        upsert=True,
+    )
+
+
+async def acquire_integration_lease(key: str, owner: str, ttl: float) -> bool:
+    """
+    Try to acquire the lease to fetch the data of an integration. A lease that has
+    not been released after ttl seconds can be taken over.
+    :param key: key of the fetch
+    :param owner: unique id of the caller
+    :param ttl: seconds until the lease expires
+    :return: True if the caller holds the lease
+    """
+    now = datetime.utcnow()
+    try:
+        # inserts the lease if there is none, fails if an unexpired one exists
+        await db.integration_leases.update_one(
+            {"_id": key, "expires_at": {"$lt": now}},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl)}},
+            upsert=True,
         )
-        > 0
-    ):
-        return await db.payroll_cache.replace_one(
-            {
-                "workspace_id": cache_obj.workspace_id,
-                "integration": cache_obj.integration,
-                "from_date": cache_obj.from_date,
-            },
-            {**cache_obj.dict()},
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def release_integration_lease(key: str, owner: str):
+    return await db.integration_leases.delete_one({"_id": key, "owner": owner})
+
+
+async def get_integration_cache_versions(
+    workspace_id: str, from_date: int
+) -> dict[str, datetime]:
+    """
+    Return the creation times of the accounting and payroll caches of a workspace.
+    Only the creation times are retrieved, not the cached data.
+    :param workspace_id: the id of the workspace
+    :param from_date: Date in unix format of the cache
+    :return: dictionary mapping "<collection>:<integration>" to the creation time
+    """
+    versions = {}
+    for collection in ("accounting_cache", "payroll_cache"):
+        cursor = db.get_collection(collection).find(
+            {"workspace_id": workspace_id, "from_date": from_date},
+            {"_id": 0, "integration": 1, "created_at": 1},
         )
-    else:
-        return await db.payroll_cache.insert_one(jsonable_encoder(cache_obj))
+        for obj in await cursor.to_list(length=settings.MAX_MODELS):
+            versions[f"{collection}:{obj['integration']}"] = obj["created_at"]
+    return versions
@@ -0,0 +1,328 @@
+"""
+Storage layouts of models.
+
+Embedded models keep their sheets, rows and payroll employees in the model document.
+Normalized models keep only the skeleton of their sheets (meta data, section names
+and end rows) and of their payroll in the model document. Their rows are stored
+in `model_rows`, keyed by (model_id, sheet, section, position) with section None for
+the assumptions, and their employees in `model_employees`, keyed by (model_id,
+position). Reading or writing a part of a normalized model only touches the
+documents of that part.
+
+The DAO of the models hides the difference, it always returns model documents in
+the embedded layout.
+
+In both layouts, data derived on every read is not stored: the integration values
+of the rows, merged from the integration caches, and the payroll values, aggregated
+from the employees.
+"""
+
+from typing import Literal
+
+from pymongo import DeleteOne, UpdateOne
+
+from core.dao.database import db
+from core.settings import get_settings
+
+settings = get_settings()
+
+StorageLayout = Literal["embedded", "normalized"]
+
+
+def storage_layout(document: dict) -> StorageLayout:
+    # models stored before the layouts were introduced have no marker
+    return document.get("storage", "embedded")
+
+
+async def get_storage_layout(model_id: str) -> StorageLayout | None:
+    model = await db.models.find_one({"_id": model_id}, {"storage": 1})
+    if model is not None:
+        return storage_layout(model)
+
+
+def strip_row(row: dict) -> dict:
+    """
+    Encoded row without its derived integration values.
+    """
+    return {k: v for k, v in row.items() if k != "integration_values"}
+
+
+def strip_sheet(sheet: dict) -> dict:
+    """
+    Encoded sheet without the derived integration values of its rows.
+    """
+    sections = [
+        {
+            **section,
+            "rows": [strip_row(row) for row in section["rows"]],
+            "end_row": section.get("end_row") and strip_row(section["end_row"]),
+        }
+        for section in sheet["sections"]
+    ]
+    assumptions = [strip_row(row) for row in sheet["assumptions"]]
+    return {**sheet, "assumptions": assumptions, "sections": sections}
+
+
+def strip_model(document: dict) -> dict:
+    """
+    Encoded model without derived data.
+    """
+    stripped = {
+        **document,
+        "sheets": [strip_sheet(sheet) for sheet in document.get("sheets", [])],
+    }
+    if "payroll" in document:
+        stripped["payroll"] = {**document["payroll"], "payroll_values": []}
+    return stripped
+
+
+def _row_document(
+    model_id: str, sheet_name: str, section: int | None, position: int, row: dict
+) -> dict:
+    return {
+        "model_id": model_id,
+        "sheet": sheet_name,
+        "section": section,
+        "position": position,
+        "row": row,
+    }
+
+
+def split_sheet(model_id: str, sheet: dict) -> tuple[dict, list[dict]]:
+    """
+    Split an encoded sheet into its skeleton and the documents of its rows.
+    """
+    name = sheet["meta"]["name"]
+    rows = [
+        _row_document(model_id, name, None, position, row)
+        for position, row in enumerate(sheet["assumptions"])
+    ]
+    sections = []
+    for index, section in enumerate(sheet["sections"]):
+        rows.extend(
+            _row_document(model_id, name, index, position, row)
+            for position, row in enumerate(section["rows"])
+        )
+        sections.append({**section, "rows": []})
+    return {**sheet, "assumptions": [], "sections": sections}, rows
+
+
+def split_employees(model_id: str, employees: list[dict]) -> list[dict]:
+    """
+    Documents of the encoded employees of a payroll.
+    """
+    return [
+        {"model_id": model_id, "position": position, "employee": employee}
+        for position, employee in enumerate(employees)
+    ]
+
+
+def normalize(document: dict) -> tuple[dict, list[dict], list[dict]]:
+    """
+    Split an encoded model in the embedded layout.
+    :return: the normalized model document, the documents of its rows and of its
+        employees
+    """
+    model_id = document["_id"]
+    sheets, rows = [], []
+    for sheet in document.get("sheets", []):
+        skeleton, sheet_rows = split_sheet(model_id, sheet)
+        sheets.append(skeleton)
+        rows.extend(sheet_rows)
+
+    payroll = document.get("payroll", {"payroll_values": [], "employees": []})
+    employees = split_employees(model_id, payroll["employees"])
+
+    normalized = {
+        **document,
+        "sheets": sheets,
+        "payroll": {**payroll, "employees": []},
+        "storage": "normalized",
+    }
+    return normalized, rows, employees
+
+
+async def insert_model(document: dict, layout: StorageLayout | None = None):
+    """
+    Insert an encoded model.
+    :param document: model in the embedded layout
+    :param layout: layout to store the model in, MODEL_STORAGE if None
+    """
+    document = strip_model(document)
+    if (layout or settings.MODEL_STORAGE) == "embedded":
+        return await db.models.insert_one(document)
+
+    normalized, rows, employees = normalize(document)
+    # the model only becomes visible once its parts are stored
+    await _insert_parts(rows, employees)
+    return await db.models.insert_one(normalized)
+
+
+async def _insert_parts(rows: list[dict], employees: list[dict]):
+    if rows:
+        await db.model_rows.insert_many(rows)
+    if employees:
+        await db.model_employees.insert_many(employees)
+
+
+async def load_parts(documents: list[dict]) -> list[dict]:
+    """
+    Fill the rows and employees of normalized model documents in, inplace. Only the
+    parts of the sheets and the payroll contained in a document are loaded, e.g. a
+    document fetched with the projection of a sheet only gets the rows of the sheet.
+    """
+    sheets, payrolls = {}, {}
+    for document in documents:
+        if storage_layout(document) != "normalized":
+            continue
+        for sheet in document.get("sheets", []):
+            sheets[(document["_id"], sheet["meta"]["name"])] = sheet
+        if "payroll" in document:
+            payrolls[document["_id"]] = document["payroll"]
+
+    if sheets:
+        cursor = db.model_rows.find(
+            {
+                "model_id": {"$in": list({model_id for model_id, _ in sheets})},
+                "sheet": {"$in": list({name for _, name in sheets})},
+            }
+        ).sort([("section", 1), ("position", 1)])
+        async for row in cursor:
+            if (sheet := sheets.get((row["model_id"], row["sheet"]))) is None:
+                continue
+            if row["section"] is None:
+                sheet["assumptions"].append(row["row"])
+            else:
+                sheet["sections"][row["section"]]["rows"].append(row["row"])
+
+    if payrolls:
+        cursor = db.model_employees.find({"model_id": {"$in": list(payrolls)}}).sort(
+            "position", 1
+        )
+        async for employee in cursor:
+            payrolls[employee["model_id"]]["employees"].append(employee["employee"])
+
+    return documents
+
+
+async def replace_sheet_rows(
+    model_id: str, sheet_name: str, rows: list[dict], session=None
+):
+    """
+    Replace all rows of a sheet of a normalized model with the documents of
+    split_sheet. Pass the session of a transaction, otherwise readers can see the
+    sheet without rows.
+    """
+    await db.model_rows.delete_many(
+        {"model_id": model_id, "sheet": sheet_name}, session=session
+    )
+    if rows:
+        await db.model_rows.insert_many(rows, session=session)
+
+
+async def write_rows(
+    model_id: str,
+    sheet_name: str,
+    rows: dict[str, tuple[int | None, int, dict | None]],
+    deleted: list[str],
+    session=None,
+):
+    """
+    Write single rows of a sheet of a normalized model.
+    :param rows: new section and position by row id, with the encoded row if its
+        data changed or None if it was only moved
+    :param deleted: ids of the rows to delete
+    :param session: session of the transaction the writes are part of
+    """
+    key = {"model_id": model_id, "sheet": sheet_name}
+    operations = [DeleteOne({**key, "row._id": row_id}) for row_id in deleted]
+    for row_id, (section, position, row) in rows.items():
+        update = {"section": section, "position": position}
+        if row is not None:
+            update["row"] = row
+        operations.append(
+            UpdateOne(
+                {**key, "row._id": row_id}, {"$set": update}, upsert=row is not None
+            )
+        )
+    if operations:
+        await db.model_rows.bulk_write(operations, session=session)
+
+
+async def replace_employees(model_id: str, employees: list[dict], session=None):
+    """
+    Replace the employees of a normalized model with the encoded employees. Pass the
+    session of a transaction, otherwise readers can see the payroll without
+    employees.
+    """
+    await db.model_employees.delete_many({"model_id": model_id}, session=session)
+    if employees:
+        await db.model_employees.insert_many(
+            split_employees(model_id, employees), session=session
+        )
+
+
+async def delete_parts(model_id: str):
+    await db.model_rows.delete_many({"model_id": model_id})
+    await db.model_employees.delete_many({"model_id": model_id})
+
+
+async def migrate_model(model_id: str, layout: StorageLayout) -> bool:
+    """
+    Convert a model to a storage layout. The model document is only replaced if the
+    model has not been changed during the conversion.
+    :return: whether the model was converted, False if it is already stored in the
+        layout, does not exist or has been changed concurrently
+    """
+    document = await db.models.find_one({"_id": model_id})
+    if document is None or storage_layout(document) == layout:
+        return False
+    # None matches models without a revision
+    revision = document["meta"].get("revision")
+    await load_parts([document])
+
+    if layout == "normalized":
+        replacement, rows, employees = normalize(document)
+        await delete_parts(model_id)
+        await _insert_parts(rows, employees)
+    else:
+        replacement = {k: v for k, v in document.items() if k != "storage"}
+
+    # the revision is not incremented, the content of the model is the same
+    result = await db.models.replace_one(
+        {"_id": model_id, "meta.revision": revision}, replacement
+    )
+    if result.matched_count == 0:
+        if layout == "normalized":
+            await delete_parts(model_id)
+        return False
+
+    if layout == "embedded":
+        await delete_parts(model_id)
+    return True
+
+
+async def compact_models() -> tuple[int, int]:
+    """
+    Remove the derived data stored with models before it was stripped on write.
+    Models are not changed otherwise, so their revisions are kept.
+    :return: number of compacted model documents and row documents
+    """
+    models = await db.models.update_many(
+        {},
+        {
+            "$unset": {
+                "sheets.$[].assumptions.$[].integration_values": "",
+                "sheets.$[].sections.$[].rows.$[].integration_values": "",
+                "sheets.$[].sections.$[section].end_row.integration_values": "",
+            },
+            "$set": {"payroll.payroll_values": []},
+        },
+        # sections may have no end row
+        array_filters=[{"section.end_row": {"$type": "object"}}],
+    )
+    rows = await db.model_rows.update_many(
+        {"row.integration_values": {"$exists": True}},
+        {"$unset": {"row.integration_values": ""}},
+    )
+    return models.modified_count, rows.modified_count
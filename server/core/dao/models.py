@@ -1,8 +1,22 @@
 from datetime import date
 
 from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
 
+from core.dao.calculation_cache import delete_calculation_cache
 from core.dao.database import db
+from core.dao.model_storage import (
+    get_storage_layout,
+    insert_model,
+    load_parts,
+    split_sheet,
+    strip_sheet,
+    strip_row,
+    replace_sheet_rows,
+    write_rows,
+    replace_employees,
+    delete_parts,
+)
 from core.dao.users import user_exists, get_user
 from core.dao.workspaces import is_user_in_workspace, get_workspace
 from core.exceptions import (
@@ -10,17 +24,34 @@ from core.exceptions import (
     NoAccessException,
     CardinalityConstraintFailedException,
     BusinessLogicException,
+    RevisionConflictException,
+)
+from core.schemas.utils import PyObjectId, construct_trusted
+from core.schemas.models import (
+    ModelMeta,
+    ModelUser,
+    Model,
+    Employee,
+    ModelRole,
+    Payroll,
+    HORIZON_MONTHS,
+)
+from core.schemas.rows import Row
+from core.schemas.sheets import (
+    Sheet,
+    RowOperation,
+    SheetPatchResult,
+    create_default_sheets,
 )
-from core.schemas.utils import PyObjectId
-from core.schemas.models import ModelMeta, ModelUser, Model, Employee
-from core.schemas.sheets import Sheet, create_default_sheets
 from core.settings import get_settings
 
 settings = get_settings()
 
+REVISION_INC = {"meta.revision": 1}
+
 
 async def model_exists(model_id: str):
-    return await get_model_by_id(model_id) is not None
+    return await db.models.count_documents({"_id": model_id}, limit=1) > 0
 
 
 async def has_access_to_model(model_id: str, user_id: PyObjectId):
@@ -33,37 +64,110 @@ async def has_access_to_model(model_id: str, user_id: PyObjectId):
                     {"meta.editors": str(user_id)},
                     {"meta.viewers": str(user_id)},
                 ],
-            }
+            },
+            limit=1,
         )
         > 0
     )
 
 
+async def get_user_role_in_model(
+    model_id: str, user_id: PyObjectId | str
+) -> ModelRole | None:
+    """
+    Role of a user in a model, fetching only the role lists of the model.
+    :param model_id: Id of the model
+    :param user_id: Id of the user
+    :return: role or None if the user has no access or the model does not exist
+    """
+    model = await db.models.find_one(
+        {"_id": model_id},
+        {"meta.admins": 1, "meta.editors": 1, "meta.viewers": 1},
+    )
+    if model is not None:
+        return role_in_model(model, user_id)
+
+
 async def is_admin(model_id: str, user_id: PyObjectId):
-    model = await db.models.find_one({"_id": model_id})
-    return str(user_id) in model["meta"]["admins"]
+    return await get_user_role_in_model(model_id, user_id) == "Admin"
 
 
 async def is_editor(model_id: str, user_id: PyObjectId):
-    model = await db.models.find_one({"_id": model_id})
-    return str(user_id) in model["meta"]["editors"]
+    return await get_user_role_in_model(model_id, user_id) == "Editor"
 
 
 async def is_viewer(model_id: str, user_id: PyObjectId):
-    model = await db.models.find_one({"_id": model_id})
-    return str(user_id) in model["meta"]["viewers"]
+    return await get_user_role_in_model(model_id, user_id) == "Viewer"
 
 
 async def get_model_by_id(model_id: str):
     if (model := await db.models.find_one({"_id": model_id})) is not None:
-        return Model(**model)
+        await load_parts([model])
+        return construct_trusted(Model, model)
+
+
+async def get_model_document(model_id: str, projection: dict | None = None):
+    """
+    Fetch the raw document of a model without validating it. The meta data is always
+    part of the document since it is needed for the access checks.
+    :param model_id: Id of the model
+    :param projection: Fields to fetch in addition to the meta data, all if None
+    :return: document or None if the model does not exist
+    """
+    if projection is not None:
+        projection = {"meta": 1, "storage": 1, **projection}
+    if (model := await db.models.find_one({"_id": model_id}, projection)) is not None:
+        await load_parts([model])
+    return model
+
+
+def sheet_projection(sheet_name: str) -> dict:
+    """
+    Projection of a model document on a single sheet.
+    """
+    return {"sheets": {"$elemMatch": {"meta.name": sheet_name}}}
+
+
+def role_in_model(document: dict, user_id: PyObjectId | str) -> ModelRole | None:
+    """
+    Role of a user in an already fetched model document.
+    """
+    meta = document["meta"]
+    if str(user_id) in meta["admins"]:
+        return "Admin"
+    if str(user_id) in meta["editors"]:
+        return "Editor"
+    if str(user_id) in meta["viewers"]:
+        return "Viewer"
 
 
 async def get_models_for_workspace(workspace_id: PyObjectId):
     models = await db.models.find({"meta.workspace": str(workspace_id)}).to_list(
         length=settings.MAX_MODELS
     )
-    return [Model(**m) for m in models]
+    return [construct_trusted(Model, m) for m in await load_parts(models)]
+
+
+async def get_model_windows_for_workspace(
+    workspace_id: PyObjectId | str,
+) -> list[tuple[date, int]]:
+    """
+    Distinct starting months and horizons of the models of a workspace, without
+    loading the models
+    """
+    models = await db.models.find(
+        {"meta.workspace": str(workspace_id)},
+        {"_id": 0, "meta.starting_month": 1, "meta.horizon_months": 1},
+    ).to_list(length=settings.MAX_MODELS)
+    return sorted(
+        {
+            (
+                date.fromisoformat(str(m["meta"]["starting_month"])[:10]),
+                m["meta"].get("horizon_months", HORIZON_MONTHS),
+            )
+            for m in models
+        }
+    )
 
 
 async def get_models_for_user(user_id: PyObjectId):
@@ -76,14 +180,14 @@ async def get_models_for_user(user_id: PyObjectId):
             ]
         }
     ).to_list(length=settings.MAX_MODELS)
-    return [Model(**m) for m in models]
+    return [construct_trusted(Model, m) for m in await load_parts(models)]
 
 
 async def get_admin_models_for_user(user_id: PyObjectId):
     models = await db.models.find({"meta.admins": str(user_id)}).to_list(
         length=settings.MAX_MODELS
     )
-    return [Model(**m) for m in models]
+    return [construct_trusted(Model, m) for m in await load_parts(models)]
 
 
 async def get_users_for_model(model_id: str):
@@ -144,17 +248,20 @@ async def add_admin_to_model(user_id: PyObjectId, model_id: str):
 
         # add admin
         await db.models.update_one(
-            {"_id": model_id}, {"$push": {"meta.admins": str(user_id)}}
+            {"_id": model_id},
+            {"$push": {"meta.admins": str(user_id)}, "$inc": REVISION_INC},
         )
 
         # remove viewer
         await db.models.update_one(
-            {"_id": model_id}, {"$pull": {"meta.viewers": str(user_id)}}
+            {"_id": model_id},
+            {"$pull": {"meta.viewers": str(user_id)}, "$inc": REVISION_INC},
         )
 
         # remove editor
         await db.models.update_one(
-            {"_id": model_id}, {"$pull": {"meta.editors": str(user_id)}}
+            {"_id": model_id},
+            {"$pull": {"meta.editors": str(user_id)}, "$inc": REVISION_INC},
         )
 
 
@@ -170,7 +277,8 @@ async def add_editor_to_model(user_id: PyObjectId, model_id: str):
 
         # add editor
         await db.models.update_one(
-            {"_id": model_id}, {"$push": {"meta.editors": str(user_id)}}
+            {"_id": model_id},
+            {"$push": {"meta.editors": str(user_id)}, "$inc": REVISION_INC},
         )
 
 
@@ -186,7 +294,8 @@ async def add_viewer_to_model(user_id: PyObjectId, model_id: str):
 
         # add viewer
         await db.models.update_one(
-            {"_id": model_id}, {"$push": {"meta.viewers": str(user_id)}}
+            {"_id": model_id},
+            {"$push": {"meta.viewers": str(user_id)}, "$inc": REVISION_INC},
         )
 
 
@@ -207,39 +316,56 @@ async def remove_user_from_model(user_id: PyObjectId, model_id: str):
 
     # remove admin
     await db.models.update_one(
-        {"_id": model_id}, {"$pull": {"meta.admins": str(user_id)}}
+        {"_id": model_id},
+        {"$pull": {"meta.admins": str(user_id)}, "$inc": REVISION_INC},
     )
 
     # remove viewer
     await db.models.update_one(
-        {"_id": model_id}, {"$pull": {"meta.viewers": str(user_id)}}
+        {"_id": model_id},
+        {"$pull": {"meta.viewers": str(user_id)}, "$inc": REVISION_INC},
     )
 
     # remove editor
     await db.models.update_one(
-        {"_id": model_id}, {"$pull": {"meta.editors": str(user_id)}}
+        {"_id": model_id},
+        {"$pull": {"meta.editors": str(user_id)}, "$inc": REVISION_INC},
     )
 
 
 async def set_name(model_id: str, name: str):
-    await db.models.update_one({"_id": model_id}, {"$set": {"meta.name": name}})
+    await db.models.update_one(
+        {"_id": model_id}, {"$set": {"meta.name": name}, "$inc": REVISION_INC}
+    )
 
 
 async def set_starting_month(model_id: str, starting_month: date):
     string_date = starting_month.strftime("%Y-%m-%d")
     await db.models.update_one(
-        {"_id": model_id}, {"$set": {"meta.starting_month": string_date}}
+        {"_id": model_id},
+        {"$set": {"meta.starting_month": string_date}, "$inc": REVISION_INC},
+    )
+
+
+async def set_horizon_months(model_id: str, horizon_months: int):
+    await db.models.update_one(
+        {"_id": model_id},
+        {"$set": {"meta.horizon_months": horizon_months}, "$inc": REVISION_INC},
     )
 
 
 async def set_starting_balance(model_id: str, starting_balance: float):
     await db.models.update_one(
-        {"_id": model_id}, {"$set": {"meta.starting_balance": starting_balance}}
+        {"_id": model_id},
+        {"$set": {"meta.starting_balance": starting_balance}, "$inc": REVISION_INC},
     )
 
 
 async def delete_model(model_id: PyObjectId | str):
-    return await db.models.delete_one({"_id": str(model_id)})
+    await delete_calculation_cache(str(model_id))
+    result = await db.models.delete_one({"_id": str(model_id)})
+    await delete_parts(str(model_id))
+    return result
 
 
 async def create_model(admin_id: PyObjectId, model_name: str, workspace_id: PyObjectId):
@@ -266,55 +392,384 @@ async def create_model(admin_id: PyObjectId, model_name: str, workspace_id: PyOb
             "editors": [],
             "viewers": [],
             "starting_month": date.today(),
-            "starting_balance": 0
+            "starting_balance": 0,
         }
     )
     sheets = create_default_sheets()
     payroll = {"payroll_values": [], "employees": []}
     model = Model(**{"meta": meta, "sheets": sheets, "payroll": payroll})
-    return await db.models.insert_one(jsonable_encoder(model))
+    return await insert_model(jsonable_encoder(model))
 
 
-async def _update_sheet_data(model_id: str, sheet_data: Sheet, sheet_name: str):
-    return await db.models.update_one(
-        {"_id": model_id, "sheets.meta.name": sheet_name},
-        {
-            "$set": {
-                "sheets.$.assumptions": jsonable_encoder(sheet_data.assumptions),
-                "sheets.$.sections": jsonable_encoder(sheet_data.sections),
-            }
-        },
-    )
+def _revision_filter(revision: int) -> dict:
+    # models created before revisions were introduced have none
+    if revision == 0:
+        return {"meta.revision": {"$in": [0, None]}}
+    return {"meta.revision": revision}
 
 
-async def update_revenues_sheet(model_id: str, sheet_data: Sheet):
-    return await _update_sheet_data(model_id, sheet_data, "Revenues")
+async def get_model_revision(model_id: str) -> int | None:
+    model = await db.models.find_one({"_id": model_id}, {"meta.revision": 1})
+    if model is not None:
+        return model["meta"].get("revision", 0)
+
+
+async def _update_model(
+    model_id: str,
+    update: dict,
+    revision: int | None = None,
+    query: dict | None = None,
+    session=None,
+    array_filters: list[dict] | None = None,
+) -> int | None:
+    """
+    Apply an update to a model document and increment its revision.
+    :param model_id: Id of the model
+    :param update: update document
+    :param revision: expected current revision of the model, None to always update
+    :param query: additional conditions of the update
+    :param session: session of the transaction the update is part of
+    :param array_filters: filters of the identifiers used in the update
+    :return: the new revision, None if no document matched
+    :raises RevisionConflictException: if the model has a different revision
+    """
+    query = {"_id": model_id, **(query or {})}
+    if revision is not None:
+        query.update(_revision_filter(revision))
+
+    model = await db.models.find_one_and_update(
+        query,
+        {**update, "$inc": REVISION_INC},
+        projection={"meta.revision": 1},
+        return_document=ReturnDocument.AFTER,
+        session=session,
+        array_filters=array_filters,
+    )
+    if model is not None:
+        return model["meta"]["revision"]
+
+    if revision is not None:
+        current = await get_model_revision(model_id)
+        if current is not None and current != revision:
+            raise RevisionConflictException(current)
+
+
+async def _update_sheet_data(
+    model_id: str, sheet_data: Sheet, sheet_name: str, revision: int | None = None
+) -> int | None:
+    sheet = strip_sheet(jsonable_encoder(sheet_data))
+    normalized = await get_storage_layout(model_id) == "normalized"
+    if normalized:
+        # the meta data of the sheet is not updated
+        sheet["meta"]["name"] = sheet_name
+        sheet, rows = split_sheet(model_id, sheet)
+
+    async def update(session=None) -> int | None:
+        new_revision = await _update_model(
+            model_id,
+            {
+                "$set": {
+                    "sheets.$.assumptions": sheet["assumptions"],
+                    "sheets.$.sections": sheet["sections"],
+                }
+            },
+            revision,
+            {"sheets.meta.name": sheet_name},
+            session,
+        )
+        # rows are only replaced once the revision check passed
+        if normalized and new_revision is not None:
+            await replace_sheet_rows(model_id, sheet_name, rows, session)
+        return new_revision
+
+    if not normalized:
+        return await update()
+    # concurrent writers and readers see all rows of the sheet or none
+    return await db.with_transaction(update)
+
+
+async def update_revenues_sheet(
+    model_id: str, sheet_data: Sheet, revision: int | None = None
+) -> int | None:
+    await delete_calculation_cache(model_id)
+    return await _update_sheet_data(model_id, sheet_data, "Revenues", revision)
+
+
+async def update_costs_sheet(
+    model_id: str, sheet_data: Sheet, revision: int | None = None
+) -> int | None:
+    await delete_calculation_cache(model_id)
+    return await _update_sheet_data(model_id, sheet_data, "Costs", revision)
+
+
+def _locate_row(sheet: Sheet, row_id: str) -> tuple[int | None, int | None]:
+    """
+    Position of a row in a sheet.
+    :return: index of the section (None for the assumptions) and index in its rows
+        (None for the end row of the section)
+    :raises DoesNotExistException: if the sheet has no row with the id
+    """
+    for index, row in enumerate(sheet.assumptions):
+        if row.id == row_id:
+            return None, index
+    for section_index, section in enumerate(sheet.sections):
+        for index, row in enumerate(section.rows):
+            if row.id == row_id:
+                return section_index, index
+        if section.end_row is not None and section.end_row.id == row_id:
+            return section_index, None
+    raise DoesNotExistException(f"Row {row_id} does not exist.")
+
+
+def _section_rows(sheet: Sheet, section: int | None) -> list[Row]:
+    if section is None:
+        return sheet.assumptions
+    if not 0 <= section < len(sheet.sections):
+        raise DoesNotExistException(f"Section {section} does not exist.")
+    return sheet.sections[section].rows
+
+
+def _rows_path(section: int | None) -> str:
+    # the sheet is matched by the array filter "s"
+    if section is None:
+        return "sheets.$[s].assumptions"
+    return f"sheets.$[s].sections.{section}.rows"
+
+
+def _apply_operations(
+    sheet: Sheet, operations: list[RowOperation]
+) -> tuple[set[int | None], dict[str, Row], list[str]]:
+    """
+    Apply row operations to a sheet inplace. All operations are validated before
+    anything is written.
+    :return: the sections whose rows changed (None for the assumptions), the
+        changed rows by id and the ids of the deleted rows
+    :raises DoesNotExistException: if a row or section does not exist
+    :raises BusinessLogicException: if an added row already exists or an end row is
+        deleted or moved
+    """
+    sections = set()
+    changed: dict[str, Row] = {}
+    deleted = []
+
+    def insert(row: Row, section: int | None, position: int | None):
+        rows = _section_rows(sheet, section)
+        if position is None:
+            rows.append(row)
+        else:
+            rows.insert(position, row)
+        sections.add(section)
+
+    def remove(row_id: str) -> Row:
+        section, index = _locate_row(sheet, row_id)
+        if index is None:
+            raise BusinessLogicException("End rows cannot be deleted or moved.")
+        sections.add(section)
+        return _section_rows(sheet, section).pop(index)
+
+    for operation in operations:
+        if operation.op == "add":
+            try:
+                _locate_row(sheet, operation.row.id)
+            except DoesNotExistException:
+                insert(operation.row, operation.section, operation.position)
+                changed[operation.row.id] = operation.row
+            else:
+                raise BusinessLogicException(f"Row {operation.row.id} already exists.")
+
+        elif operation.op == "update":
+            section, index = _locate_row(sheet, operation.row_id)
+            row = operation.row.copy(update={"id": operation.row_id})
+            if index is None:
+                sheet.sections[section].end_row = row
+            else:
+                _section_rows(sheet, section)[index] = row
+                sections.add(section)
+            changed[row.id] = row
+
+        elif operation.op == "delete":
+            remove(operation.row_id)
+            changed.pop(operation.row_id, None)
+            deleted.append(operation.row_id)
+
+        elif operation.op == "move":
+            # validate the target before the row is removed
+            _section_rows(sheet, operation.section)
+            row = remove(operation.row_id)
+            insert(row, operation.section, operation.position)
+            changed[row.id] = row
+
+    return sections, changed, deleted
+
+
+def _end_row_updates(sheet: Sheet, changed: dict[str, Row]) -> dict[str, dict]:
+    # changed end rows by path, the sheet is matched by the array filter "s"
+    positions = _row_positions(sheet)
+    end_rows = {}
+    for row_id, row in changed.items():
+        if row_id not in positions:
+            section, _ = _locate_row(sheet, row_id)
+            path = f"sheets.$[s].sections.{section}.end_row"
+            end_rows[path] = strip_row(jsonable_encoder(row))
+    return end_rows
+
+
+async def patch_sheet_rows(
+    model_id: str, sheet: Sheet, operations: list[RowOperation], revision: int
+) -> SheetPatchResult:
+    """
+    Add, update, delete and move single rows of a sheet. Only the affected sections
+    are written, the rest of the sheet is left untouched. The operations are
+    applied to the given state of the sheet and written atomically, conditional on
+    the revision of that state, which is incremented once.
+    :param model_id: Id of the model
+    :param sheet: current state of the sheet, modified inplace
+    :param operations: operations in the order in which they are applied
+    :param revision: revision of the model the sheet was read at
+    :return: the changed rows, the ids of the deleted rows and the new revision
+    :raises RevisionConflictException: if the model has been changed since
+    """
+    before = _row_positions(sheet)
+    sections, changed, deleted = _apply_operations(sheet, operations)
+
+    if sections or changed:
+        update = _end_row_updates(sheet, changed)
+        array_filters = [{"s.meta.name": sheet.meta.name}]
+
+        if await get_storage_layout(model_id) == "normalized":
+
+            async def patch(session) -> int | None:
+                new_revision = await _update_model(
+                    model_id,
+                    {"$set": update} if update else {},
+                    revision,
+                    session=session,
+                    array_filters=array_filters if update else None,
+                )
+                if new_revision is not None:
+                    await _patch_normalized_rows(
+                        model_id, sheet, before, changed, deleted, session
+                    )
+                return new_revision
+
+            # the rows are in documents of their own, nothing is written if the
+            # revision check or a write fails
+            new_revision = await db.with_transaction(patch)
+
+        else:
+            # a single update of the model document, which is atomic
+            for section in sections:
+                update[_rows_path(section)] = [
+                    strip_row(jsonable_encoder(row))
+                    for row in _section_rows(sheet, section)
+                ]
+            new_revision = await _update_model(
+                model_id, {"$set": update}, revision, array_filters=array_filters
+            )
+
+        if new_revision is None:
+            raise RevisionConflictException(None)
+        # only once the model has changed
+        await delete_calculation_cache(model_id)
+        revision = new_revision
+
+    return SheetPatchResult(
+        meta=sheet.meta,
+        rows=list(changed.values()),
+        deleted=deleted,
+        revision=revision,
+    )
 
 
-async def update_costs_sheet(model_id: str, sheet_data: Sheet):
-    return await _update_sheet_data(model_id, sheet_data, "Costs")
+def _row_positions(sheet: Sheet) -> dict[str, tuple[int | None, int]]:
+    # section (None for the assumptions) and index of all rows except end rows
+    positions = {row.id: (None, i) for i, row in enumerate(sheet.assumptions)}
+    for section_index, section in enumerate(sheet.sections):
+        positions.update(
+            {row.id: (section_index, i) for i, row in enumerate(section.rows)}
+        )
+    return positions
+
+
+async def _patch_normalized_rows(
+    model_id: str,
+    sheet: Sheet,
+    before: dict[str, tuple[int | None, int]],
+    changed: dict[str, Row],
+    deleted: list[str],
+    session,
+):
+    """
+    Write the result of row operations to the rows of a normalized model: the
+    changed rows and the rows whose position shifted.
+    """
+    rows = {}
+    for row_id, (section, position) in _row_positions(sheet).items():
+        if row_id in changed:
+            row = strip_row(jsonable_encoder(changed[row_id]))
+            rows[row_id] = (section, position, row)
+        elif before.get(row_id) != (section, position):
+            rows[row_id] = (section, position, None)
+    await write_rows(model_id, sheet.meta.name, rows, deleted, session)
+
+
+async def update_model_employees(
+    model_id: str, employees: list[Employee], revision: int | None = None
+) -> int | None:
+    await delete_calculation_cache(model_id)
+    if await get_storage_layout(model_id) != "normalized":
+        return await _update_model(
+            model_id,
+            {"$set": {"payroll.employees": jsonable_encoder(employees)}},
+            revision,
+        )
 
+    employees = jsonable_encoder(employees)
 
-async def update_model_employees(model_id: str, employees: list[Employee]):
-    return await db.models.update_one(
-        {"_id": model_id}, {"$set": {"payroll.employees": jsonable_encoder(employees)}}
-    )
+    async def update(session) -> int | None:
+        new_revision = await _update_model(model_id, {}, revision, session=session)
+        if new_revision is not None:
+            await replace_employees(model_id, employees, session)
+        return new_revision
 
+    # concurrent writers and readers see all employees or none
+    return await db.with_transaction(update)
 
-async def _get_sheet_by_name(model_id: str, sheet_name: str) -> Sheet:
-    model = await db.models.find_one(
-        {"_id": model_id, "sheets.meta.name": sheet_name},
-    )
+
+async def _get_sheet_by_name(
+    model_id: str, sheet_name: str, document: dict | None = None
+) -> Sheet:
+    model = document
+    if model is None:
+        model = await db.models.find_one(
+            {"_id": model_id, "sheets.meta.name": sheet_name},
+            {"storage": 1, **sheet_projection(sheet_name)},
+        )
+        if model is not None:
+            await load_parts([model])
 
     if model is not None:
-        for sheet in model["sheets"]:
+        for sheet in model.get("sheets", []):
             if sheet["meta"]["name"] == sheet_name:
-                return Sheet(**sheet)
+                return construct_trusted(Sheet, sheet)
+
 
+async def get_costs_sheet(model_id: str, document: dict | None = None) -> Sheet:
+    return await _get_sheet_by_name(model_id, "Costs", document)
 
-async def get_costs_sheet(model_id: str) -> Sheet:
-    return await _get_sheet_by_name(model_id, "Costs")
 
+async def get_revenues_sheet(model_id: str, document: dict | None = None) -> Sheet:
+    return await _get_sheet_by_name(model_id, "Revenues", document)
 
-async def get_revenues_sheet(model_id: str) -> Sheet:
-    return await _get_sheet_by_name(model_id, "Revenues")
+
+async def get_payroll(model_id: str, document: dict | None = None) -> Payroll:
+    model = document
+    if model is None:
+        model = await db.models.find_one(
+            {"_id": model_id}, {"storage": 1, "payroll": 1}
+        )
+        if model is not None:
+            await load_parts([model])
+
+    if model is not None:
+        return construct_trusted(Payroll, model["payroll"])
@@ -1,15 +1,48 @@
-from fastapi.encoders import jsonable_encoder
+import hashlib
+from datetime import datetime, timedelta
 
+from core.cache import TTLCache, BloomFilter
 from core.dao.database import db
 from core.schemas.tokens import BlacklistToken
+from core.settings import get_settings
+
+settings = get_settings()
+
+_blacklist_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+
+# filter over all blacklisted tokens, None until loaded on startup
+_blacklist_filter: BloomFilter | None = None
+
+
+def token_digest(access_token: str) -> str:
+    """
+    Fixed-size digest of a token under which it is stored in the blacklist.
+    """
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
 
 
 async def add_to_blacklist(token: BlacklistToken):
-    return await db.token_blacklist.insert_one(jsonable_encoder(token))
+    digest = token_digest(token.access_token)
+    expires_at = token.expires_at
+    if expires_at is None:
+        expires_at = datetime.utcnow() + timedelta(minutes=settings.AUTH_TOKEN_EXPIRE)
+
+    # the token is removed by the TTL index once it has expired
+    result = await db.token_blacklist.replace_one(
+        {"token_digest": digest},
+        {"token_digest": digest, "expires_at": expires_at},
+        upsert=True,
+    )
+    _blacklist_cache.set(digest, True)
+    if _blacklist_filter is not None:
+        _blacklist_filter.add(digest)
+    return result
 
 
 async def get_blacklisted(access_token: str):
-    return await db.token_blacklist.find_one({"access_token": access_token})
+    return await db.token_blacklist.find_one(
+        {"token_digest": token_digest(access_token)}
+    )
 
 
 async def count_blacklisted_tokens():
@@ -17,4 +50,58 @@ async def count_blacklisted_tokens():
 
 
 async def is_token_blacklisted(access_token: str):
-    return await get_blacklisted(access_token) is not None
+    digest = token_digest(access_token)
+
+    # only blacklisted tokens are cached, a logout on another worker must be seen on
+    # the next request
+    if _blacklist_cache.get(digest):
+        return True
+
+    if _blacklist_filter is not None and digest not in _blacklist_filter:
+        return False
+
+    blacklisted = (
+        await db.token_blacklist.count_documents({"token_digest": digest}, limit=1) > 0
+    )
+    if blacklisted:
+        _blacklist_cache.set(digest, True)
+    return blacklisted
+
+
+async def setup_blacklist():
+    """
+    Convert entries of the old format, which stored the full token without expiry.
+    Must run before the unique index on the token digest is created.
+    """
+    legacy_expires_at = datetime.utcnow() + timedelta(
+        minutes=settings.AUTH_TOKEN_EXPIRE
+    )
+    async for token in db.token_blacklist.find({"token_digest": {"$exists": False}}):
+        digest = token_digest(token["access_token"])
+        await db.token_blacklist.delete_one({"_id": token["_id"]})
+        await db.token_blacklist.replace_one(
+            {"token_digest": digest},
+            {"token_digest": digest, "expires_at": legacy_expires_at},
+            upsert=True,
+        )
+
+
+async def load_blacklist_filter():
+    """
+    Build the Bloom filter over all blacklisted tokens so that tokens which are not
+    blacklisted can be accepted without a database lookup. Does nothing unless
+    TOKEN_BLOOM_FILTER is set.
+    """
+    global _blacklist_filter
+    if not settings.TOKEN_BLOOM_FILTER:
+        return
+
+    count = await count_blacklisted_tokens()
+    bloom_filter = BloomFilter(capacity=max(2 * count, 10000))
+    async for token in db.token_blacklist.find({}, {"token_digest": 1}):
+        bloom_filter.add(token["token_digest"])
+    _blacklist_filter = bloom_filter
+
+
+def clear_blacklist_cache():
+    _blacklist_cache.clear()
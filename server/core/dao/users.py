@@ -2,18 +2,25 @@ from typing import Any
 
 from fastapi.encoders import jsonable_encoder
 
+from core.cache import TTLCache
 from core.exceptions import UniqueConstraintFailedException, BusinessLogicException
 from core.dao.database import db
 from core.schemas.utils import PyObjectId
 from core.schemas.users import UserInDB, RegisterUser
+from core.settings import get_settings
+
+settings = get_settings()
+
+# users of authenticated requests by username
+_user_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
 
 
 async def user_exists(user_id: PyObjectId):
-    return await get_user(user_id) is not None
+    return await db.users.count_documents({"_id": str(user_id)}, limit=1) > 0
 
 
 async def username_exists(username: str):
-    return await get_user_by_username(username) is not None
+    return await db.users.count_documents({"username": username}, limit=1) > 0
 
 
 async def get_user(user_id: PyObjectId) -> UserInDB | None:
@@ -28,6 +35,29 @@ async def get_user_by_username(username: str) -> UserInDB | None:
         return UserInDB(**user)
 
 
+async def get_cached_user_by_username(username: str) -> UserInDB | None:
+    """
+    Same as get_user_by_username but served from an in-process cache. Changes made
+    through this module invalidate the cache, changes made by other processes become
+    visible after AUTH_CACHE_TTL seconds.
+    """
+    if (user := _user_cache.get(username)) is None:
+        if (user := await get_user_by_username(username)) is None:
+            return None
+        _user_cache.set(username, user)
+    return user.copy(deep=True)
+
+
+def invalidate_cached_user(user_id: PyObjectId | str):
+    for username, user in _user_cache.items():
+        if str(user.id) == str(user_id):
+            _user_cache.invalidate(username)
+
+
+def clear_user_cache():
+    _user_cache.clear()
+
+
 async def create_user(user: UserInDB):
     if await username_exists(user.username):
         raise UniqueConstraintFailedException("Username must be unique")
@@ -42,13 +72,16 @@ async def update_username(user_id: PyObjectId, new_username: str):
         {"_id": str(user_id)},
         {"$set": {"username": new_username}},
     )
+    invalidate_cached_user(user_id)
 
 
 async def update_user_field(user_id: PyObjectId, field: str, value: Any):
     assert field != "username"
     if field not in RegisterUser.__fields__ and field != "hashed_password":
         raise ValueError(f"Setting {field} not supported.")
-    return await db.users.update_one({"_id": str(user_id)}, {"$set": {field: value}})
+    result = await db.users.update_one({"_id": str(user_id)}, {"$set": {field: value}})
+    invalidate_cached_user(user_id)
+    return result
 
 
 async def delete_user_full(user_id: PyObjectId):
@@ -58,10 +91,12 @@ async def delete_user_full(user_id: PyObjectId):
     """
     # remove user object itself
     await db.users.delete_one({"_id": str(user_id)})
+    invalidate_cached_user(user_id)
 
     # remove user from workspaces
     await db.workspaces.update_many(
-        {"users": str(user_id)}, {"$pull": {"users": str(user_id)}}
+        {"users": str(user_id)},
+        {"$pull": {"users": str(user_id)}, "$inc": {"revision": 1}},
     )
 
     # remove from models
@@ -79,6 +114,7 @@ async def delete_user_full(user_id: PyObjectId):
                 "meta.editors": str(user_id),
                 "meta.viewers": str(user_id),
             },
+            "$inc": {"meta.revision": 1},
         },
     )
 
@@ -105,7 +141,8 @@ async def remove_user_from_workspace(user_id: PyObjectId, workspace_id: PyObject
 
     # remove user from workspace
     await db.workspaces.update_one(
-        {"_id": str(workspace_id)}, {"$pull": {"users": str(user_id)}}
+        {"_id": str(workspace_id)},
+        {"$pull": {"users": str(user_id)}, "$inc": {"revision": 1}},
     )
 
     # remove user from all models of workspace
@@ -117,19 +154,24 @@ async def remove_user_from_workspace(user_id: PyObjectId, workspace_id: PyObject
                 "meta.editors": str(user_id),
                 "meta.viewers": str(user_id),
             },
+            "$inc": {"meta.revision": 1},
         },
     )
 
 
 async def set_user_otp_secret(user_id: PyObjectId, otp_secret: str):
-    return await db.users.update_one(
+    result = await db.users.update_one(
         {"_id": str(user_id)},
         {"$set": {"otp_secret": otp_secret, "otp_validated": False}},
     )
+    invalidate_cached_user(user_id)
+    return result
 
 
 async def set_user_otp_secret_validated(user_id: PyObjectId):
-    return await db.users.update_one(
+    result = await db.users.update_one(
         {"_id": str(user_id)},
         {"$set": {"otp_validated": True}},
     )
+    invalidate_cached_user(user_id)
+    return result
@@ -2,6 +2,7 @@ from fastapi.encoders import jsonable_encoder
 
 from core.exceptions import UniqueConstraintFailedException, DoesNotExistException
 from core.dao.database import db
+from core.dao.model_storage import insert_model
 from core.dao.users import get_user, user_exists
 from core.schemas.models import create_new_demo_model, Model
 from core.schemas.utils import PyObjectId
@@ -9,11 +10,11 @@ from core.schemas.workspaces import Workspace, WorkspaceUser
 
 
 async def workspace_exists(workspace_id: PyObjectId):
-    return await get_workspace(workspace_id) is not None
+    return await db.workspaces.count_documents({"_id": str(workspace_id)}, limit=1) > 0
 
 
 async def workspace_name_exists(workspace_name: str):
-    return await get_workspace_by_name(workspace_name) is not None
+    return await db.workspaces.count_documents({"name": workspace_name}, limit=1) > 0
 
 
 async def get_workspace(workspace_id: PyObjectId):
@@ -47,6 +48,37 @@ async def get_workspaces_of_user(user_id: PyObjectId):
     return lis
 
 
+async def get_workspace_revisions_of_user(user_id: PyObjectId) -> list[tuple]:
+    """
+    Return the ids and revisions of all workspaces that the user is a member of,
+    in the order of get_workspaces_of_user, without fetching the workspaces.
+    :param user_id: user id of the user
+    """
+    cursor = db.workspaces.find({"users": str(user_id)}, {"revision": 1})
+    return [(w["_id"], w.get("revision", 0)) for w in await cursor.to_list(length=None)]
+
+
+async def get_workspace_users_version(workspace_id: PyObjectId) -> list | None:
+    """
+    Return the revision of a workspace and the listed fields of its users, which
+    change whenever get_users_of_workspace does. Cheaper than the full user list.
+    :param workspace_id: ID of the workspace
+    :return: version or None if the workspace does not exist
+    """
+    wsp = await db.workspaces.find_one(
+        {"_id": str(workspace_id)}, {"revision": 1, "users": 1, "admin": 1}
+    )
+    if wsp is None:
+        return None
+
+    user_ids = sorted({*wsp["users"], wsp["admin"]})
+    cursor = db.users.find(
+        {"_id": {"$in": user_ids}},
+        {"username": 1, "first_name": 1, "last_name": 1},
+    ).sort("_id")
+    return [wsp.get("revision", 0), wsp["admin"], await cursor.to_list(length=None)]
+
+
 async def get_users_of_workspace(workspace_id: PyObjectId):
     # get unique users
     wsp = await get_workspace(workspace_id)
@@ -90,7 +122,8 @@ async def is_user_in_workspace(user_id: PyObjectId, workspace_id: PyObjectId):
             {
                 "_id": str(workspace_id),
                 "$or": [{"admin": str(user_id)}, {"users": str(user_id)}],
-            }
+            },
+            limit=1,
         )
         > 0
     )
@@ -104,7 +137,7 @@ async def is_user_admin_of_workspace(user_id: PyObjectId, workspace_id: PyObject
     """
     return (
         await db.workspaces.count_documents(
-            {"_id": str(workspace_id), "admin": str(user_id)}
+            {"_id": str(workspace_id), "admin": str(user_id)}, limit=1
         )
         > 0
     )
@@ -131,7 +164,7 @@ async def create_workspace(workspace: Workspace):
     # insert the demo model
     demo_model = await get_demo_model()
     model = create_new_demo_model(workspace.admin, workspace.id, demo_model)
-    await db.models.insert_one(jsonable_encoder(model))
+    await insert_model(jsonable_encoder(model))
 
     return await db.workspaces.insert_one(jsonable_encoder(workspace))
 
@@ -146,13 +179,14 @@ async def change_workspace_admin(workspace_id: PyObjectId, user_id: PyObjectId):
         raise DoesNotExistException("User does not exist")
 
     await db.workspaces.update_one(
-        {"_id": str(workspace_id)}, {"$set": {"admin": str(user_id)}}
+        {"_id": str(workspace_id)},
+        {"$set": {"admin": str(user_id)}, "$inc": {"revision": 1}},
     )
 
     # add the new admin as admin to all models of the workspace
     await db.models.update_many(
         {"meta.workspace": str(workspace_id), "meta.admins": {"$ne": str(user_id)}},
-        {"$push": {"meta.admins": str(user_id)}},
+        {"$push": {"meta.admins": str(user_id)}, "$inc": {"meta.revision": 1}},
     )
 
 
@@ -164,7 +198,8 @@ async def change_workspace_name(workspace_id: PyObjectId, new_name: str):
         raise UniqueConstraintFailedException("Workspace name must be unique")
 
     await db.workspaces.update_one(
-        {"_id": str(workspace_id)}, {"$set": {"name": new_name}}
+        {"_id": str(workspace_id)},
+        {"$set": {"name": new_name}, "$inc": {"revision": 1}},
     )
 
     # change models
@@ -177,7 +212,8 @@ async def add_user_to_workspace(user_id: PyObjectId, workspace_id: PyObjectId):
     if not await is_user_in_workspace(user_id, workspace_id):
         # add user to workspace
         return await db.workspaces.update_one(
-            {"_id": str(workspace_id)}, {"$push": {"users": str(user_id)}}
+            {"_id": str(workspace_id)},
+            {"$push": {"users": str(user_id)}, "$inc": {"revision": 1}},
         )
 
 
@@ -16,3 +16,13 @@ class CardinalityConstraintFailedException(BaseException):
 
 class BusinessLogicException(BaseException):
     ...
+
+
+class FormulaException(BaseException):
+    ...
+
+
+class RevisionConflictException(BaseException):
+    def __init__(self, revision: int | None):
+        super().__init__(f"Model has been changed, current revision is {revision}.")
+        self.revision = revision
@@ -1,22 +1,33 @@
+import asyncio
+import uuid
 from abc import ABC, abstractmethod
-from calendar import monthrange
 from datetime import date, datetime, timezone
-from typing import Literal
+from typing import Literal, Callable, Awaitable
 
 from dateutil.relativedelta import relativedelta
 
+from core.calendar import parse_date, days_in_month
 from core.dao.integrations import (
     get_accounting_cache,
     set_accounting_cache,
     set_payroll_cache,
     get_payroll_cache,
+    acquire_integration_lease,
+    release_integration_lease,
 )
 from core.logger import logger
 from core.schemas.integrations import IntegrationProvider
-from core.schemas.models import Employee
+from core.schemas.models import Employee, HORIZON_MONTHS
 from core.schemas.cache import DataBatch, DataBatchCache, EmployeeListCache
+from core.schemas.utils import DateString
+from core.settings import get_settings
 from core.utils import last_of_same_month
 
+settings = get_settings()
+
+# seconds between cache checks while another worker holds the lease
+LEASE_POLL_INTERVAL = 0.5
+
 
 class FetchAdapter(ABC):
     """
@@ -28,6 +39,9 @@ class FetchAdapter(ABC):
     _integration: IntegrationProvider
     _api_type: Literal["accounting", "payroll"]
 
+    # fetches in progress in this process by (workspace_id, integration, cache_date)
+    _in_flight: dict[tuple[str, str, int], asyncio.Future] = {}
+
     @abstractmethod
     def __init__(self, workspace_id: str):
         self._workspace_id = workspace_id
@@ -57,7 +71,9 @@ class FetchAdapter(ABC):
         return cls._api_type
 
     @abstractmethod
-    async def get_data(self, from_date: date) -> DataBatch | list[Employee]:
+    async def get_data(
+        self, from_date: date, horizon_months: int = HORIZON_MONTHS
+    ) -> DataBatch | list[Employee]:
         """
         This is the main method called during the merging procedure to add the
         integration data to the models.
@@ -67,6 +83,7 @@ class FetchAdapter(ABC):
         or a list of employees (for payroll APIs)
         Caching should be implemented as far as possible
         :param from_date: date from which onwards to get the data
+        :param horizon_months: number of months from from_date onwards to get
         :return: DataBatch containing the data from the integration or list of employees
         """
         raise NotImplementedError("Abstract method must be implemented by child class.")
@@ -93,13 +110,7 @@ class FetchAdapter(ABC):
         :param formats: List of formats to check, e.g. ["%d %b %y", "%d %b %Y"]
         :return: datetime.date object
         """
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_string, fmt).date()
-            except ValueError:
-                continue
-
-        raise ValueError(f"Date {date_string} could not be matched.")
+        return parse_date(date_string, tuple(formats))
 
     @staticmethod
     def _get_last_month_with_31_days(the_date: date) -> date:
@@ -108,7 +119,7 @@ class FetchAdapter(ABC):
         :param the_date: original date
         :return: new date
         """
-        while monthrange(the_date.year, the_date.month)[1] != 31:
+        while days_in_month(the_date.year, the_date.month) != 31:
             the_date -= relativedelta(months=1)
         return the_date
 
@@ -140,6 +151,171 @@ class FetchAdapter(ABC):
             logger.info("getting payroll cache")
             return await self._get_cached_payroll(from_date)
 
+    @classmethod
+    def cache_policy(cls) -> tuple[int, int]:
+        """
+        Age in seconds until the cached data of the integration becomes stale and
+        until it expires. Configured per provider as <INTEGRATION>_CACHE_FRESH and
+        <INTEGRATION>_CACHE_EXPIRE, falling back to INTEGRATION_CACHE_FRESH and
+        INTEGRATION_CACHE_EXPIRE.
+        """
+        name = cls.integration().upper()
+        fresh = getattr(settings, f"{name}_CACHE_FRESH", None)
+        expire = getattr(settings, f"{name}_CACHE_EXPIRE", None)
+        return (
+            fresh if fresh is not None else settings.INTEGRATION_CACHE_FRESH,
+            expire if expire is not None else settings.INTEGRATION_CACHE_EXPIRE,
+        )
+
+    def cache_state(self, created_at: datetime) -> Literal["fresh", "stale", "expired"]:
+        """
+        Freshness of cached data: fresh data is served, stale data is served and
+        refreshed in the background, expired data is refreshed before serving.
+        :param created_at: Creation time of the cache, naive times are in UTC
+        """
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        age = (datetime.now(timezone.utc) - created_at).total_seconds()
+
+        fresh, expire = self.cache_policy()
+        if age < fresh:
+            return "fresh"
+        if age < expire:
+            return "stale"
+        return "expired"
+
+    async def get_cached_or_fetch(
+        self,
+        cache_date: int,
+        fetch: Callable[[], Awaitable[DataBatch | list[Employee]]],
+        covers: Callable[[DataBatchCache | EmployeeListCache], bool] | None = None,
+    ) -> DataBatch | list[Employee]:
+        """
+        Return the cached data or fetch it from the integration API. Stale data is
+        returned immediately while it is refreshed in the background. Concurrent
+        calls for the same workspace, integration and cache date share a single
+        fetch. If INTEGRATION_LEASE is set, this also holds across workers: only the
+        worker holding the lease fetches, the others wait for it to fill the cache.
+        A call joining a fetch that does not cover it, e.g. one for a shorter
+        horizon, fetches again once it is done.
+        :param cache_date: Date in unix format of the cache
+        :param fetch: Retrieves the data from the API and caches it
+        :param covers: Whether a cache holds all requested data, caches that do not
+            are fetched before serving like expired ones
+        :return: Data batch or employee list
+        """
+        cached = await self._get_cache_entry(cache_date)
+        if cached is not None and (covers is None or covers(cached)):
+            state = self.cache_state(cached.created_at)
+            if state == "fresh":
+                return self._cached_data(cached)
+            if state == "stale":
+                self._fetch_once(cache_date, fetch, covers)
+                return self._cached_data(cached)
+
+        # a caller giving up (e.g. timeout) must not cancel the fetch of the others
+        joined = self._flight_key(cache_date) in FetchAdapter._in_flight
+        data = await asyncio.shield(self._fetch_once(cache_date, fetch, covers))
+        if joined and covers is not None:
+            cached = await self._get_cache_entry(cache_date)
+            if cached is None or not covers(cached):
+                data = await asyncio.shield(self._fetch_once(cache_date, fetch, covers))
+        return data
+
+    async def warm_cache(self, from_date: date, horizon_months: int = HORIZON_MONTHS):
+        """
+        Make sure the cache for a date is fresh, waiting for a refresh if needed
+        :param from_date: date from which onwards to get the data
+        :param horizon_months: number of months from from_date onwards to get
+        """
+        await self.get_data(from_date, horizon_months)
+        key = self._flight_key(self._cache_date(from_date))
+        if (task := FetchAdapter._in_flight.get(key)) is not None:
+            await asyncio.shield(task)
+
+    def _flight_key(self, cache_date: int) -> tuple[str, str, int]:
+        return self.workspace_id, self.integration(), cache_date
+
+    def _fetch_once(
+        self,
+        cache_date: int,
+        fetch: Callable[[], Awaitable[DataBatch | list[Employee]]],
+        covers: Callable[[DataBatchCache | EmployeeListCache], bool] | None = None,
+    ) -> asyncio.Future:
+        key = self._flight_key(cache_date)
+        if (task := FetchAdapter._in_flight.get(key)) is None:
+            task = asyncio.ensure_future(
+                self._fetch_with_lease(cache_date, fetch, covers)
+            )
+            FetchAdapter._in_flight[key] = task
+            task.add_done_callback(lambda t: self._fetch_done(key, t))
+        return task
+
+    @staticmethod
+    def _fetch_done(key: tuple[str, str, int], task: asyncio.Future):
+        FetchAdapter._in_flight.pop(key, None)
+        # retrieve the exception, nobody may be waiting for a background refresh
+        if not task.cancelled() and (e := task.exception()) is not None:
+            logger.error(f"Fetch failed: Integration {key[1]}, workspace {key[0]}: {e}")
+
+    async def _fetch_with_lease(
+        self,
+        cache_date: int,
+        fetch: Callable[[], Awaitable[DataBatch | list[Employee]]],
+        covers: Callable[[DataBatchCache | EmployeeListCache], bool] | None = None,
+    ) -> DataBatch | list[Employee]:
+        if not settings.INTEGRATION_LEASE:
+            return await fetch()
+
+        lease = f"{self.workspace_id}:{self.integration()}:{cache_date}"
+        owner = uuid.uuid4().hex
+
+        # the lease expires eventually, so waiting is bounded
+        ttl = settings.INTEGRATION_LEASE_TTL
+        while not await acquire_integration_lease(lease, owner, ttl):
+            await asyncio.sleep(LEASE_POLL_INTERVAL)
+            if (cached := await self._get_fresh_cached(cache_date, covers)) is not None:
+                return cached
+
+        try:
+            # another worker may have refreshed the cache before the lease was acquired
+            if (cached := await self._get_fresh_cached(cache_date, covers)) is not None:
+                return cached
+            return await fetch()
+        finally:
+            await release_integration_lease(lease, owner)
+
+    async def _get_cache_entry(
+        self, from_date: int
+    ) -> DataBatchCache | EmployeeListCache | None:
+        if self.api_type() == "accounting":
+            return await get_accounting_cache(
+                self.workspace_id, self.integration(), from_date
+            )
+        elif self.api_type() == "payroll":
+            return await get_payroll_cache(
+                self.workspace_id, self.integration(), from_date
+            )
+
+    async def _get_fresh_cached(
+        self,
+        from_date: int,
+        covers: Callable[[DataBatchCache | EmployeeListCache], bool] | None = None,
+    ) -> DataBatch | list[Employee] | None:
+        cached = await self._get_cache_entry(from_date)
+        if cached is None or (covers is not None and not covers(cached)):
+            return None
+        if self.cache_state(cached.created_at) == "fresh":
+            return self._cached_data(cached)
+
+    @staticmethod
+    def _cached_data(
+        cached: DataBatchCache | EmployeeListCache,
+    ) -> DataBatch | list[Employee]:
+        if isinstance(cached, DataBatchCache):
+            return cached.to_data_batch()
+        return cached.employees
+
     async def _get_cached_accounting(self, from_date: int) -> DataBatch:
         cached = await get_accounting_cache(
             self.workspace_id, self.integration(), from_date
@@ -154,29 +330,44 @@ class FetchAdapter(ABC):
         if cached:
             return cached.employees
 
-    async def set_cached(self, data: DataBatch | list[Employee], from_date: int):
+    async def set_cached(
+        self,
+        data: DataBatch | list[Employee],
+        from_date: int,
+        fetched_at: dict[DateString, datetime] | None = None,
+    ):
         """
         This method caches a data batch for a provided date.
         The method delegates either to the caching method for data batches or to
         employee lists based on the API type
         :param data: Data batch or employee list to cache
         :param from_date: Date in unix format, converted to UTC for reproducibility
+        :param fetched_at: Time at which each month of a data batch was fetched,
+            defaults to now for all months
         """
         if self.api_type() == "accounting":
             logger.info("caching accounting")
-            return await self._set_cached_accounting(data, from_date)
+            return await self._set_cached_accounting(data, from_date, fetched_at)
         elif self.api_type() == "payroll":
             logger.info("caching payroll")
             return await self._set_cached_payroll(data, from_date)
 
-    async def _set_cached_accounting(self, data_batch: DataBatch, from_date: int):
-        cache_obj = DataBatchCache(
-            data=data_batch.data,
-            dates=data_batch.dates,
-            created_at=datetime.now().astimezone(timezone.utc),
+    async def _set_cached_accounting(
+        self,
+        data_batch: DataBatch,
+        from_date: int,
+        fetched_at: dict[DateString, datetime] | None = None,
+    ):
+        created_at = datetime.now().astimezone(timezone.utc)
+        if fetched_at is None:
+            fetched_at = {d: created_at for d in data_batch.date_strings()}
+        cache_obj = DataBatchCache.from_data_batch(
+            data_batch,
+            created_at=created_at,
             workspace_id=self.workspace_id,
             integration=self.integration(),
             from_date=from_date,
+            fetched_at=fetched_at,
         )
         return await set_accounting_cache(cache_obj)
 
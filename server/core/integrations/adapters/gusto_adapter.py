@@ -5,7 +5,7 @@ from core.integrations.adapters.adapter import FetchAdapter
 from core.integrations.oauth.gusto_oauth import gusto_integration_oauth
 from core.logger import logger
 from core.schemas.integrations import IntegrationProvider
-from core.schemas.models import Employee
+from core.schemas.models import Employee, HORIZON_MONTHS
 from core.schemas.utils import DateString
 
 
@@ -29,7 +29,9 @@ class GustoFetchAdapter(FetchAdapter):
     def api_type(cls):
         return cls._api_type
 
-    async def get_data(self, from_date: date) -> list[Employee]:
+    async def get_data(
+        self, from_date: date, horizon_months: int = HORIZON_MONTHS
+    ) -> list[Employee]:
         """
         This is the main method called during the merging procedure to add the
         integration data to the models.
@@ -38,6 +40,8 @@ class GustoFetchAdapter(FetchAdapter):
         The data must be converted into a list of Employee objects.
         Caching should be implemented as far as possible
         :param from_date: date from which onwards to get the data
+        :param horizon_months: number of months from from_date onwards to get, the
+            employees do not depend on it
         :return: DataBatch containing the data from the integration
         """
 
@@ -45,12 +49,19 @@ class GustoFetchAdapter(FetchAdapter):
         if not await workspace_has_integration(self.workspace_id, self.integration()):
             return []
 
-        # check if we can use cache
+        # use the cache or retrieve from the Gusto API
         cache_date = self._cache_date(from_date)
-        if cached := await self.get_cached(cache_date):
-            return cached
+        return await self.get_cached_or_fetch(
+            cache_date, lambda: self._fetch_data(from_date, cache_date)
+        )
 
-        # if no cache, retrieve from Xero API
+    async def _fetch_data(self, from_date: date, cache_date: int) -> list[Employee]:
+        """
+        Retrieve the employees from the Gusto API and cache them
+        :param from_date: date from which onwards to get the data
+        :param cache_date: date in unix format of the cache
+        :return: list of employees
+        """
         employees = await self._get_employees()
 
         processed = self._process_employees(employees, from_date)
@@ -65,9 +76,9 @@ class GustoFetchAdapter(FetchAdapter):
             self.workspace_id
         )
 
-        resp = await gusto_integration_oauth.oauth_app.get(
+        resp = await gusto_integration_oauth.http_client.get(
             f"v1/companies/{integration_access.tenant_id}/employees",
-            token=integration_access.token.dict(),
+            integration_access,
             headers={
                 "Accept": "application/json",
                 "Content-Type": "application/json",
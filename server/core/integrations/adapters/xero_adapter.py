@@ -1,17 +1,24 @@
 import asyncio
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 
+import numpy as np
 from dateutil.relativedelta import relativedelta
 
+from core.calendar import month_ends_array
 from core.dao.integrations import workspace_has_integration
 from core.integrations.adapters.adapter import FetchAdapter
 from core.integrations.oauth.xero_oauth import (
     xero_integration_oauth,
     API_URL_SUFFIX,
 )
-from core.schemas.cache import DataBatch
+from core.schemas.cache import DataBatch, DataBatchCache
 from core.schemas.integrations import IntegrationProvider
-from core.utils import last_of_same_month
+from core.schemas.models import HORIZON_MONTHS
+from core.schemas.utils import DateString
+from core.settings import get_settings
+from core.utils import last_of_same_month, first_of_same_month
+
+settings = get_settings()
 
 
 class XeroFetchAdapter(FetchAdapter):
@@ -34,39 +41,168 @@ class XeroFetchAdapter(FetchAdapter):
     def api_type(cls):
         return cls._api_type
 
-    async def get_data(self, from_date: date) -> DataBatch:
+    async def get_data(
+        self, from_date: date, horizon_months: int = HORIZON_MONTHS
+    ) -> DataBatch:
         """
         Retrieve and process the P&L and balance sheet data from XERO
         :param from_date: date from which onwards to get the data
+        :param horizon_months: number of months from from_date onwards to get
         :return: P&L and balance sheet data
         """
 
         # return empty batch if Xero not configured for workspace
         if not await workspace_has_integration(self.workspace_id, self.integration()):
-            return DataBatch(dates=[], data={})
+            return DataBatch.empty()
 
-        # check if we can use cache
+        # use the cache or retrieve from the Xero API
+        # models with the same cache date but a longer horizon extend the cache
         cache_date = self._cache_date(from_date)
-        if cached := await self.get_cached(cache_date):
-            return cached
+        months = self._month_ends(
+            from_date, self._window_end(from_date, horizon_months)
+        )
+        return await self.get_cached_or_fetch(
+            cache_date,
+            lambda: self._fetch_data(from_date, cache_date, horizon_months),
+            lambda cached: all(m in cached.fetched_at for m in months),
+        )
 
-        # if no cache, retrieve from Xero API
-        batches = await self._get_batches(from_date)
+    async def _fetch_data(
+        self, from_date: date, cache_date: int, horizon_months: int = HORIZON_MONTHS
+    ) -> DataBatch:
+        """
+        Retrieve the data from the Xero API and cache it. Months already cached whose
+        data is final are kept, only the remaining months are requested and merged
+        into the cached data.
+        :param from_date: date from which onwards to get the data
+        :param cache_date: date in unix format of the cache
+        :param horizon_months: number of months from from_date onwards to get
+        :return: P&L and balance sheet data
+        """
+        cached = await self._get_cache_entry(cache_date)
+        now = datetime.now(timezone.utc)
+
+        to_date = self._window_end(from_date, horizon_months)
+        refresh = self._months_to_refresh(cached, from_date, to_date, now)
+
+        batches = await self._get_batches(*refresh) if refresh else []
 
         # in case no data was available for the timeframe
-        if len(batches) == 0:
-            return DataBatch(dates=[], data={})
+        if len(batches) == 0 and cached is None:
+            return DataBatch.empty()
 
-        processed = [self._process_batch(batch) for batch in batches]
-        merged = self._merge_batches(processed)
+        if len(batches) > 0:
+            processed = [self._process_batch(batch) for batch in batches]
+            fetched = DataBatch.from_dict(**self._merge_batches(processed))
+        else:
+            fetched = DataBatch.empty()
 
-        data_batch = DataBatch(**merged)
+        data_batch = self._merge_months(cached, fetched, refresh)
+        fetched_at = dict(cached.fetched_at) if cached else {}
+        if refresh:
+            fetched_at.update({d: now for d in self._month_ends(*refresh)})
 
         # cache result
-        await self.set_cached(data_batch, cache_date)
+        await self.set_cached(data_batch, cache_date, fetched_at)
 
         return data_batch
 
+    @staticmethod
+    def _window_end(from_date: date, horizon_months: int = HORIZON_MONTHS) -> date:
+        return last_of_same_month(from_date + relativedelta(months=horizon_months - 1))
+
+    @staticmethod
+    def _month_ends(from_date: date, to_date: date) -> list[DateString]:
+        """
+        The last dates of all months between two dates, the keys of the months in
+        the cached data
+        """
+        return [
+            DateString.validate(d)
+            for d in np.datetime_as_string(month_ends_array(from_date, to_date))
+        ]
+
+    def _months_to_refresh(
+        self,
+        cached: DataBatchCache | None,
+        from_date: date,
+        to_date: date,
+        now: datetime,
+    ) -> tuple[date, date] | None:
+        """
+        The period of months that must be requested from the Xero API. A month must
+        be requested if it is not cached, or if it has started but was last fetched
+        less than XERO_MONTH_SETTLE_DAYS after its end, i.e. its data may still
+        change. Months in the future are only requested once they start.
+        :param cached: cached data, if any
+        :param from_date: date in first month of the data
+        :param to_date: date in last month of the data
+        :param now: current time
+        :return: first and last date of the period or None if all months are final
+        """
+        fetched_at = cached.fetched_at if cached else {}
+        settle = timedelta(days=settings.XERO_MONTH_SETTLE_DAYS)
+
+        months = []
+        for month_end in self._month_ends(from_date, to_date):
+            fetched = fetched_at.get(month_end)
+            if fetched is None:
+                months.append(month_end)
+                continue
+
+            # naive times are in UTC
+            if fetched.tzinfo is None:
+                fetched = fetched.replace(tzinfo=timezone.utc)
+            end = month_end.to_date()
+            started = first_of_same_month(end) <= now.date()
+            if started and fetched.date() <= end + settle:
+                months.append(month_end)
+
+        if len(months) == 0:
+            return None
+        return first_of_same_month(months[0].to_date()), months[-1].to_date()
+
+    @staticmethod
+    def _merge_months(
+        cached: DataBatchCache | None,
+        fetched: DataBatch,
+        refresh: tuple[date, date] | None,
+    ) -> DataBatch:
+        """
+        Replace the months of the cached data that were fetched again. Fetched months
+        outside of the refreshed period are ignored, the batches can start earlier.
+        :param cached: cached data, if any
+        :param fetched: data fetched from the Xero API
+        :param refresh: period of months that was requested
+        :return: merged data
+        """
+        if cached is None:
+            return fetched
+        cached_batch = cached.to_data_batch()
+
+        month_ends = XeroFetchAdapter._month_ends(*refresh) if refresh else []
+        replaced = np.array(month_ends, dtype="datetime64[D]")
+        refreshed = np.isin(fetched.dates, replaced)
+        fetched_dates = fetched.dates[refreshed]
+
+        dates = np.union1d(cached_batch.dates, fetched_dates)
+        endpoints = cached_batch.endpoints + [
+            e for e in fetched.endpoints if e not in cached_batch
+        ]
+        # gaps are NaN
+        values = np.full((len(endpoints), len(dates)), np.nan)
+
+        kept = ~np.isin(cached_batch.dates, replaced)
+        rows = np.arange(len(cached_batch.endpoints))
+        columns = np.searchsorted(dates, cached_batch.dates[kept])
+        values[np.ix_(rows, columns)] = cached_batch.values[:, kept]
+
+        rows = [endpoints.index(e) for e in fetched.endpoints]
+        columns = np.searchsorted(dates, fetched_dates)
+        values[np.ix_(rows, columns)] = fetched.values[:, refreshed]
+
+        return DataBatch(dates, endpoints, values)
+
     async def get_data_endpoints(self, from_date: date) -> list[str]:
         """
         Retrieve all data points that are available for XERO from a certain date onwards
@@ -81,7 +217,7 @@ class XeroFetchAdapter(FetchAdapter):
         # check if we can use cache of batch data
         cache_date = self._cache_date(from_date)
         if cached := await self.get_cached(cache_date):
-            return sorted(list(cached.data.keys()))
+            return sorted(cached.endpoints)
 
         # no cache available -> retrieve from Xero API and process
         batches = await self._get_batches(from_date)
@@ -101,23 +237,32 @@ class XeroFetchAdapter(FetchAdapter):
 
         return sorted(list(data_points))
 
-    async def _get_batches(self, from_date: date):
+    async def _get_batches(self, from_date: date, to_date: date | None = None):
         """
         Retrieve the batches from the Xero API
         :param from_date: Date from which on to get the batches
+        :param to_date: Date until which to get the batches, defaults to the end of
+            the default horizon starting at from_date
         :return: batches
         """
-
-        # always calculate data for 24 months
-        to_date = last_of_same_month(from_date + relativedelta(months=23))
+        if to_date is None:
+            to_date = self._window_end(from_date)
         batch_periods = self._create_batch_periods(from_date, to_date)
+        # months before the last month of a batch, only as many as requested
+        periods = [len(self._month_ends(*p)) - 1 for p in batch_periods]
 
         pl_batches = await asyncio.gather(
-            *[self._retrieve_profit_and_loss(p[0], p[1]) for p in batch_periods]
+            *[
+                self._retrieve_profit_and_loss(p[0], p[1], n)
+                for p, n in zip(batch_periods, periods)
+            ]
         )
 
         bs_batches = await asyncio.gather(
-            *[self._retrieve_balance_sheet(p[1]) for p in batch_periods]
+            *[
+                self._retrieve_balance_sheet(p[1], n)
+                for p, n in zip(batch_periods, periods)
+            ]
         )
 
         return pl_batches + bs_batches
@@ -154,9 +299,7 @@ class XeroFetchAdapter(FetchAdapter):
 
                 value_cells = cells[1:]
                 assert len(dates) == len(value_cells)
-                values = {}
-                for i in range(len(value_cells)):
-                    values[dates[i]] = float(value_cells[i]["Value"])
+                values = dict(zip(dates, (float(c["Value"]) for c in value_cells)))
 
                 assert title not in data
                 data[title] = values
@@ -189,12 +332,15 @@ class XeroFetchAdapter(FetchAdapter):
 
         return periods
 
-    async def _retrieve_profit_and_loss(self, from_date: date, to_date: date):
+    async def _retrieve_profit_and_loss(
+        self, from_date: date, to_date: date, periods: int = 11
+    ):
         """
         Retrieve the P&L data from the XERO API between two dates. The dates must be within
         365 days of each other
         :param from_date: date from which onwards to get the data
         :param to_date: date until which to get data
+        :param periods: number of months to get before the month of to_date
         :return:
         """
 
@@ -205,15 +351,15 @@ class XeroFetchAdapter(FetchAdapter):
             self.workspace_id
         )
 
-        resp = await xero_integration_oauth.oauth_app.get(
+        resp = await xero_integration_oauth.http_client.get(
             f"{API_URL_SUFFIX}Reports/ProfitAndLoss",
-            token=integration_access.token.dict(),
+            integration_access,
             params={
                 "fromDate": str(from_date),
                 "toDate": str(to_date),
                 "timeframe": "MONTH",
                 "standardLayout": True,
-                "periods": 11,
+                **self._periods_param(periods),
             },
             headers={
                 "Xero-Tenant-Id": integration_access.tenant_id,
@@ -223,11 +369,12 @@ class XeroFetchAdapter(FetchAdapter):
         resp.raise_for_status()
         return resp.json()
 
-    async def _retrieve_balance_sheet(self, to_date: date):
+    async def _retrieve_balance_sheet(self, to_date: date, periods: int = 11):
         """
         Retrieve the P&L data from the XERO API between two dates. The dates must be within
         365 days of each other
         :param to_date: date until which to get data
+        :param periods: number of months to get before the month of to_date
         :return:
         """
 
@@ -235,14 +382,14 @@ class XeroFetchAdapter(FetchAdapter):
             self.workspace_id
         )
 
-        resp = await xero_integration_oauth.oauth_app.get(
+        resp = await xero_integration_oauth.http_client.get(
             f"{API_URL_SUFFIX}Reports/BalanceSheet",
-            token=integration_access.token.dict(),
+            integration_access,
             params={
                 "date": str(to_date),
                 "timeframe": "MONTH",
                 "standardLayout": True,
-                "periods": 11,
+                **self._periods_param(periods),
             },
             headers={
                 "Xero-Tenant-Id": integration_access.tenant_id,
@@ -251,3 +398,8 @@ class XeroFetchAdapter(FetchAdapter):
         )
         resp.raise_for_status()
         return resp.json()
+
+    @staticmethod
+    def _periods_param(periods: int) -> dict:
+        # Xero only accepts 1 to 11 periods, a single month is requested without
+        return {"periods": periods} if periods > 0 else {}
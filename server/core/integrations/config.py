@@ -48,3 +48,12 @@ def setup_integrations(app: FastAPI):
     for integration_name in INTEGRATIONS:
         router = INTEGRATION_OAUTH[integration_name].router
         app.include_router(router)
+
+
+async def close_http_clients():
+    """
+    Run on application shutdown to close the pooled connections to the provider APIs.
+    """
+    for oauth in INTEGRATION_OAUTH.values():
+        if oauth.http_client is not None:
+            await oauth.http_client.aclose()
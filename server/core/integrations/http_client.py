@@ -0,0 +1,195 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from core.logger import logger
+from core.schemas.integrations import IntegrationProvider, IntegrationAccess
+from core.settings import get_settings
+
+settings = get_settings()
+
+# status codes of responses to GET requests that are retried
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class RequestMetrics:
+    """
+    Latency of the requests to the API of an integration provider by status code.
+    Requests that failed without a response are counted under status code 0.
+    """
+
+    def __init__(self):
+        self.count: dict[int, int] = {}
+        self.total: dict[int, float] = {}
+        self.max: dict[int, float] = {}
+        self.retries = 0
+
+    def record(self, status_code: int, seconds: float):
+        self.count[status_code] = self.count.get(status_code, 0) + 1
+        self.total[status_code] = self.total.get(status_code, 0) + seconds
+        self.max[status_code] = max(self.max.get(status_code, 0), seconds)
+
+    def summary(self) -> dict:
+        return {
+            "retries": self.retries,
+            "status": {
+                status_code: {
+                    "count": count,
+                    "mean": self.total[status_code] / count,
+                    "max": self.max[status_code],
+                }
+                for status_code, count in sorted(self.count.items())
+            },
+        }
+
+
+class ProviderClient:
+    """
+    HTTP client for the API of an integration provider. Connections are pooled and
+    kept alive across requests, the number of concurrent requests per tenant is
+    limited, and GET requests are retried with exponential backoff on connection
+    errors, server errors and rate limiting, honouring the Retry-After header.
+    """
+
+    def __init__(
+        self,
+        integration: IntegrationProvider,
+        base_url: str,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """
+        :param integration: Name of the integration
+        :param base_url: Base URL of the provider API, relative request URLs are
+            resolved against it
+        :param transport: Transport of the HTTP client, e.g. to send the requests to
+            a stub in tests
+        """
+        self.integration = integration
+        self.base_url = base_url
+        self.metrics = RequestMetrics()
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._tenant_semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # created on first use, so that it is bound to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=settings.INTEGRATION_HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.INTEGRATION_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.INTEGRATION_HTTP_MAX_CONNECTIONS,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self):
+        """
+        Close the pooled connections, the client is recreated on the next request
+        """
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._tenant_semaphores.clear()
+
+    def _tenant_semaphore(self, tenant_id: str) -> asyncio.Semaphore:
+        if (semaphore := self._tenant_semaphores.get(tenant_id)) is None:
+            semaphore = asyncio.Semaphore(settings.INTEGRATION_HTTP_TENANT_CONCURRENCY)
+            self._tenant_semaphores[tenant_id] = semaphore
+        return semaphore
+
+    async def get(
+        self,
+        url: str,
+        integration_access: IntegrationAccess,
+        params: dict | None = None,
+        headers: dict | None = None,
+    ) -> httpx.Response:
+        """
+        Send an authorized GET request to the provider API on behalf of a tenant
+        :param url: URL of the request, relative to the base URL
+        :param integration_access: Integration access of the workspace, provides the
+            access token and the tenant
+        :param params: Query parameters
+        :param headers: Additional headers
+        :return: Response of the last attempt
+        """
+        headers = {
+            **(headers or {}),
+            "Authorization": f"Bearer {integration_access.token.access_token}",
+        }
+
+        # workspaces without tenant share one limit
+        tenant_id = integration_access.tenant_id or integration_access.workspace_id
+        async with self._tenant_semaphore(tenant_id):
+            return await self._get_with_retries(url, params, headers)
+
+    async def _get_with_retries(
+        self, url: str, params: dict | None, headers: dict
+    ) -> httpx.Response:
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = await self.client.get(url, params=params, headers=headers)
+            except httpx.TransportError as e:
+                self._record(url, 0, time.perf_counter() - start)
+                if attempt >= settings.INTEGRATION_HTTP_RETRIES:
+                    raise
+                delay = self._backoff(attempt)
+                logger.info(f"{self.integration} GET {url} failed: {e}")
+            else:
+                self._record(url, response.status_code, time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUS:
+                    return response
+                if attempt >= settings.INTEGRATION_HTTP_RETRIES:
+                    return response
+
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                elif delay > settings.INTEGRATION_HTTP_MAX_RETRY_AFTER:
+                    # waiting that long would exceed the timeout of the callers
+                    return response
+
+            self.metrics.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _record(self, url: str, status_code: int, seconds: float):
+        self.metrics.record(status_code, seconds)
+        logger.debug(f"{self.integration} GET {url}: {status_code} in {seconds:.3f}s")
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """
+        Exponential backoff with full jitter
+        """
+        return random.uniform(0, settings.INTEGRATION_HTTP_BACKOFF * 2**attempt)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> float | None:
+        """
+        Seconds to wait before retrying as requested by the Retry-After header,
+        which holds either seconds or an HTTP date
+        """
+        if (value := response.headers.get("Retry-After")) is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -1,41 +1,46 @@
+import asyncio
+import math
 import re
-from datetime import date, datetime
+from datetime import date
+from typing import Literal
 
+import numpy as np
 from dateutil.relativedelta import relativedelta
 
-from core.dao.integrations import workspace_has_integration
+from core.calendar import month_ends_array, to_datetime64
+from core.integrations.adapters.adapter import FetchAdapter
 from core.integrations.config import ADAPTERS
 from core.logger import logger
 from core.schemas.integrations import IntegrationProvider
-from core.schemas.models import Employee
+from core.schemas.models import Employee, HORIZON_MONTHS
 from core.schemas.rows import Row, DateValue
 from core.schemas.sheets import Sheet
 from core.schemas.cache import DataBatch
-from core.utils import (
-    last_of_same_month,
-    first_of_same_month,
-    number_of_overlapping_days,
-    share_of_period,
-)
+from core.settings import get_settings
+
+settings = get_settings()
 
 
 async def merge_accounting_integration_data(
-    sheet: Sheet, workspace_id: str, from_date: date
+    sheet: Sheet,
+    workspace_id: str,
+    from_date: date,
+    horizon_months: int = HORIZON_MONTHS,
 ):
     """
-    Adds the integration values to a sheet inplace.
+    Adds the integration values to a sheet inplace. The data of all accounting
+    integrations is retrieved concurrently. Rows of integrations that fail or time
+    out have no integration values.
     :param sheet:
     :param workspace_id:
     :param from_date:
+    :param horizon_months: number of months from from_date onwards to get
     :return:
     """
 
-    data_batches: dict[IntegrationProvider, DataBatch] = {}
-
-    for integration in ADAPTERS.keys():
-        adapter = ADAPTERS[integration](workspace_id)
-        if adapter.api_type() == "accounting":
-            data_batches[integration] = await adapter.get_data(from_date)
+    data_batches: dict[IntegrationProvider, DataBatch] = await get_adapter_data(
+        workspace_id, from_date, "accounting", horizon_months
+    )
 
     # assumptions
     for row in sheet.assumptions:
@@ -54,24 +59,75 @@ async def merge_payroll_integration_data(
     employees: list[Employee], workspace_id: str, from_date: date
 ):
     """
-    Adds the integration values to a list of employees in place
+    Adds the integration values to a list of employees in place. The data of all
+    payroll integrations is retrieved concurrently. Integrations that fail or time
+    out add no employees.
     :param employees:
     :param workspace_id:
     :param from_date:
     :return:
     """
-    for integration in ADAPTERS.keys():
-        adapter = ADAPTERS[integration](workspace_id)
-        if adapter.api_type() == "payroll" and await workspace_has_integration(
-            workspace_id, adapter.integration()
-        ):
-            employees_from_adapter = await adapter.get_data(from_date)
-            for e in employees_from_adapter:
-                employees.insert(0, e)
+    employee_lists = await get_adapter_data(workspace_id, from_date, "payroll")
+
+    for employees_from_adapter in employee_lists.values():
+        for e in employees_from_adapter:
+            employees.insert(0, e)
 
     return employees
 
 
+async def get_adapter_data(
+    workspace_id: str,
+    from_date: date,
+    api_type: Literal["accounting", "payroll"],
+    horizon_months: int = HORIZON_MONTHS,
+) -> dict[IntegrationProvider, DataBatch | list[Employee]]:
+    """
+    Retrieve the data of all adapters of an API type concurrently.
+    :param workspace_id: ID of the workspace
+    :param from_date: date from which onwards to get the data
+    :param api_type: API type of the adapters
+    :param horizon_months: number of months from from_date onwards to get
+    :return: dictionary mapping the integrations to their data, integrations that
+        failed or timed out are not included
+    """
+    adapters = [create_adapter(workspace_id) for create_adapter in ADAPTERS.values()]
+    adapters = [adapter for adapter in adapters if adapter.api_type() == api_type]
+
+    results = await asyncio.gather(
+        *[
+            _get_data_with_timeout(adapter, from_date, horizon_months)
+            for adapter in adapters
+        ]
+    )
+
+    return {
+        adapter.integration(): result
+        for adapter, result in zip(adapters, results)
+        if result is not None
+    }
+
+
+async def _get_data_with_timeout(
+    adapter: FetchAdapter, from_date: date, horizon_months: int
+) -> DataBatch | list[Employee] | None:
+    try:
+        return await asyncio.wait_for(
+            adapter.get_data(from_date, horizon_months),
+            timeout=settings.INTEGRATION_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        logger.error(
+            f"Timeout: Integration {adapter.integration()}, "
+            f"workspace {adapter.workspace_id}"
+        )
+    except Exception as e:
+        logger.error(
+            f"Failed: Integration {adapter.integration()}, "
+            f"workspace {adapter.workspace_id}: {e}"
+        )
+
+
 def aggregate_payroll_info(
     employees: list[Employee], from_date: date, to_date: date = date.today()
 ):
@@ -83,35 +139,57 @@ def aggregate_payroll_info(
     return values
 
 
-def total_salary_per_month(months: list[date], employees: list[Employee]):
-    month_salary_map = {m: 0 for m in months}
-    for eom in months:
-        som = first_of_same_month(eom)
-        for e in employees:
-            if e.end_date is None:
-                end_point = eom + relativedelta(months=1)
-            else:
-                end_point = e.end_date.to_date()
-            overlap = number_of_overlapping_days(
-                (som, eom), (e.start_date.to_date(), end_point)
-            )
-            if overlap > 0:
-                share = share_of_period(overlap, (som, eom))
-                month_salary_map[eom] += share * e.monthly_salary
-    return month_salary_map
+def total_salary_per_month(
+    months: list[date], employees: list[Employee]
+) -> dict[date, float]:
+    """
+    Total salary of the employees per month. Employees who start or leave during a
+    month are paid the share of the month's days they are employed, both the start
+    and end date count as employed. Employees without end date stay employed.
+    :param months: last day of each month
+    :param employees: list of employees
+    :return: dictionary mapping the months to the total salary
+    """
+    if len(months) == 0 or len(employees) == 0:
+        return {m: 0 for m in months}
+
+    month_ends = to_datetime64(months)
+    month_starts = month_ends.astype("datetime64[M]").astype("datetime64[D]")
+    month_days = (month_ends - month_starts).astype(int) + 1
+
+    starts = np.array([e.start_date for e in employees], dtype="datetime64[D]")
+    ends = np.array(
+        [e.end_date if e.end_date is not None else "NaT" for e in employees],
+        dtype="datetime64[D]",
+    )
+    # open-ended employment covers every month
+    ends[np.isnat(ends)] = month_ends.max()
+    salaries = np.array([e.monthly_salary for e in employees], dtype=float)
+
+    # employees x months matrix of the number of days employed in the month
+    overlap = (
+        np.minimum(month_ends[None, :], ends[:, None])
+        - np.maximum(month_starts[None, :], starts[:, None])
+    ).astype(int) + 1
+    shares = np.clip(overlap, 0, None) / month_days[None, :]
+
+    totals = salaries @ shares
+    return dict(zip(months, totals.tolist()))
+
+
+def horizon_months_list(starting_month: date, horizon_months: int) -> list[date]:
+    """
+    Last day of each month of a model's horizon
+    :param starting_month: first month of the model
+    :param horizon_months: number of months
+    :return: list of dates
+    """
+    to_date = starting_month + relativedelta(months=horizon_months - 1)
+    return months_list_from_date(starting_month, to_date)
 
 
 def months_list_from_date(from_date: date, to_date: date = date.today()) -> list[date]:
-    from_date = last_of_same_month(from_date)
-    to_date = last_of_same_month(to_date)
-
-    months = []
-    date_it = from_date
-    while date_it <= to_date:
-        months.append(date_it)
-        date_it = last_of_same_month(date_it + relativedelta(months=1))
-
-    return months
+    return month_ends_array(from_date, to_date).tolist()
 
 
 def parse_value(value_string: str) -> tuple[IntegrationProvider, str]:
@@ -142,16 +220,15 @@ def process_row(row: Row, data_batches: dict[IntegrationProvider, DataBatch]) ->
     :return:
     """
     if row.var_type != "integration":
+        # derived on every read, values sent by a client are not echoed back
+        row.integration_values = None
         return row
 
     # catch error here?
     integration, endpoint = parse_value(row.integration_name)
 
     # integration must be supported
-    if (
-        integration not in data_batches
-        or endpoint not in data_batches[integration].data
-    ):
+    if integration not in data_batches or endpoint not in data_batches[integration]:
         logger.error(
             f"Unification mismatch: Integration {integration}, endpoint {endpoint}"
         )
@@ -159,13 +236,11 @@ def process_row(row: Row, data_batches: dict[IntegrationProvider, DataBatch]) ->
 
     # this is the standard case
     else:
-        # use sorted dates to retrieve the IntegrationValues
+        data_batch = data_batches[integration]
+        # the values are validated floats, no need to validate them again
         integration_values = [
-            DateValue(
-                date=datetime.strptime(timestamp, "%Y-%m-%d").date(),
-                value=data_batches[integration].data[endpoint][timestamp],
-            )
-            for timestamp in data_batches[integration].dates
+            DateValue.construct(date=d, value=None if math.isnan(v) else str(v))
+            for d, v in zip(data_batch.date_list, data_batch.series(endpoint).tolist())
         ]
 
     row.integration_values = integration_values
@@ -1,3 +1,4 @@
+import asyncio
 import time
 from abc import ABC, abstractmethod
 
@@ -9,7 +10,8 @@ from starlette.responses import HTMLResponse
 
 from api.utils.assertions import assert_workspace_access
 from api.utils.dependencies import get_current_active_user_url
-from core.dao.integrations import get_integration_for_workspace
+from core.dao.integrations import get_cached_integration_for_workspace
+from core.integrations.http_client import ProviderClient
 from core.schemas.integrations import (
     IntegrationProvider,
     IntegrationAccess,
@@ -31,6 +33,8 @@ class IntegrationOAuth(ABC):
     def __init__(self):
         self.oauth = OAuth()
         self.oauth_app = None
+        self.http_client: ProviderClient | None = None
+        self._refresh_locks: dict[str, asyncio.Lock] = {}
         self.router = APIRouter()
 
     def login_endpoint(self) -> dict:
@@ -89,9 +93,11 @@ class IntegrationOAuth(ABC):
         https://docs.authlib.org/en/v0.13/client/frameworks.html#using-oauth-2-0-to-log-in
 
         After registering, the OAuth app is available as an instance variable as
-        IntegrationAccess.oauth_app.
+        IntegrationAccess.oauth_app, and a pooled client for requests to the API at
+        api_base_url as IntegrationAccess.http_client.
         """
         self.oauth_app = self.oauth.register(**kwargs)
+        self.http_client = ProviderClient(self.integration(), kwargs["api_base_url"])
 
     @abstractmethod
     async def _perform_token_refresh(
@@ -126,16 +132,30 @@ class IntegrationOAuth(ABC):
         :param workspace_id: ID of the workspace
         :return: integration access.
         """
-        integration_access = await get_integration_for_workspace(
+        integration_access = await get_cached_integration_for_workspace(
             workspace_id, self.integration()
         )
 
         # requires refresh if less than 60 seconds left before expiration
         if integration_access.has_expired():
-            integration_access = await self._perform_token_refresh(integration_access)
+            # only one refresh per workspace, the others wait for the new token
+            async with self._refresh_lock(workspace_id):
+                integration_access = await get_cached_integration_for_workspace(
+                    workspace_id, self.integration()
+                )
+                if integration_access.has_expired():
+                    integration_access = await self._perform_token_refresh(
+                        integration_access
+                    )
 
         return integration_access
 
+    def _refresh_lock(self, workspace_id: str) -> asyncio.Lock:
+        if (lock := self._refresh_locks.get(workspace_id)) is None:
+            lock = asyncio.Lock()
+            self._refresh_locks[workspace_id] = lock
+        return lock
+
     async def oauth_login(
         self,
         workspace_id: str,
@@ -0,0 +1,106 @@
+import asyncio
+import random
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+from core.dao.integrations import get_connected_integrations
+from core.dao.models import get_model_windows_for_workspace
+from core.integrations.adapters.adapter import FetchAdapter
+from core.integrations.config import ADAPTERS
+from core.logger import logger
+from core.settings import get_settings
+from core.utils import first_of_same_month
+
+settings = get_settings()
+
+_scheduler: asyncio.Task | None = None
+
+
+async def prewarm_caches():
+    """
+    Refresh the caches of all connected integrations for the starting months of the
+    models of their workspaces, so that requests find fresh data. Caches that are
+    still fresh are not fetched again.
+    """
+    semaphore = asyncio.Semaphore(settings.INTEGRATION_PREWARM_CONCURRENCY)
+    jobs = []
+
+    for workspace_id, integration in await get_connected_integrations():
+        if integration not in ADAPTERS:
+            continue
+
+        windows = await get_model_windows_for_workspace(workspace_id)
+        for from_date, horizon_months in _cache_windows(windows):
+            adapter = ADAPTERS[integration](workspace_id)
+            jobs.append(_prewarm_cache(semaphore, adapter, from_date, horizon_months))
+
+    await asyncio.gather(*jobs)
+
+
+def _cache_windows(windows: list[tuple[date, int]]) -> list[tuple[date, int]]:
+    """
+    Models whose starting months map to the same cache date share the cache, which
+    must cover the months of all of them.
+    :param windows: starting months and horizons of the models
+    :return: first month and number of months to warm per cache date
+    """
+    spans: dict[int, tuple[date, date]] = {}
+    for starting_month, horizon_months in windows:
+        start = first_of_same_month(starting_month)
+        end = start + relativedelta(months=horizon_months - 1)
+        cache_date = FetchAdapter._cache_date(starting_month)
+        if cache_date in spans:
+            start = min(start, spans[cache_date][0])
+            end = max(end, spans[cache_date][1])
+        spans[cache_date] = (start, end)
+
+    return [
+        (start, (end.year - start.year) * 12 + end.month - start.month + 1)
+        for start, end in spans.values()
+    ]
+
+
+async def _prewarm_cache(
+    semaphore: asyncio.Semaphore,
+    adapter: FetchAdapter,
+    from_date: date,
+    horizon_months: int,
+):
+    await asyncio.sleep(random.uniform(0, settings.INTEGRATION_PREWARM_JITTER))
+    async with semaphore:
+        try:
+            await adapter.warm_cache(from_date, horizon_months)
+        except Exception as e:
+            logger.error(
+                f"Prewarm failed: Integration {adapter.integration()}, "
+                f"workspace {adapter.workspace_id}: {e}"
+            )
+
+
+async def _run_scheduler():
+    while True:
+        try:
+            await prewarm_caches()
+        except Exception as e:
+            logger.error(f"Prewarm failed: {e}")
+
+        jitter = random.uniform(0, settings.INTEGRATION_PREWARM_JITTER)
+        await asyncio.sleep(settings.INTEGRATION_PREWARM_INTERVAL + jitter)
+
+
+def start_scheduler():
+    """
+    Start refreshing the integration caches in the background every
+    INTEGRATION_PREWARM_INTERVAL seconds. Does nothing if the interval is 0.
+    """
+    global _scheduler
+    if settings.INTEGRATION_PREWARM_INTERVAL > 0 and _scheduler is None:
+        _scheduler = asyncio.create_task(_run_scheduler())
+
+
+def stop_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.cancel()
+        _scheduler = None
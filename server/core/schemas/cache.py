@@ -1,6 +1,9 @@
-from datetime import datetime
+from datetime import datetime, date
+from functools import cached_property
+from typing import Literal
 
-from pydantic import BaseModel
+import numpy as np
+from pydantic import BaseModel, root_validator
 
 from core.schemas.integrations import IntegrationProvider
 from core.schemas.models import Employee
@@ -17,42 +20,141 @@ class EmployeeListCache(BaseModel):
 
 TimeSeriesDict = dict[DateString, float | None]
 
+# byte layout of the arrays of a data batch in the cache
+DAYS_DTYPE = np.dtype("<i4")
+VALUES_DTYPE = np.dtype("<f8")
 
-class DataBatch(BaseModel):
-    dates: list[DateString]
-    data: dict[str, TimeSeriesDict]
-
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        schema_extra = {
-            "example": {
-                "dates": [
-                    "2020-31-01",
-                    "2020-31-02",
-                    "2020-31-03",
-                ],
-                "data": {
-                    "Sales": {
-                        "2020-31-01": 111,
-                        "2020-31-02": 222,
-                        "2020-31-03": 333,
-                    },
-                    "Total Income": {
-                        "2020-31-01": 111,
-                        "2020-31-02": 222,
-                        "2020-31-03": 333,
-                    },
-                },
+
+class DataBatch:
+    """
+    Data of an accounting integration in columnar form: one sorted axis of dates
+    shared by all endpoints and a float64 matrix with one row of values per
+    endpoint. Missing values are NaN.
+    """
+
+    def __init__(self, dates: np.ndarray, endpoints: list[str], values: np.ndarray):
+        """
+        :param dates: sorted dates as datetime64[D]
+        :param endpoints: names of the endpoints, one per row of values
+        :param values: values of shape (len(endpoints), len(dates))
+        """
+        assert values.shape == (len(endpoints), len(dates))
+        self.dates = dates
+        self.endpoints = endpoints
+        self.values = values
+        self._rows = {endpoint: i for i, endpoint in enumerate(endpoints)}
+
+    @classmethod
+    def empty(cls) -> "DataBatch":
+        return cls(np.array([], dtype="datetime64[D]"), [], np.empty((0, 0)))
+
+    @classmethod
+    def from_dict(
+        cls, dates: list[str | date], data: dict[str, TimeSeriesDict]
+    ) -> "DataBatch":
+        """
+        Build a batch from one dict of values by date per endpoint. Dates missing
+        from the dict of an endpoint are NaN.
+        """
+        axis = np.array(sorted(set(dates)), dtype="datetime64[D]")
+        keys = [str(d) for d in axis.astype(object)]
+        values = np.full((len(data), len(axis)), np.nan)
+        for row, timeseries in zip(values, data.values()):
+            for i, key in enumerate(keys):
+                if (value := timeseries.get(key)) is not None:
+                    row[i] = value
+        return cls(axis, list(data), values)
+
+    def to_dict(self) -> dict[str, TimeSeriesDict]:
+        """
+        The values as one dict of values by date per endpoint, None where missing.
+        """
+        keys = self.date_strings()
+        return {
+            endpoint: {
+                key: None if np.isnan(value) else value
+                for key, value in zip(keys, row.tolist())
             }
+            for endpoint, row in zip(self.endpoints, self.values)
         }
 
+    @classmethod
+    def from_buffers(cls, days: bytes, endpoints: list[str], values: bytes):
+        """
+        Read-only batch backed by the buffers of a cached batch, without copying.
+        """
+        axis = np.frombuffer(days, DAYS_DTYPE).astype("datetime64[D]")
+        matrix = np.frombuffer(values, VALUES_DTYPE)
+        return cls(axis, endpoints, matrix.reshape(len(endpoints), len(axis)))
+
+    def to_buffers(self) -> dict:
+        return {
+            "days": self.dates.astype(DAYS_DTYPE).tobytes(),
+            "endpoints": list(self.endpoints),
+            "values": self.values.astype(VALUES_DTYPE).tobytes(),
+        }
+
+    def __contains__(self, endpoint: str) -> bool:
+        return endpoint in self._rows
+
+    def series(self, endpoint: str) -> np.ndarray:
+        """
+        View of the values of an endpoint, aligned with the dates.
+        """
+        return self.values[self._rows[endpoint]]
+
+    def date_strings(self) -> list[DateString]:
+        return [DateString(d) for d in np.datetime_as_string(self.dates)]
 
-class DataBatchCache(DataBatch):
+    @cached_property
+    def date_list(self) -> list[date]:
+        return self.dates.astype(object).tolist()
+
+    def __eq__(self, other):
+        if not isinstance(other, DataBatch):
+            return NotImplemented
+        return (
+            self.endpoints == other.endpoints
+            and np.array_equal(self.dates, other.dates)
+            and np.array_equal(self.values, other.values, equal_nan=True)
+        )
+
+    def __repr__(self):
+        return f"DataBatch(dates={len(self.dates)}, endpoints={self.endpoints})"
+
+
+class DataBatchCache(BaseModel):
     integration: IntegrationProvider
     workspace_id: str
     created_at: datetime
     from_date: int
+    # buffers of the data batch, see DataBatch.to_buffers
+    days: bytes = b""  # dates as days since the epoch
+    endpoints: list[str] = []
+    values: bytes = b""  # row-major matrix of values per endpoint and date
+    # time at which the data of each month was last fetched from the integration
+    fetched_at: dict[DateString, datetime] = {}
+
+    @root_validator(pre=True)
+    def convert_data(cls, values):
+        # caches written before the columnar format store a dict per endpoint
+        if "data" in values:
+            values = dict(values)
+            data_batch = DataBatch.from_dict(values.pop("dates"), values.pop("data"))
+            values.update(data_batch.to_buffers())
+        return values
+
+    @classmethod
+    def from_data_batch(cls, data_batch: DataBatch, **fields) -> "DataBatchCache":
+        return cls(**data_batch.to_buffers(), **fields)
 
     def to_data_batch(self) -> DataBatch:
-        return DataBatch(dates=self.dates, data=self.data)
+        return DataBatch.from_buffers(self.days, self.endpoints, self.values)
+
+
+class CalculationCache(BaseModel):
+    model_id: str
+    kind: Literal["profit_loss", "dashboard"]
+    key: str  # hash of the model content and the integration cache versions
+    created_at: datetime
+    data: dict
@@ -9,6 +9,10 @@ from core.schemas.rows import DateValue
 from core.schemas.utils import PyObjectId, DateString
 from core.schemas.sheets import Sheet
 
+# default and maximum number of months that are calculated for a model
+HORIZON_MONTHS = 24
+MAX_HORIZON_MONTHS = 60
+
 
 class Employee(BaseModel):
     id: str = Field(default_factory=lambda: str(int(uuid.uuid4())), alias="_id")
@@ -44,6 +48,8 @@ class ModelMeta(BaseModel):
     workspace: PyObjectId  # workspace id
     starting_month: date
     starting_balance: float = 0
+    horizon_months: int = Field(HORIZON_MONTHS, ge=1, le=MAX_HORIZON_MONTHS)
+    revision: int = 0  # incremented on every change of the model document
 
     class Config:
         allow_population_by_field_name = True
@@ -75,12 +81,15 @@ class UpdateModel(BaseModel):
         json_encoders = {ObjectId: str}
 
 
+ModelRole = Literal["Admin", "Editor", "Viewer"]
+
+
 class ModelUser(BaseModel):
     id: str = Field(alias="_id")
     username: str
     first_name: str | None
     last_name: str | None
-    user_role: Literal["Admin", "Editor", "Viewer"]
+    user_role: ModelRole
 
 
 def create_new_demo_model(
@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+
+
+class ProfitLossRow(BaseModel):
+    name: str
+    values: list[float | None]
+
+
+class GrossIncome(BaseModel):
+    revenue_streams: list[ProfitLossRow]
+    total: ProfitLossRow
+
+
+class ProfitLoss(BaseModel):
+    gross_income: GrossIncome
+    cost_of_goods_sold: ProfitLossRow
+    gross_margin: ProfitLossRow
+    payroll_cost: ProfitLossRow
+    operating_cost: ProfitLossRow
+    operating_income: ProfitLossRow
+    other_cost: ProfitLossRow
+    net_income: ProfitLossRow
+
+
+class DashboardSeriesElement(BaseModel):
+    name: str
+    data: list[tuple[int, float | None]]  # (unix timestamp in ms, value)
+
+
+class DashboardData(BaseModel):
+    profit: list[DashboardSeriesElement]
+    cash_balance: list[DashboardSeriesElement]
+    revenues: list[DashboardSeriesElement]
+    costs: list[DashboardSeriesElement]
+    payroll_costs: list[DashboardSeriesElement]
+    headcount: list[DashboardSeriesElement]
@@ -1,7 +1,8 @@
+from datetime import date
 from typing import Literal
 
 from bson import ObjectId
-from pydantic import BaseModel
+from pydantic import BaseModel, root_validator
 from core.schemas.rows import Row
 
 
@@ -26,6 +27,46 @@ class Sheet(BaseModel):
         json_encoders = {ObjectId: str}
 
 
+class SheetValues(BaseModel):
+    meta: SheetMeta
+    dates: list[date]
+    values: dict[str, list[float | None]]  # row id -> calculated value per month
+
+
+class RowOperation(BaseModel):
+    """
+    Change of a single row of a sheet. Rows are referenced by their id, positions by
+    the index of the section (None for the assumptions) and the index in its rows.
+    """
+
+    op: Literal["add", "update", "delete", "move"]
+    row_id: str | None  # row to update, delete or move
+    row: Row | None  # data of the row to add or update
+    section: int | None  # target of add and move, None for the assumptions
+    position: int | None  # index in the target rows, None to append
+
+    @root_validator(skip_on_failure=True)
+    def check_operands(cls, values):
+        if values["op"] != "add" and values["row_id"] is None:
+            raise ValueError(f"{values['op']} requires a row_id")
+        if values["op"] in ("add", "update") and values["row"] is None:
+            raise ValueError(f"{values['op']} requires a row")
+        if values["position"] is not None and values["position"] < 0:
+            raise ValueError("position must not be negative")
+        return values
+
+
+class SheetPatch(BaseModel):
+    operations: list[RowOperation]
+
+
+class SheetPatchResult(BaseModel):
+    meta: SheetMeta
+    rows: list[Row]  # added, updated and moved rows
+    deleted: list[str]  # ids of the deleted rows
+    revision: int  # revision of the model after the changes
+
+
 def create_default_sheets():
 
     new_empty_row = dict(
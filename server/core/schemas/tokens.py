@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -8,6 +10,7 @@ class Token(BaseModel):
 
 class BlacklistToken(BaseModel):
     access_token: str
+    expires_at: datetime | None = None  # exp claim of the token in UTC
 
 
 class TokenData(BaseModel):
@@ -1,10 +1,14 @@
 from datetime import datetime, date
+from functools import lru_cache
+from typing import Any, Literal, TypeVar, get_args, get_origin
 
 from bson import ObjectId
 from fastapi.security import OAuth2PasswordRequestForm
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from pydantic.fields import ModelField, SHAPE_LIST, SHAPE_SINGLETON
 from fastapi.param_functions import Form
 
+from core.calendar import parse_date
 from core.schemas.integrations import IntegrationProvider
 
 
@@ -66,6 +70,11 @@ class OAuth2PasswordRequestFormWithOTP(OAuth2PasswordRequestForm):
 
 
 class DateString(str):
+    """
+    Date in the format YYYY-MM-DD. Validated date strings are interned and keep
+    their parsed date.
+    """
+
     @classmethod
     def __get_validators__(cls):
         yield cls.validate
@@ -74,21 +83,31 @@ class DateString(str):
     def validate(cls, v: str | date):
         if not isinstance(v, str) and not isinstance(v, date):
             raise TypeError("string or datetime.date required")
-        if isinstance(v, str):
-            try:
-                datetime.strptime(v, "%Y-%m-%d")
-            except ValueError:
-                raise ValueError(f"invalid date string format: {v}")
-            return cls(v)
-        return v.strftime("%Y-%m-%d")
-
-    def to_date(self):
-        return datetime.strptime(self, "%Y-%m-%d").date()
+        if isinstance(v, date):
+            v = v.strftime("%Y-%m-%d")
+        try:
+            return _interned_date_string(v)
+        except ValueError:
+            raise ValueError(f"invalid date string format: {v}")
+
+    def to_date(self) -> date:
+        try:
+            return self._date
+        except AttributeError:
+            self._date = parse_date(self)
+            return self._date
 
     def __repr__(self):
         return f"{super().__repr__()}"
 
 
+@lru_cache(maxsize=65536)
+def _interned_date_string(value: str) -> DateString:
+    date_string = DateString(value)
+    date_string._date = parse_date(value)
+    return date_string
+
+
 class PyObjectId(ObjectId):
     """
     MongoDB ObjectId converter.
@@ -107,3 +126,57 @@ class PyObjectId(ObjectId):
     @classmethod
     def __modify_schema__(cls, field_schema):
         field_schema.update(type="string")
+
+
+M = TypeVar("M", bound=BaseModel)
+
+# field types whose stored values are used as they are by construct_trusted
+_TRUSTED_TYPES = (str, int, bool)
+
+
+def construct_trusted(model: type[M], data: dict) -> M:
+    """
+    Build a model from data that has been validated before, e.g. a document which
+    was written from the same model. Nested models are constructed recursively and
+    values of plain types are taken as they are, only the remaining fields (dates,
+    ids, ...) are validated. Much faster than validating large documents.
+    """
+    values = {}
+    for name, field in model.__fields__.items():
+        if field.alias in data:
+            value = data[field.alias]
+        elif name in data:
+            value = data[name]
+        elif field.required:
+            # not a document of this model, let validation report it
+            return model(**data)
+        else:
+            values[name] = field.get_default()
+            continue
+        values[name] = _trusted_value(model, field, value)
+    return model.construct(**values)
+
+
+def _is_model(type_: Any) -> bool:
+    return isinstance(type_, type) and issubclass(type_, BaseModel)
+
+
+def _trusted_value(model: type[BaseModel], field: ModelField, value: Any) -> Any:
+    if value is None and field.allow_none:
+        return None
+
+    if field.shape == SHAPE_SINGLETON:
+        if _is_model(field.type_) and isinstance(value, dict):
+            return construct_trusted(field.type_, value)
+        if field.type_ in _TRUSTED_TYPES and type(value) is field.type_:
+            return value
+        if get_origin(field.type_) is Literal and value in get_args(field.type_):
+            return value
+    elif field.shape == SHAPE_LIST and isinstance(value, list):
+        if _is_model(field.type_) and all(isinstance(v, dict) for v in value):
+            return [construct_trusted(field.type_, v) for v in value]
+
+    value, errors = field.validate(value, {}, loc=field.alias, cls=model)
+    if errors:
+        raise ValidationError([errors], model)
+    return value
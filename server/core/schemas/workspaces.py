@@ -11,6 +11,7 @@ class Workspace(BaseModel):
     name: str
     admin: PyObjectId
     users: list[PyObjectId]  # list of user_ids
+    revision: int = 0  # incremented on every change of the workspace document
 
     class Config:
         allow_population_by_field_name = True
@@ -1,4 +1,6 @@
 from functools import lru_cache
+from typing import Literal
+
 from pydantic import BaseSettings
 
 
@@ -7,12 +9,59 @@ class Settings(BaseSettings):
     ZEBBRA_BASE_URL: str
 
     MAX_MODELS: int = 10000
+    # storage layout of new models, "normalized" keeps rows and employees in
+    # collections of their own, see core/dao/model_storage.py
+    MODEL_STORAGE: Literal["embedded", "normalized"] = "embedded"
     INVITE_CODE_EXPIRE: int = 10080
 
+    # seconds to wait for an integration before merging without its data
+    INTEGRATION_TIMEOUT: float = 10
+    # coordinate integration fetches across workers with a lease in the database
+    INTEGRATION_LEASE: bool = True
+    # seconds after which the lease of a fetch that did not finish is given up
+    INTEGRATION_LEASE_TTL: float = 60
+    # seconds until cached integration data is refreshed in the background (fresh)
+    # and until it is refreshed before being served (expire), overridable per
+    # provider, e.g. XERO_CACHE_FRESH
+    INTEGRATION_CACHE_FRESH: int = 3600
+    INTEGRATION_CACHE_EXPIRE: int = 604800
+    XERO_CACHE_FRESH: int | None = None
+    XERO_CACHE_EXPIRE: int | None = None
+    GUSTO_CACHE_FRESH: int | None = None
+    GUSTO_CACHE_EXPIRE: int | None = None
+    # days after the end of a month until its Xero data is considered final and no
+    # longer re-requested when the accounting cache is refreshed
+    XERO_MONTH_SETTLE_DAYS: int = 31
+    # HTTP requests to the provider APIs: max pooled connections per provider, max
+    # concurrent requests per tenant, retries of failed GET requests with backoff
+    # base in seconds, and the longest Retry-After in seconds that is waited for
+    INTEGRATION_HTTP_MAX_CONNECTIONS: int = 20
+    INTEGRATION_HTTP_TENANT_CONCURRENCY: int = 4
+    INTEGRATION_HTTP_RETRIES: int = 3
+    INTEGRATION_HTTP_BACKOFF: float = 0.5
+    INTEGRATION_HTTP_MAX_RETRY_AFTER: float = 10
+    INTEGRATION_HTTP_TIMEOUT: float = 30
+    # in-process cache of integration access tokens, entries are also dropped
+    # shortly before the token expires
+    INTEGRATION_ACCESS_CACHE_TTL: float = 300
+    INTEGRATION_ACCESS_CACHE_SIZE: int = 1024
+    # seconds between background refreshes of the integration caches, 0 disables
+    INTEGRATION_PREWARM_INTERVAL: int = 1800
+    # max number of integration caches refreshed at the same time
+    INTEGRATION_PREWARM_CONCURRENCY: int = 4
+    # max random delay in seconds added to each refresh to spread the load
+    INTEGRATION_PREWARM_JITTER: float = 60
+
     AUTH_SECRET: str
     AUTH_ALGO: str
     AUTH_TOKEN_EXPIRE: int
 
+    # in-process cache of users and blacklisted tokens of authenticated requests
+    AUTH_CACHE_TTL: float = 30
+    AUTH_CACHE_SIZE: int = 1024
+    # only safe with a single worker: logouts on other workers are not seen
+    TOKEN_BLOOM_FILTER: bool = False
+
     MONGODB_USER: str
     MONGODB_DB: str
     MONGODB_PW: str
@@ -1,6 +1,7 @@
-from calendar import monthrange
 from datetime import date
 
+from core.calendar import first_of_month, last_of_month
+
 
 def last_of_same_month(the_date: date) -> date:
     """
@@ -8,8 +9,7 @@ def last_of_same_month(the_date: date) -> date:
     :param the_date: date for whose month to retrieve the last date
     :return: date
     """
-    day = monthrange(the_date.year, the_date.month)[1]
-    return date(the_date.year, the_date.month, day)
+    return last_of_month(the_date)
 
 
 def first_of_same_month(the_date: date) -> date:
@@ -18,7 +18,7 @@ def first_of_same_month(the_date: date) -> date:
     :param the_date: date for whose month to retrieve the first date
     :return: date
     """
-    return date(the_date.year, the_date.month, 1)
+    return first_of_month(the_date)
 
 
 def number_of_overlapping_days(
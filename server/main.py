@@ -5,7 +5,10 @@ from starlette.middleware.sessions import SessionMiddleware
 
 from api import users, models, auth, workspaces, integrations
 from api.utils.dependencies import SECRET_KEY
-from core.integrations.config import setup_integrations
+from core.dao.indexes import create_indexes
+from core.dao.token_blacklist import load_blacklist_filter, setup_blacklist
+from core.integrations.config import setup_integrations, close_http_clients
+from core.integrations.scheduler import start_scheduler, stop_scheduler
 from core.schemas.utils import Message
 
 app = FastAPI(
@@ -18,11 +21,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Model-Revision"],
 )
 
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 
 
+@app.on_event("startup")
+async def startup():
+    await setup_blacklist()
+    await create_indexes()
+    await load_blacklist_filter()
+    start_scheduler()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    stop_scheduler()
+    await close_http_clients()
+
+
 @app.get("/", response_model=Message)
 async def root():
     """
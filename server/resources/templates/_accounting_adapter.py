@@ -5,6 +5,7 @@ from core.dao.integrations import workspace_has_integration
 from core.integrations.adapters.adapter import FetchAdapter
 from core.schemas.cache import DataBatch
 from core.schemas.integrations import IntegrationProvider
+from core.schemas.models import HORIZON_MONTHS
 
 
 class XxXxXFetchAdapter(FetchAdapter):
@@ -27,7 +28,9 @@ class XxXxXFetchAdapter(FetchAdapter):
     def api_type(cls):
         return cls._api_type
 
-    async def get_data(self, from_date: date) -> DataBatch:
+    async def get_data(
+        self, from_date: date, horizon_months: int = HORIZON_MONTHS
+    ) -> DataBatch:
         """
         This is the main method called during the merging procedure to add the
         integration data to the models.
@@ -36,11 +39,12 @@ class XxXxXFetchAdapter(FetchAdapter):
         The data must be converted into a DataBatch object.
         Caching should be implemented as far as possible
         :param from_date: date from which onwards to get the data
+        :param horizon_months: number of months from from_date onwards to get
         :return: DataBatch containing the data from the integration
         """
         # return empty list if Xero not configured for workspace
         if not await workspace_has_integration(self.workspace_id, self.integration()):
-            return DataBatch(dates=[], data={})
+            return DataBatch.empty()
         # todo
         ...
 
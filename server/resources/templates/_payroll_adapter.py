@@ -4,7 +4,7 @@ from typing import Literal
 from core.dao.integrations import workspace_has_integration
 from core.integrations.adapters.adapter import FetchAdapter
 from core.schemas.integrations import IntegrationProvider
-from core.schemas.models import Employee
+from core.schemas.models import Employee, HORIZON_MONTHS
 
 
 class XxXxXFetchAdapter(FetchAdapter):
@@ -27,7 +27,9 @@ class XxXxXFetchAdapter(FetchAdapter):
     def api_type(cls):
         return cls._api_type
 
-    async def get_data(self, from_date: date) -> list[Employee]:
+    async def get_data(
+        self, from_date: date, horizon_months: int = HORIZON_MONTHS
+    ) -> list[Employee]:
         """
         This is the main method called during the merging procedure to add the
         integration data to the models.
@@ -36,6 +38,7 @@ class XxXxXFetchAdapter(FetchAdapter):
         The data must be converted into a list of employees object.
         Caching should be implemented as far as possible
         :param from_date: date from which onwards to get the data
+        :param horizon_months: number of months from from_date onwards to get
         :return: DataBatch containing the data from the integration
         """
         # return empty list if API is not configured for the workspace
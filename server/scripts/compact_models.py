@@ -0,0 +1,13 @@
+# run from "/server" directory: python -m scripts.compact_models
+import asyncio
+
+from core.dao.model_storage import compact_models
+
+
+async def main():
+    models, rows = await compact_models()
+    print(f"Removed derived data from {models} models and {rows} rows.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
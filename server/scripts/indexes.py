@@ -0,0 +1,22 @@
+# run from "/server" directory: python -m scripts.indexes
+import asyncio
+
+from core.dao.indexes import create_indexes, index_report
+from core.dao.token_blacklist import setup_blacklist
+
+
+async def main():
+    await setup_blacklist()
+    await create_indexes()
+
+    issues = [
+        f"{collection}: {kind} index {name}"
+        for collection, report in (await index_report()).items()
+        for kind, names in report.items()
+        for name in names
+    ]
+    print("\n".join(issues) if issues else "All indexes present and in use.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+# run from "/server" directory: python -m scripts.model_storage normalized|embedded
+import asyncio
+import sys
+
+from core.dao.database import db
+from core.dao.indexes import create_indexes
+from core.dao.model_storage import migrate_model
+
+
+async def main(layout: str):
+    await create_indexes()
+
+    if layout == "normalized":
+        query = {"storage": {"$ne": "normalized"}}
+    else:
+        query = {"storage": "normalized"}
+    model_ids = [m["_id"] async for m in db.models.find(query, {"_id": 1})]
+
+    # models changed during their conversion are retried on the next run
+    skipped = []
+    for model_id in model_ids:
+        if not await migrate_model(model_id, layout):
+            skipped.append(model_id)
+
+    print(f"Converted {len(model_ids) - len(skipped)} models to the {layout} layout.")
+    if skipped:
+        print("Skipped, run again: " + ", ".join(skipped))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("normalized", "embedded"):
+        sys.exit("usage: python -m scripts.model_storage normalized|embedded")
+    asyncio.run(main(sys.argv[1]))
@@ -1,11 +1,12 @@
 from copy import deepcopy
-from datetime import date
+from datetime import date, datetime
 
 import pytest
 from fastapi.encoders import jsonable_encoder
 from starlette import status
 from starlette.testclient import TestClient
 
+from core.dao.database import db
 from core.dao.models import (
     is_admin,
     is_editor,
@@ -15,12 +16,16 @@ from core.dao.models import (
     get_revenues_sheet,
     get_costs_sheet,
     has_access_to_model,
+    set_horizon_months,
 )
 from core.schemas.models import ModelMeta, Employee
 from core.schemas.rows import DateValue
 from core.schemas.sheets import Sheet
+from api import models as models_api
+from api.utils import dependencies
+from core.calculations import reports
 from main import app
-from tests.utils import assert_unauthorized_login_checked
+from tests.utils import assert_unauthorized_login_checked, count_documents
 
 
 def test_model_meta_protected():
@@ -42,6 +47,29 @@ async def test_model_meta_get_by_id(access_token):
     assert ModelMeta(**response.json()) == model.meta
 
 
+@pytest.mark.anyio
+async def test_model_meta_not_modified(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    etag = client.get(f"/model/meta?model_id={model_id}", headers=headers).headers[
+        "ETag"
+    ]
+
+    response = client.get(
+        f"/model/meta?model_id={model_id}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    await set_horizon_months(model_id, 36)
+    response = client.get(
+        f"/model/meta?model_id={model_id}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["horizon_months"] == 36
+
+
 def test_model_meta_get_by_id_non_existent_model(access_token):
     client = TestClient(app)
     model_id = "not a model"
@@ -364,6 +392,49 @@ async def test_starting_balance(access_token):
     assert model.meta.starting_balance == balance
 
 
+@pytest.mark.anyio
+async def test_horizon(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+    response = client.post(
+        f"/model/horizon?model_id={model_id}&horizon_months=36",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["message"] == "Horizon set (36 months)"
+
+    model = await get_model_by_id(model_id)
+    assert model.meta.horizon_months == 36
+
+
+@pytest.mark.anyio
+async def test_horizon_out_of_range(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+    response = client.post(
+        f"/model/horizon?model_id={model_id}&horizon_months=61",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    model = await get_model_by_id(model_id)
+    assert model.meta.horizon_months == 24
+
+
+@pytest.mark.anyio
+async def test_horizon_model_no_access(access_token_alice):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+    response = client.post(
+        f"/model/horizon?model_id={model_id}&horizon_months=36",
+        headers={"Authorization": f"Bearer {access_token_alice}"},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
 @pytest.mark.anyio
 async def test_starting_month_model_no_access(access_token_alice):
     client = TestClient(app)
@@ -503,6 +574,29 @@ async def test_post_model_revenues_contains_integration_values(access_token):
     assert len(response.json()["sections"][0]["rows"][1]["integration_values"]) > 0
 
 
+@pytest.mark.anyio
+async def test_post_model_revenues_drops_posted_integration_values(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    sheet = await get_revenues_sheet(model_id)
+    index, row = next(
+        (i, r)
+        for i, r in enumerate(sheet.sections[0].rows)
+        if r.var_type != "integration"
+    )
+    row.integration_values = [DateValue(date="2020-01-31", value="1")]
+
+    response = client.post(
+        f"/model/revenues?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json=jsonable_encoder(sheet),
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["sections"][0]["rows"][index]["integration_values"] is None
+
+
 @pytest.mark.anyio
 async def test_post_model_revenues_no_access(access_token_alice):
     client = TestClient(app)
@@ -519,6 +613,189 @@ async def test_post_model_revenues_no_access(access_token_alice):
     assert response.status_code == status.HTTP_403_FORBIDDEN
 
 
+@pytest.mark.anyio
+async def test_patch_model_revenues(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    sheet = await get_revenues_sheet(model_id)
+    row = sheet.sections[0].rows[0]
+    row.name = "changed"
+
+    response = client.patch(
+        f"/model/revenues?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={
+            "operations": [
+                {"op": "update", "row_id": row.id, "row": jsonable_encoder(row)},
+                {"op": "delete", "row_id": sheet.assumptions[0].id},
+            ]
+        },
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [r["_id"] for r in response.json()["rows"]] == [row.id]
+    assert response.json()["deleted"] == [sheet.assumptions[0].id]
+
+    stored = await get_revenues_sheet(model_id)
+    assert stored.sections[0].rows[0].name == "changed"
+    assert len(stored.assumptions) == len(sheet.assumptions) - 1
+
+
+@pytest.mark.anyio
+async def test_patch_model_revenues_contains_integration_values(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    sheet = await get_revenues_sheet(model_id)
+    row = sheet.sections[0].rows[1]
+
+    response = client.patch(
+        f"/model/revenues?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"operations": [{"op": "move", "row_id": row.id, "position": 0}]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["rows"][0]["integration_values"]) > 0
+
+
+@pytest.mark.anyio
+async def test_patch_model_revenues_row_does_not_exist(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    response = client.patch(
+        f"/model/revenues?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"operations": [{"op": "delete", "row_id": "does not exist"}]},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.anyio
+async def test_patch_model_costs_no_access(access_token_alice):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    sheet = await get_costs_sheet(model_id)
+
+    response = client.patch(
+        f"/model/costs?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token_alice}"},
+        json={"operations": [{"op": "delete", "row_id": sheet.sections[0].rows[0].id}]},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.anyio
+async def test_post_model_revenues_revision(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    sheet = await get_revenues_sheet(model_id)
+
+    response = client.post(
+        f"/model/revenues?model_id={model_id}&revision=0",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json=jsonable_encoder(sheet),
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["X-Model-Revision"] == "1"
+
+    # a second write based on the same revision conflicts
+    response = client.post(
+        f"/model/revenues?model_id={model_id}&revision=0",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json=jsonable_encoder(sheet),
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json()["detail"]["revision"] == 1
+
+
+@pytest.mark.anyio
+async def test_patch_model_revenues_revision_conflict(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    sheet = await get_revenues_sheet(model_id)
+    await set_horizon_months(model_id, 36)
+
+    response = client.patch(
+        f"/model/revenues?model_id={model_id}&revision=0",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"operations": [{"op": "delete", "row_id": sheet.assumptions[0].id}]},
+    )
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert await get_revenues_sheet(model_id) == sheet
+
+
+@pytest.mark.anyio
+async def test_get_model_revenues_not_modified(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    response = client.get(f"/model/revenues?model_id={model_id}", headers=headers)
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        f"/model/revenues?model_id={model_id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+
+    # any change of the model changes the tag
+    await set_horizon_months(model_id, 36)
+    response = client.get(
+        f"/model/revenues?model_id={model_id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.anyio
+async def test_get_model_sheets_not_modified_without_loading(access_token, monkeypatch):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    get_model_document = dependencies.get_model_document
+    loaded = []
+
+    async def get_model_document_recorded(*args):
+        document = await get_model_document(*args)
+        loaded.append(document)
+        return document
+
+    async def fail(*args):
+        raise AssertionError("must not be loaded for a 304")
+
+    for resource, getter in [
+        ("revenues", "get_revenues_sheet"),
+        ("costs", "get_costs_sheet"),
+        ("payroll", "get_payroll"),
+    ]:
+        url = f"/model/{resource}?model_id={model_id}"
+        etag = client.get(url, headers=headers).headers["ETag"]
+
+        with monkeypatch.context() as m:
+            m.setattr(models_api, getter, fail)
+            m.setattr(dependencies, "get_model_document", get_model_document_recorded)
+            response = client.get(url, headers={**headers, "If-None-Match": etag})
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # only the meta data of the model is read
+    assert len(loaded) == 3
+    assert all(set(document) <= {"_id", "meta", "storage"} for document in loaded)
+
+
 @pytest.mark.anyio
 async def test_post_model_costs(access_token):
     client = TestClient(app)
@@ -730,6 +1007,84 @@ async def test_get_model_costs_non_existent_model(access_token):
     assert response.status_code == status.HTTP_400_BAD_REQUEST
 
 
+@pytest.mark.anyio
+async def test_get_model_revenues_values(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    response = client.get(
+        f"/model/revenues/values?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+
+    sheet = await get_revenues_sheet(model_id)
+    values = response.json()["values"]
+
+    assert response.json()["meta"]["name"] == "Revenues"
+    assert len(response.json()["dates"]) == 24
+
+    # row1 grows by 5% per month
+    row = sheet.sections[0].rows[0]
+    assert values[row.id][0] == 15000
+    assert values[row.id][1] == 15750
+
+
+@pytest.mark.anyio
+async def test_get_model_revenues_values_horizon(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+    await set_horizon_months(model_id, 48)
+
+    response = client.get(
+        f"/model/revenues/values?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["dates"]) == 48
+
+    sheet = await get_revenues_sheet(model_id)
+    row = sheet.sections[0].rows[0]
+    assert len(response.json()["values"][row.id]) == 48
+
+
+@pytest.mark.anyio
+async def test_get_model_costs_values(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    response = client.get(
+        f"/model/costs/values?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+
+    sheet = await get_costs_sheet(model_id)
+    values = response.json()["values"]
+
+    assert response.json()["meta"]["name"] == "Costs"
+
+    # end row references the section row
+    section = sheet.sections[1]
+    assert values[section.end_row.id] == values[section.rows[0].id]
+
+
+@pytest.mark.anyio
+async def test_get_model_revenues_values_no_access(access_token_alice):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    response = client.get(
+        f"/model/revenues/values?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token_alice}"},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
 @pytest.mark.anyio
 async def test_get_users_of_model(access_token, users):
     model_id = "62b488ba433720870b60ec0a"
@@ -1001,3 +1356,138 @@ async def test_get_model_employees_non_existent_model(access_token):
     )
 
     assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.anyio
+async def test_get_model_employees_not_modified(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    response = client.get(f"/model/payroll?model_id={model_id}", headers=headers)
+    etag = response.headers["ETag"]
+
+    response = client.get(
+        f"/model/payroll?model_id={model_id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # rebuilding the payroll cache changes the tag
+    await db.payroll_cache.update_many({}, {"$set": {"created_at": datetime.now()}})
+    response = client.get(
+        f"/model/payroll?model_id={model_id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.anyio
+async def test_get_model_pnl(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    response = client.get(
+        f"/model/pnl?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+
+    result = response.json()
+    assert len(result["net_income"]["values"]) == 24
+    assert result["gross_income"]["revenue_streams"][0]["name"] == "section1"
+
+
+@pytest.mark.anyio
+async def test_get_model_pnl_cached(access_token, monkeypatch):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    first = client.get(
+        f"/model/pnl?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert await count_documents("calculation_cache") == 1
+
+    async def fail(*args):
+        raise AssertionError("must not be loaded or calculated when cached")
+
+    # the cached result is served from the meta data of the model only
+    with monkeypatch.context() as m:
+        m.setattr(reports, "get_model_by_id", fail)
+        m.setattr(reports, "_calculate_profit_loss", fail)
+        second = client.get(
+            f"/model/pnl?model_id={model_id}",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+    assert first.json() == second.json()
+
+
+@pytest.mark.anyio
+async def test_get_model_pnl_recalculated_after_update(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    first = client.get(
+        f"/model/pnl?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    sheet = await get_costs_sheet(model_id)
+    sheet.sections[2].rows[0].value_1 = "2500"
+    client.post(
+        f"/model/costs?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json=jsonable_encoder(sheet),
+    )
+
+    second = client.get(
+        f"/model/pnl?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert first.json()["other_cost"] != second.json()["other_cost"]
+
+
+@pytest.mark.anyio
+async def test_get_model_pnl_recalculated_after_meta_update(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    first = client.get(f"/model/pnl?model_id={model_id}", headers=headers)
+    await set_horizon_months(model_id, 36)
+    second = client.get(f"/model/pnl?model_id={model_id}", headers=headers)
+
+    assert len(first.json()["net_income"]["values"]) == 24
+    assert len(second.json()["net_income"]["values"]) == 36
+
+
+@pytest.mark.anyio
+async def test_get_model_pnl_no_access(access_token_alice):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    response = client.get(
+        f"/model/pnl?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token_alice}"},
+    )
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.anyio
+async def test_get_model_dashboard(access_token):
+    client = TestClient(app)
+    model_id = "62b488ba433720870b60ec0a"
+
+    response = client.get(
+        f"/model/dashboard?model_id={model_id}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+
+    result = response.json()
+    assert len(result["cash_balance"][0]["data"]) == 24
+    assert result["payroll_costs"][-1]["name"] == "Other"
@@ -4,7 +4,11 @@ from starlette import status
 
 from core.dao.models import get_models_for_workspace
 from core.dao.users import get_user
-from core.dao.workspaces import get_workspace_by_name
+from core.dao.workspaces import (
+    get_workspace_by_name,
+    change_workspace_name,
+    add_user_to_workspace,
+)
 from main import app
 
 
@@ -251,3 +255,41 @@ async def test_get_users_of_workspace_no_access(access_token_alice, workspaces):
     )
 
     assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.anyio
+async def test_get_workspaces_for_user_not_modified(access_token, workspaces):
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    etag = client.get("/workspace", headers=headers).headers["ETag"]
+
+    response = client.get("/workspace", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    await change_workspace_name(workspaces["ACME Inc."], "foobar")
+    response = client.get("/workspace", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert "foobar" in [w["name"] for w in response.json()]
+
+
+@pytest.mark.anyio
+async def test_list_workspace_users_not_modified(access_token, users, workspaces):
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {access_token}"}
+    params = {"workspace_id": workspaces["ACME Inc."]}
+
+    etag = client.get("/workspace/users", params=params, headers=headers).headers[
+        "ETag"
+    ]
+
+    response = client.get(
+        "/workspace/users", params=params, headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    await add_user_to_workspace(users["alice@example.com"], workspaces["ACME Inc."])
+    response = client.get(
+        "/workspace/users", params=params, headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
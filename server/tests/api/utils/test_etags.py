@@ -0,0 +1,26 @@
+from starlette.requests import Request
+
+from api.utils.etags import make_etag, etag_matches
+
+
+def _request(if_none_match: str | None = None) -> Request:
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode("latin-1")))
+    return Request({"type": "http", "headers": headers})
+
+
+def test_make_etag():
+    etag = make_etag(1, "Revenues", {"a": 1, "b": 2})
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag(1, "Revenues", {"b": 2, "a": 1})
+    assert etag != make_etag(2, "Revenues", {"a": 1, "b": 2})
+
+
+def test_etag_matches():
+    etag = make_etag(1)
+    assert not etag_matches(_request(), etag)
+    assert etag_matches(_request(etag), etag)
+    assert etag_matches(_request(f'"other", W/{etag}'), etag)
+    assert etag_matches(_request("*"), etag)
+    assert not etag_matches(_request(make_etag(2)), etag)
@@ -0,0 +1,27 @@
+import json
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from api.utils.responses import ModelResponse, trusted_response
+from core.schemas.models import Model
+from tests.factory import models
+
+
+def test_model_response_matches_json_encoding():
+    model = Model(**models[0])
+    for content in (model, model.meta, model.sheets[0], model.payroll):
+        rendered = json.loads(ModelResponse(content).body)
+        assert rendered == jsonable_encoder(content)
+
+
+def test_trusted_response_keeps_headers():
+    response = Response()
+    del response.headers["content-length"]
+    response.status_code = None
+    response.headers["ETag"] = '"abc"'
+
+    result = trusted_response({"a": 1}, response)
+    assert result.status_code == 200
+    assert result.headers["etag"] == '"abc"'
+    assert result.body == b'{"a":1}'
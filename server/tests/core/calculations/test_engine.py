@@ -0,0 +1,160 @@
+from datetime import date
+
+import numpy as np
+from pytest import approx
+
+from core.calculations.engine import (
+    evaluate_rows,
+    evaluate_sheet,
+    creation_order,
+    ParsedRow,
+    to_values,
+)
+from core.schemas.rows import Row, DateValue
+from core.schemas.sheets import Sheet, SheetMeta, Section
+
+STARTING_MONTH = date(2020, 1, 1)
+
+
+def _row(row_id: str, value: str, **kwargs) -> Row:
+    data = dict(
+        _id=row_id,
+        name=row_id,
+        val_type="number",
+        editable=True,
+        var_type="formula",
+        time_series=True,
+        starting_at=0,
+        first_value_diff=False,
+        value=value,
+        integration_name=None,
+        value_1=None,
+        integration_values=None,
+        decimal_places=2,
+    )
+    data.update(kwargs)
+    return Row(**data)
+
+
+def test_evaluate_constant_row():
+    values = evaluate_rows([_row("1", "100")], STARTING_MONTH)
+    assert len(values["1"]) == 24
+    assert np.all(values["1"] == 100)
+
+
+def test_evaluate_internal_reference():
+    row = _row("1", "$1+1", first_value_diff=True, value_1="100")
+    values = evaluate_rows([row], STARTING_MONTH)
+    assert list(values["1"]) == [100 + i for i in range(24)]
+
+
+def test_evaluate_growth_rounds_each_month():
+    row = _row("1", "$1 * 1.05", first_value_diff=True, value_1="15000")
+    values = evaluate_rows([row], STARTING_MONTH)
+    assert values["1"][0] == 15000
+    assert values["1"][1] == 15750
+    assert values["1"][2] == approx(16537.5)
+    assert values["1"][3] == approx(round(16537.5 * 1.05, 2))
+
+
+def test_evaluate_starting_at():
+    row = _row("1", "$1 * 2", starting_at=2, first_value_diff=True, value_1="1")
+    values = evaluate_rows([row], STARTING_MONTH, horizon=5)
+    assert to_values(values["1"]) == [None, None, 1, 2, 4]
+
+
+def test_evaluate_external_reference_in_any_order():
+    rows = [
+        _row("3", "#1 + #2"),
+        _row("2", "#1 * 2"),
+        _row("1", "10"),
+    ]
+    values = evaluate_rows(rows, STARTING_MONTH)
+    assert np.all(values["3"] == 30)
+
+
+def test_evaluate_external_reference_with_lag():
+    rows = [
+        _row("1", "$1 + 1", first_value_diff=True, value_1="1"),
+        _row("2", "#1$1"),
+    ]
+    values = evaluate_rows(rows, STARTING_MONTH, horizon=4)
+    assert to_values(values["2"]) == [None, 1, 2, 3]
+
+
+def test_evaluate_reference_to_row_without_time_series():
+    rows = [
+        _row("1", "6000", time_series=False),
+        _row("2", "#1 / 2"),
+    ]
+    values = evaluate_rows(rows, STARTING_MONTH)
+    assert to_values(values["1"]) == [None] * 24
+    assert np.all(values["2"] == 3000)
+
+
+def test_evaluate_decimal_places():
+    row = _row("1", "10 / 3", decimal_places=0)
+    values = evaluate_rows([row], STARTING_MONTH)
+    assert np.all(values["1"] == 3)
+
+
+def test_evaluate_integration_values_aligned_by_month():
+    row = _row(
+        "1",
+        "50",
+        var_type="integration",
+        integration_name="Xero[Total Income]",
+        integration_values=[
+            DateValue(date=date(2019, 12, 31), value="1"),
+            DateValue(date=date(2020, 1, 31), value="2"),
+            DateValue(date=date(2020, 2, 29), value=None),
+            DateValue(date=date(2020, 3, 31), value="4"),
+        ],
+    )
+    values = evaluate_rows([row], STARTING_MONTH, horizon=5)
+    assert to_values(values["1"]) == [2, 50, 4, 50, 50]
+
+
+def test_evaluate_invalid_formula_propagates():
+    rows = [_row("1", "1 +"), _row("2", "#1 + 1"), _row("3", "5")]
+    values = evaluate_rows(rows, STARTING_MONTH)
+    assert np.all(np.isnan(values["1"]))
+    assert np.all(np.isnan(values["2"]))
+    assert np.all(values["3"] == 5)
+
+
+def test_evaluate_unknown_reference():
+    values = evaluate_rows([_row("1", "#404 + 1")], STARTING_MONTH)
+    assert np.all(np.isnan(values["1"]))
+
+
+def test_evaluate_circular_reference():
+    rows = [_row("1", "#2"), _row("2", "#1"), _row("3", "1")]
+    values = evaluate_rows(rows, STARTING_MONTH)
+    assert np.all(np.isnan(values["1"]))
+    assert np.all(np.isnan(values["2"]))
+    assert np.all(values["3"] == 1)
+
+
+def test_creation_order():
+    rows = [_row("1", "#2 + #3"), _row("2", "#3"), _row("3", "1")]
+    order, circular = creation_order([ParsedRow(r) for r in rows])
+    assert order == ["3", "2", "1"]
+    assert circular == set()
+
+
+def test_evaluate_sheet_includes_end_rows():
+    sheet = Sheet(
+        meta=SheetMeta(name="Revenues"),
+        assumptions=[_row("1", "2", time_series=False)],
+        sections=[
+            Section(
+                name="section",
+                rows=[_row("2", "#1 * 100")],
+                end_row=_row("3", "#2 + 1"),
+            )
+        ],
+    )
+    values = evaluate_sheet(sheet, STARTING_MONTH)
+    assert set(values.keys()) == {"1", "2", "3"}
+    assert np.all(values["3"] == 201)
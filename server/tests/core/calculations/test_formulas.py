@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from core.calculations.formulas import (
+    parse_formula,
+    tokenize,
+    Number,
+    Reference,
+    BinaryOperation,
+    UnaryOperation,
+)
+from core.exceptions import FormulaException
+
+
+def _no_refs(ref):
+    raise AssertionError("No references expected")
+
+
+def test_tokenize_references():
+    assert tokenize("#123$2 + $1 * 1.05") == [
+        ("external", "#123$2"),
+        ("operator", "+"),
+        ("internal", "$1"),
+        ("operator", "*"),
+        ("number", "1.05"),
+    ]
+
+
+def test_tokenize_invalid_character():
+    with pytest.raises(FormulaException):
+        tokenize("1 + a")
+
+
+def test_parse_number():
+    assert parse_formula("100") == Number(100.0)
+
+
+def test_parse_internal_reference():
+    assert parse_formula("$1") == Reference(None, 1)
+
+
+def test_parse_external_reference():
+    assert parse_formula("#123") == Reference("123", 0)
+
+
+def test_parse_external_reference_with_lag():
+    assert parse_formula("#123$3") == Reference("123", 3)
+
+
+def test_parse_operator_precedence():
+    assert parse_formula("1 + 2 * 3") == BinaryOperation(
+        "+", Number(1.0), BinaryOperation("*", Number(2.0), Number(3.0))
+    )
+
+
+def test_parse_unary_minus():
+    assert parse_formula("-$1") == UnaryOperation("-", Reference(None, 1))
+
+
+def test_parse_references():
+    node = parse_formula("(#1 + #2$1) * $1")
+    assert node.references() == [
+        Reference("1", 0),
+        Reference("2", 1),
+        Reference(None, 1),
+    ]
+
+
+@pytest.mark.parametrize(
+    "formula,expected",
+    [
+        ("1 + 2 * 3", 7),
+        ("(1 + 2) * 3", 9),
+        ("10 / 4", 2.5),
+        ("2 ^ 3 ^ 2", 512),
+        ("-2 + 5", 3),
+        ("100 - 10 - 10", 80),
+    ],
+)
+def test_evaluate_constant_formula(formula, expected):
+    assert parse_formula(formula).evaluate(_no_refs) == expected
+
+
+def test_evaluate_vector():
+    node = parse_formula("#1 * 2 + 1")
+    result = node.evaluate(lambda ref: np.array([1.0, 2.0, 3.0]))
+    assert np.array_equal(result, np.array([3.0, 5.0, 7.0]))
+
+
+@pytest.mark.parametrize("formula", ["", "1 +", "(1 + 2", "1 2", "* 2"])
+def test_parse_invalid_formula(formula):
+    with pytest.raises(FormulaException):
+        parse_formula(formula)
@@ -0,0 +1,133 @@
+from datetime import date
+
+import numpy as np
+
+from core.calculations.profit_loss import (
+    calculate_profit_loss,
+    calculate_dashboard,
+    department_payroll,
+    month_starts,
+)
+from core.schemas.models import Employee
+from core.schemas.rows import Row
+from core.schemas.sheets import Sheet, SheetMeta, Section
+from core.schemas.utils import DateString
+
+STARTING_MONTH = date(2020, 1, 1)
+HORIZON = 3
+
+
+def _row(row_id: str, value: str) -> Row:
+    return Row(
+        _id=row_id,
+        name=row_id,
+        val_type="number",
+        editable=True,
+        var_type="formula",
+        time_series=True,
+        starting_at=0,
+        first_value_diff=False,
+        value=value,
+        integration_name=None,
+        value_1=None,
+        integration_values=None,
+    )
+
+
+def _section(name: str, row_id: str, value: str) -> Section:
+    return Section(
+        name=name, rows=[_row(row_id, value)], end_row=_row(f"{row_id}0", f"#{row_id}")
+    )
+
+
+def _employee(start: str, end: str | None, salary: int, department: str | None):
+    return Employee(
+        name="name",
+        start_date=DateString(start),
+        end_date=DateString(end) if end else None,
+        title="title",
+        department=department,
+        monthly_salary=salary,
+        from_integration=False,
+    )
+
+
+def _sheets():
+    revenues = Sheet(
+        meta=SheetMeta(name="Revenues"),
+        assumptions=[],
+        sections=[_section("A", "1", "100"), _section("B", "2", "50")],
+    )
+    costs = Sheet(
+        meta=SheetMeta(name="Costs"),
+        assumptions=[],
+        sections=[
+            _section("Cost of Goods Sold", "3", "20"),
+            _section("Operational Costs", "4", "10"),
+            _section("Other Costs", "5", "5"),
+        ],
+    )
+    return revenues, costs
+
+
+def test_calculate_profit_loss():
+    revenues, costs = _sheets()
+    payroll = np.array([30.0, 30.0, 0.0])
+
+    result = calculate_profit_loss(revenues, costs, payroll, STARTING_MONTH, HORIZON)
+
+    assert [r.name for r in result.gross_income.revenue_streams] == ["A", "B"]
+    assert result.gross_income.total.values == [150, 150, 150]
+    assert result.cost_of_goods_sold.values == [20, 20, 20]
+    assert result.gross_margin.values == [130, 130, 130]
+    assert result.operating_income.values == [90, 90, 120]
+    assert result.net_income.values == [85, 85, 115]
+
+
+def test_calculate_profit_loss_missing_cost_sections():
+    revenues, costs = _sheets()
+    costs.sections = costs.sections[:1]
+    payroll = np.zeros(HORIZON)
+
+    result = calculate_profit_loss(revenues, costs, payroll, STARTING_MONTH, HORIZON)
+
+    assert result.operating_cost.values == [0, 0, 0]
+    assert result.net_income.values == [130, 130, 130]
+
+
+def test_calculate_dashboard_cash_balance():
+    revenues, costs = _sheets()
+    payroll = np.zeros(HORIZON)
+    profit_loss = calculate_profit_loss(
+        revenues, costs, payroll, STARTING_MONTH, HORIZON
+    )
+
+    result = calculate_dashboard(profit_loss, [], STARTING_MONTH, 1000, HORIZON)
+
+    assert [v for _, v in result.cash_balance[0].data] == [1115, 1230, 1345]
+    assert result.cash_balance[0].data[0][0] == 1577836800000  # 2020-01-01
+
+
+def test_month_starts():
+    months = month_starts(date(2020, 11, 15), 3)
+    assert list(months) == [
+        np.datetime64("2020-11-01"),
+        np.datetime64("2020-12-01"),
+        np.datetime64("2021-01-01"),
+    ]
+
+
+def test_department_payroll():
+    employees = [
+        _employee("2020-01-01", None, 100, "Tech"),
+        _employee("2020-02-01", "2020-02-15", 50, "Tech"),
+        _employee("2020-01-15", None, 10, None),
+    ]
+    payroll, headcount = department_payroll(
+        employees, month_starts(STARTING_MONTH, HORIZON)
+    )
+
+    assert list(payroll.keys()) == ["Tech", "Other"]
+    assert list(payroll["Tech"]) == [100, 150, 100]
+    assert list(headcount["Tech"]) == [1, 2, 1]
+    assert list(payroll["Other"]) == [0, 10, 10]
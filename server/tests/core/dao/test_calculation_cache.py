@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from core.dao.calculation_cache import (
+    get_calculation_cache,
+    set_calculation_cache,
+    delete_calculation_cache,
+)
+from core.dao.models import (
+    update_revenues_sheet,
+    get_revenues_sheet,
+    patch_sheet_rows,
+    set_name,
+)
+from core.exceptions import RevisionConflictException
+from core.schemas.cache import CalculationCache
+from core.schemas.sheets import RowOperation
+from tests.utils import count_documents
+
+
+def _cache_obj(key: str) -> CalculationCache:
+    return CalculationCache(
+        model_id="62b488ba433720870b60ec0a",
+        kind="profit_loss",
+        key=key,
+        created_at=datetime.now().astimezone(timezone.utc),
+        data={"foo": "bar"},
+    )
+
+
+@pytest.mark.anyio
+async def test_set_and_get_calculation_cache():
+    await set_calculation_cache(_cache_obj("key"))
+    cached = await get_calculation_cache(
+        "62b488ba433720870b60ec0a", "profit_loss", "key"
+    )
+    assert cached.data == {"foo": "bar"}
+
+
+@pytest.mark.anyio
+async def test_get_calculation_cache_other_key():
+    await set_calculation_cache(_cache_obj("key"))
+    assert (
+        await get_calculation_cache("62b488ba433720870b60ec0a", "profit_loss", "other")
+        is None
+    )
+
+
+@pytest.mark.anyio
+async def test_set_calculation_cache_replaces_previous():
+    await set_calculation_cache(_cache_obj("key1"))
+    await set_calculation_cache(_cache_obj("key2"))
+    assert await count_documents("calculation_cache") == 1
+
+
+@pytest.mark.anyio
+async def test_delete_calculation_cache():
+    await set_calculation_cache(_cache_obj("key"))
+    await delete_calculation_cache("62b488ba433720870b60ec0a")
+    assert await count_documents("calculation_cache") == 0
+
+
+@pytest.mark.anyio
+async def test_update_sheet_invalidates_calculation_cache():
+    model_id = "62b488ba433720870b60ec0a"
+    await set_calculation_cache(_cache_obj("key"))
+    sheet = await get_revenues_sheet(model_id)
+    await update_revenues_sheet(model_id, sheet)
+    assert await count_documents("calculation_cache") == 0
+
+
+@pytest.mark.anyio
+async def test_patch_sheet_rows_invalidates_calculation_cache():
+    model_id = "62b488ba433720870b60ec0a"
+    sheet = await get_revenues_sheet(model_id)
+    row_id = sheet.sections[0].rows[0].id
+    await set_calculation_cache(_cache_obj("key"))
+    await set_name(model_id, "name")
+
+    # the model does not change if the revision conflicts
+    with pytest.raises(RevisionConflictException):
+        await patch_sheet_rows(
+            model_id, sheet, [RowOperation(op="delete", row_id=row_id)], 0
+        )
+    assert await count_documents("calculation_cache") == 1
+
+    sheet = await get_revenues_sheet(model_id)
+    await patch_sheet_rows(
+        model_id, sheet, [RowOperation(op="delete", row_id=row_id)], 1
+    )
+    assert await count_documents("calculation_cache") == 0
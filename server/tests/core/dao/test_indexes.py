@@ -0,0 +1,57 @@
+import pytest
+
+from core.dao.database import db
+from core.dao.indexes import create_indexes, index_report, INDEXES
+
+
+@pytest.mark.anyio
+async def test_create_indexes():
+    await create_indexes()
+
+    users = await db.users.index_information()
+    assert users["username_1"]["unique"]
+
+    caches = await db.accounting_cache.index_information()
+    assert caches["workspace_id_1_integration_1_from_date_1"]["key"] == [
+        ("workspace_id", 1),
+        ("integration", 1),
+        ("from_date", 1),
+    ]
+
+    calculations = await db.calculation_cache.index_information()
+    assert calculations["model_id_1_kind_1"]["unique"]
+
+    blacklist = await db.token_blacklist.index_information()
+    assert blacklist["expires_at_1"]["expireAfterSeconds"] == 0
+
+
+@pytest.mark.anyio
+async def test_create_indexes_idempotent():
+    await create_indexes()
+    await create_indexes()
+
+    report = await index_report()
+    assert set(report.keys()) == set(INDEXES.keys())
+    assert all(r["missing"] == [] for r in report.values())
+
+
+@pytest.mark.anyio
+async def test_index_report_undeclared():
+    await create_indexes()
+    await db.users.create_index("first_name")
+
+    report = await index_report()
+    assert "first_name_1" in report["users"]["undeclared"]
+
+    await db.users.drop_index("first_name_1")
+
+
+@pytest.mark.anyio
+async def test_create_indexes_rebuilds_changed_index():
+    await db.integration_access.drop_index("workspace_id_1_integration_1")
+    await db.integration_access.create_index([("workspace_id", 1), ("integration", 1)])
+
+    await create_indexes()
+
+    indexes = await db.integration_access.index_information()
+    assert indexes["workspace_id_1_integration_1"]["unique"]
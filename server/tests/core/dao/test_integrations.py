@@ -1,3 +1,4 @@
+import asyncio
 import time
 
 import pytest
@@ -13,11 +14,18 @@ from core.dao.integrations import (
 from datetime import datetime, timezone
 
 from core.dao.integrations import (
+    acquire_integration_lease,
+    get_connected_integrations,
+    release_integration_lease,
     get_integrations_for_workspace,
     get_integration_for_workspace,
+    get_cached_integration_for_workspace,
+    add_integration_for_workspace,
     workspace_has_integration,
     set_requires_reconnect,
 )
+from core.dao.database import db
+from core.dao.indexes import create_indexes
 from core.schemas.cache import DataBatchCache, EmployeeListCache
 from tests.factory import setup_integration_access
 from tests.utils import count_documents
@@ -164,6 +172,27 @@ async def test_set_accounting_cached_replaces():
     assert compare_rounded_created_at(cache_obj2, db_obj)
 
 
+@pytest.mark.anyio
+async def test_set_accounting_cached_concurrently():
+    await create_indexes()
+    count_before = await count_documents("accounting_cache")
+
+    cache_objs = [
+        DataBatchCache(
+            data={},
+            dates=[],
+            created_at=datetime.now(tz=timezone.utc),
+            workspace_id="123",
+            integration="Xero",
+            from_date=123,
+        )
+        for _ in range(10)
+    ]
+    await asyncio.gather(*[set_accounting_cache(c) for c in cache_objs])
+
+    assert await count_documents("accounting_cache") - count_before == 1
+
+
 @pytest.mark.anyio
 async def test_get_accounting_cached():
     cache_obj = DataBatchCache(
@@ -309,3 +338,64 @@ async def test_get_payroll_cached_non_existent_integration():
     )
     await set_payroll_cache(cache_obj)
     assert await get_payroll_cache("123", "false", 123) is None  # noqa
+
+
+@pytest.mark.anyio
+async def test_acquire_integration_lease():
+    assert await acquire_integration_lease("key", "owner1", 60)
+    assert not await acquire_integration_lease("key", "owner2", 60)
+    assert await acquire_integration_lease("other-key", "owner2", 60)
+
+
+@pytest.mark.anyio
+async def test_release_integration_lease():
+    assert await acquire_integration_lease("key", "owner1", 60)
+
+    # only the owner can release the lease
+    await release_integration_lease("key", "owner2")
+    assert not await acquire_integration_lease("key", "owner2", 60)
+
+    await release_integration_lease("key", "owner1")
+    assert await acquire_integration_lease("key", "owner2", 60)
+
+
+@pytest.mark.anyio
+async def test_acquire_integration_lease_expired():
+    assert await acquire_integration_lease("key", "owner1", 0)
+    time.sleep(0.01)
+    assert await acquire_integration_lease("key", "owner2", 60)
+
+
+@pytest.mark.anyio
+async def test_get_connected_integrations(workspaces):
+    workspace_id = workspaces["ACME Inc."]
+    await set_requires_reconnect(workspace_id, "Xero", False)
+    await set_requires_reconnect(workspace_id, "Gusto", True)
+
+    assert await get_connected_integrations() == [(workspace_id, "Xero")]
+
+
+@pytest.mark.anyio
+async def test_get_cached_integration_for_workspace_invalidated(
+    workspaces, never_expired_xero_token
+):
+    workspace_id = never_expired_xero_token.workspace_id
+    await add_integration_for_workspace(never_expired_xero_token)
+    assert await get_cached_integration_for_workspace(workspace_id, "Xero")
+
+    await set_requires_reconnect(workspace_id, "Xero", True)
+    cached = await get_cached_integration_for_workspace(workspace_id, "Xero")
+    assert cached.requires_reconnect
+
+
+@pytest.mark.anyio
+async def test_get_cached_integration_for_workspace_expired(
+    workspaces, expired_xero_token
+):
+    workspace_id = expired_xero_token.workspace_id
+    await add_integration_for_workspace(expired_xero_token)
+    assert await get_cached_integration_for_workspace(workspace_id, "Xero")
+
+    # expired tokens are not served from the cache
+    await db.integration_access.delete_many({})
+    assert await get_cached_integration_for_workspace(workspace_id, "Xero") is None
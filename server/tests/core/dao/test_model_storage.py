@@ -0,0 +1,290 @@
+import asyncio
+from copy import deepcopy
+
+import pytest
+
+from core.dao.database import db
+from core.dao.model_storage import (
+    migrate_model,
+    normalize,
+    get_storage_layout,
+    insert_model,
+    strip_model,
+    compact_models,
+)
+from core.dao.models import (
+    get_model_by_id,
+    get_model_document,
+    get_revenues_sheet,
+    get_costs_sheet,
+    get_payroll,
+    sheet_projection,
+    update_revenues_sheet,
+    update_model_employees,
+    patch_sheet_rows,
+    get_model_revision,
+    delete_model,
+)
+from core.exceptions import RevisionConflictException
+from core.schemas.models import Employee, Model, Payroll
+from core.schemas.rows import DateValue
+from core.schemas.sheets import RowOperation, Sheet
+from tests.factory import models
+
+MODEL_ID = "62b488ba433720870b60ec0a"
+
+
+@pytest.fixture
+async def normalized():
+    model = await get_model_by_id(MODEL_ID)
+    assert await migrate_model(MODEL_ID, "normalized")
+    return model
+
+
+def test_normalize():
+    document = models[0]
+    normalized, rows, employees = normalize(document)
+
+    assert normalized["storage"] == "normalized"
+    assert normalized["payroll"]["employees"] == []
+    assert document["payroll"]["employees"] == [e["employee"] for e in employees]
+    for sheet in normalized["sheets"]:
+        assert sheet["assumptions"] == []
+        assert all(section["rows"] == [] for section in sheet["sections"])
+
+    sheet = document["sheets"][0]
+    sheet_rows = [r for r in rows if r["sheet"] == sheet["meta"]["name"]]
+    assert [r["row"] for r in sheet_rows if r["section"] is None] == sheet[
+        "assumptions"
+    ]
+    assert [r["row"] for r in sheet_rows if r["section"] == 0] == sheet["sections"][0][
+        "rows"
+    ]
+    assert all(r["model_id"] == document["_id"] for r in rows + employees)
+
+
+def _with_integration_values(sheet: Sheet) -> Sheet:
+    sheet = deepcopy(sheet)
+    values = [DateValue(date="2020-01-31", value="1")]
+    for row in sheet.assumptions + sheet.sections[0].rows:
+        row.integration_values = values
+    sheet.sections[0].end_row.integration_values = values
+    return sheet
+
+
+def _stored_integration_values(document: dict) -> list:
+    return [
+        row["integration_values"]
+        for sheet in document["sheets"]
+        for section in sheet["sections"]
+        for row in sheet["assumptions"] + section["rows"] + [section["end_row"]]
+        if row is not None and "integration_values" in row
+    ]
+
+
+def test_strip_model():
+    document = deepcopy(models[0])
+    document["payroll"]["payroll_values"] = [{"date": "2020-01-31", "value": "1"}]
+    for sheet in document["sheets"]:
+        for row in sheet["assumptions"]:
+            row["integration_values"] = [{"date": "2020-01-31", "value": "1"}]
+
+    stripped = strip_model(document)
+    assert _stored_integration_values(stripped) == []
+    assert stripped["payroll"]["payroll_values"] == []
+    assert stripped["payroll"]["employees"] == document["payroll"]["employees"]
+    assert Model(**stripped).sheets[0].assumptions[0].integration_values is None
+
+
+@pytest.mark.anyio
+async def test_integration_values_are_not_stored():
+    sheet = _with_integration_values(await get_revenues_sheet(MODEL_ID))
+    await update_revenues_sheet(MODEL_ID, sheet)
+
+    document = await db.models.find_one({"_id": MODEL_ID})
+    assert _stored_integration_values(document) == []
+
+    row = sheet.sections[0].rows[0]
+    await patch_sheet_rows(
+        MODEL_ID,
+        await get_revenues_sheet(MODEL_ID),
+        [
+            RowOperation(op="update", row_id=row.id, row=row),
+            RowOperation(op="add", row=row.copy(update={"id": "new"})),
+        ],
+        1,
+    )
+
+    document = await db.models.find_one({"_id": MODEL_ID})
+    assert _stored_integration_values(document) == []
+
+
+@pytest.mark.anyio
+async def test_compact_models(normalized):
+    values = [{"date": "2020-01-31", "value": "1"}]
+    await db.models.update_one(
+        {"_id": "62b488ba433720870b60ec0b"},
+        {
+            "$set": {
+                "sheets.0.assumptions.0.integration_values": values,
+                "payroll.payroll_values": values,
+            }
+        },
+    )
+    await db.model_rows.update_one(
+        {"model_id": MODEL_ID}, {"$set": {"row.integration_values": values}}
+    )
+
+    assert await compact_models() == (1, 1)
+
+    document = await db.models.find_one({"_id": "62b488ba433720870b60ec0b"})
+    assert _stored_integration_values(document) == []
+    assert document["payroll"]["payroll_values"] == []
+    assert (
+        await db.model_rows.count_documents(
+            {"row.integration_values": {"$exists": True}}
+        )
+        == 0
+    )
+    assert await get_model_by_id(MODEL_ID) == normalized
+
+
+@pytest.mark.anyio
+async def test_migrate_model(normalized):
+    document = await db.models.find_one({"_id": MODEL_ID})
+    assert document["storage"] == "normalized"
+    assert document["sheets"][0]["sections"][0]["rows"] == []
+    assert await db.model_rows.count_documents({"model_id": MODEL_ID}) > 0
+
+    assert await get_model_by_id(MODEL_ID) == normalized
+    assert await get_revenues_sheet(MODEL_ID) == normalized.sheets[0]
+    assert await get_costs_sheet(MODEL_ID) == normalized.sheets[1]
+    assert await get_payroll(MODEL_ID) == normalized.payroll
+    assert await get_model_revision(MODEL_ID) == 0
+
+    # already normalized
+    assert not await migrate_model(MODEL_ID, "normalized")
+
+    assert await migrate_model(MODEL_ID, "embedded")
+    assert await get_storage_layout(MODEL_ID) == "embedded"
+    assert await db.model_rows.count_documents({"model_id": MODEL_ID}) == 0
+    assert await get_model_by_id(MODEL_ID) == normalized
+
+
+@pytest.mark.anyio
+async def test_get_model_document_projection(normalized):
+    document = await get_model_document(MODEL_ID, sheet_projection("Costs"))
+    assert len(document["sheets"]) == 1
+    assert Sheet(**document["sheets"][0]) == normalized.sheets[1]
+    assert "payroll" not in document
+
+    document = await get_model_document(MODEL_ID, {"payroll": 1})
+    assert Payroll(**document["payroll"]) == normalized.payroll
+
+
+@pytest.mark.anyio
+async def test_insert_model_normalized():
+    document = deepcopy(models[1])
+    document["_id"] = "62b488ba433720870b60ec99"
+    await insert_model(document, "normalized")
+
+    assert await get_storage_layout(document["_id"]) == "normalized"
+    model = await get_model_by_id(document["_id"])
+    expected = Model(**models[1])
+    assert model.sheets == expected.sheets
+    assert model.payroll == expected.payroll
+
+    await delete_model(document["_id"])
+    assert await db.model_rows.count_documents({"model_id": document["_id"]}) == 0
+    assert await db.model_employees.count_documents({"model_id": document["_id"]}) == 0
+
+
+@pytest.mark.anyio
+async def test_update_sheet_normalized(normalized):
+    sheet = deepcopy(normalized.sheets[0])
+    sheet.sections[0].rows.reverse()
+    sheet.assumptions = []
+
+    assert await update_revenues_sheet(MODEL_ID, sheet, revision=0) == 1
+    assert await get_revenues_sheet(MODEL_ID) == sheet
+
+    with pytest.raises(RevisionConflictException):
+        await update_revenues_sheet(MODEL_ID, normalized.sheets[0], revision=0)
+    assert await get_revenues_sheet(MODEL_ID) == sheet
+
+
+@pytest.mark.anyio
+async def test_concurrent_update_sheet_normalized(normalized):
+    sheet = normalized.sheets[0]
+    await asyncio.gather(
+        *[update_revenues_sheet(MODEL_ID, sheet) for _ in range(5)],
+    )
+
+    assert await get_model_revision(MODEL_ID) == 5
+    assert await get_revenues_sheet(MODEL_ID) == sheet
+
+
+@pytest.mark.anyio
+async def test_patch_sheet_rows_normalized(normalized):
+    sheet = deepcopy(normalized.sheets[0])
+    first, second = sheet.sections[0].rows[:2]
+    assumption = sheet.assumptions[0]
+    end_row = sheet.sections[0].end_row
+    new_row = first.copy(update={"id": "new", "name": "new"})
+
+    result = await patch_sheet_rows(
+        MODEL_ID,
+        sheet,
+        [
+            RowOperation(op="add", row=new_row, section=0, position=0),
+            RowOperation(
+                op="update", row_id=first.id, row=first.copy(update={"name": "x"})
+            ),
+            RowOperation(op="move", row_id=second.id, section=None, position=0),
+            RowOperation(op="delete", row_id=assumption.id),
+            RowOperation(
+                op="update", row_id=end_row.id, row=end_row.copy(update={"value": "1"})
+            ),
+        ],
+        0,
+    )
+
+    assert result.revision == await get_model_revision(MODEL_ID) == 1
+    stored = await get_revenues_sheet(MODEL_ID)
+    assert stored == sheet
+    assert stored.assumptions[0].id == second.id
+    assert [row.id for row in stored.sections[0].rows[:2]] == ["new", first.id]
+    assert stored.sections[0].end_row.value == "1"
+
+    with pytest.raises(RevisionConflictException):
+        await patch_sheet_rows(
+            MODEL_ID,
+            deepcopy(sheet),
+            [RowOperation(op="delete", row_id=first.id)],
+            0,
+        )
+    assert await get_revenues_sheet(MODEL_ID) == sheet
+
+
+@pytest.mark.anyio
+async def test_update_model_employees_normalized(normalized):
+    employees = normalized.payroll.employees[1:] + [
+        Employee(
+            **{
+                "_id": "101",
+                "name": "Saint West",
+                "start_date": "2021-07-12",
+                "end_date": None,
+                "title": "COO",
+                "department": "Operations",
+                "monthly_salary": 3810,
+                "from_integration": False,
+            }
+        )
+    ]
+
+    assert await update_model_employees(MODEL_ID, employees, revision=0) == 1
+    assert (await get_payroll(MODEL_ID)).employees == employees
+    assert await db.model_employees.count_documents({"model_id": MODEL_ID}) == len(
+        employees
+    )
@@ -24,6 +24,16 @@ from core.dao.models import (
     update_model_employees,
     delete_model,
     remove_user_from_model, set_starting_balance,
+    get_model_document,
+    sheet_projection,
+    role_in_model,
+    get_payroll,
+    get_user_role_in_model,
+    model_exists,
+    get_model_windows_for_workspace,
+    set_horizon_months,
+    patch_sheet_rows,
+    get_model_revision,
 )
 from core.dao.workspaces import get_workspace, get_demo_model
 from core.exceptions import (
@@ -31,11 +41,12 @@ from core.exceptions import (
     NoAccessException,
     BusinessLogicException,
     CardinalityConstraintFailedException,
+    RevisionConflictException,
 )
 from datetime import date
 
 from core.schemas.models import Employee, create_new_demo_model
-from core.schemas.sheets import Sheet
+from core.schemas.sheets import Sheet, RowOperation
 
 
 @pytest.mark.anyio
@@ -437,6 +448,45 @@ async def test_get_revenues_sheet():
     assert sheet.meta.name == sheet_name
 
 
+@pytest.mark.anyio
+async def test_get_revenues_sheet_from_document():
+    model_id = "62b488ba433720870b60ec0a"
+    document = await get_model_document(model_id, sheet_projection("Revenues"))
+    assert [s["meta"]["name"] for s in document["sheets"]] == ["Revenues"]
+    assert "payroll" not in document
+
+    sheet = await get_revenues_sheet(model_id, document)
+    assert sheet == await get_revenues_sheet(model_id)
+    assert await get_costs_sheet(model_id, document) is None
+
+
+@pytest.mark.anyio
+async def test_get_model_document_meta_only():
+    document = await get_model_document("62b488ba433720870b60ec0a", {})
+    assert set(document.keys()) == {"_id", "meta"}
+
+
+@pytest.mark.anyio
+async def test_get_model_document_no_results(not_an_id):
+    assert await get_model_document(not_an_id) is None
+
+
+@pytest.mark.anyio
+async def test_role_in_model(users):
+    document = await get_model_document("62b488ba433720870b60ec0a", {})
+    assert role_in_model(document, users["johndoe@example.com"]) == "Admin"
+    assert role_in_model(document, users["darwin@example.com"]) == "Editor"
+    assert role_in_model(document, users["charlie@example.com"]) == "Viewer"
+    assert role_in_model(document, users["bob@example.com"]) is None
+
+
+@pytest.mark.anyio
+async def test_get_payroll():
+    model_id = "62b488ba433720870b60ec0a"
+    model = await get_model_by_id(model_id)
+    assert await get_payroll(model_id) == model.payroll
+
+
 @pytest.mark.anyio
 async def test_get_costs_sheet():
     model_id = "62b488ba433720870b60ec0a"
@@ -568,3 +618,169 @@ async def test_demo_model():
     new_model = create_new_demo_model("admin_id_123", "workspace_id_123", demo_model)
     assert new_model.meta.admins == ["admin_id_123"]
     assert new_model.meta.workspace == "workspace_id_123"
+
+
+@pytest.mark.anyio
+async def test_model_exists(not_an_id):
+    assert await model_exists("62b488ba433720870b60ec0a")
+    assert not await model_exists(not_an_id)
+
+
+@pytest.mark.anyio
+async def test_get_user_role_in_model(users):
+    model_id = "62b488ba433720870b60ec0a"
+    roles = {
+        "johndoe@example.com": "Admin",
+        "darwin@example.com": "Editor",
+        "charlie@example.com": "Viewer",
+        "bob@example.com": None,
+    }
+    for username, role in roles.items():
+        assert await get_user_role_in_model(model_id, users[username]) == role
+
+
+@pytest.mark.anyio
+async def test_get_user_role_in_model_no_results(users, not_an_id):
+    user_id = users["johndoe@example.com"]
+    assert await get_user_role_in_model(not_an_id, user_id) is None
+
+
+@pytest.mark.anyio
+async def test_get_model_windows_for_workspace(workspaces):
+    workspace_id = workspaces["ACME Inc."]
+    assert await get_model_windows_for_workspace(workspace_id) == [
+        (date(2020, 1, 1), 24)
+    ]
+
+    await set_starting_month("62b488ba433720870b60ec0a", date(2021, 6, 1))
+    await set_horizon_months("62b488ba433720870b60ec0a", 36)
+    assert await get_model_windows_for_workspace(workspace_id) == [
+        (date(2021, 6, 1), 36)
+    ]
+
+
+@pytest.mark.anyio
+async def test_patch_sheet_rows():
+    model_id = "62b488ba433720870b60ec0a"
+    sheet = await get_revenues_sheet(model_id)
+    first, second = sheet.sections[0].rows[:2]
+    assumption = sheet.assumptions[0]
+    new_row = first.copy(update={"id": "new", "name": "new"})
+
+    result = await patch_sheet_rows(
+        model_id,
+        sheet,
+        [
+            RowOperation(op="add", row=new_row, section=0, position=0),
+            RowOperation(
+                op="update", row_id=first.id, row=first.copy(update={"name": "x"})
+            ),
+            RowOperation(op="move", row_id=second.id, section=None, position=0),
+            RowOperation(op="delete", row_id=assumption.id),
+        ],
+        0,
+    )
+
+    assert [row.id for row in result.rows] == ["new", first.id, second.id]
+    assert result.deleted == [assumption.id]
+    assert result.revision == await get_model_revision(model_id) == 1
+
+    stored = await get_revenues_sheet(model_id)
+    assert stored == sheet
+    assert stored.assumptions[0].id == second.id
+    assert [row.id for row in stored.sections[0].rows[:2]] == ["new", first.id]
+    assert stored.sections[0].rows[1].name == "x"
+
+
+@pytest.mark.anyio
+async def test_patch_sheet_rows_update_end_row():
+    model_id = "62b488ba433720870b60ec0a"
+    sheet = await get_costs_sheet(model_id)
+    end_row = sheet.sections[0].end_row
+
+    await patch_sheet_rows(
+        model_id,
+        sheet,
+        [
+            RowOperation(
+                op="update", row_id=end_row.id, row=end_row.copy(update={"value": "1"})
+            )
+        ],
+        0,
+    )
+
+    stored = await get_costs_sheet(model_id)
+    assert stored.sections[0].end_row.value == "1"
+    assert stored.sections[0].end_row.id == end_row.id
+
+
+@pytest.mark.anyio
+async def test_patch_sheet_rows_invalid_operation_writes_nothing():
+    model_id = "62b488ba433720870b60ec0a"
+    sheet = await get_revenues_sheet(model_id)
+    before = deepcopy(sheet)
+    row = sheet.sections[0].rows[0]
+
+    with pytest.raises(DoesNotExistException):
+        await patch_sheet_rows(
+            model_id,
+            sheet,
+            [
+                RowOperation(op="delete", row_id=row.id),
+                RowOperation(op="delete", row_id="does not exist"),
+            ],
+            0,
+        )
+    with pytest.raises(BusinessLogicException):
+        await patch_sheet_rows(
+            model_id,
+            deepcopy(before),
+            [RowOperation(op="delete", row_id=before.sections[0].end_row.id)],
+            0,
+        )
+
+    assert await get_revenues_sheet(model_id) == before
+
+
+@pytest.mark.anyio
+async def test_update_sheet_increments_revision():
+    model_id = "62b488ba433720870b60ec0a"
+    sheet = await get_revenues_sheet(model_id)
+
+    assert await get_model_revision(model_id) == 0
+    assert await update_revenues_sheet(model_id, sheet) == 1
+    assert await update_revenues_sheet(model_id, sheet, revision=1) == 2
+    await set_name(model_id, "name")
+    assert await get_model_revision(model_id) == 3
+
+
+@pytest.mark.anyio
+async def test_update_sheet_revision_conflict():
+    model_id = "62b488ba433720870b60ec0a"
+    sheet = await get_revenues_sheet(model_id)
+    await update_revenues_sheet(model_id, sheet)
+
+    sheet_new = Sheet(**sheet.dict())
+    sheet_new.sections[0].name = "changed"
+    with pytest.raises(RevisionConflictException) as e:
+        await update_revenues_sheet(model_id, sheet_new, revision=0)
+
+    assert e.value.revision == 1
+    assert await get_revenues_sheet(model_id) == sheet
+
+
+@pytest.mark.anyio
+async def test_patch_sheet_rows_revision_conflict():
+    model_id = "62b488ba433720870b60ec0a"
+    sheet = await get_revenues_sheet(model_id)
+    await set_name(model_id, "name")
+
+    with pytest.raises(RevisionConflictException):
+        await patch_sheet_rows(
+            model_id,
+            deepcopy(sheet),
+            [RowOperation(op="delete", row_id=sheet.sections[0].rows[0].id)],
+            0,
+        )
+
+    assert await get_revenues_sheet(model_id) == sheet
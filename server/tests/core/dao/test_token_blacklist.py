@@ -1,11 +1,19 @@
+from datetime import datetime
+
 import pytest
 
+from core.dao import token_blacklist
 from core.dao.token_blacklist import (
     add_to_blacklist,
+    clear_blacklist_cache,
+    load_blacklist_filter,
+    setup_blacklist,
+    token_digest,
     count_blacklisted_tokens,
     get_blacklisted,
     is_token_blacklisted,
 )
+from core.dao.database import db
 from core.schemas.tokens import BlacklistToken
 
 
@@ -32,7 +40,9 @@ async def test_get_blacklisted():
 
     await add_to_blacklist(token)
     res = await get_blacklisted(token.access_token)
-    assert res["access_token"] == token.access_token
+    assert res["token_digest"] == token_digest(token.access_token)
+    assert "access_token" not in res
+    assert res["expires_at"] > datetime.utcnow()
 
 
 @pytest.mark.anyio
@@ -60,3 +70,57 @@ async def test_count_blacklisted_tokens():
     assert n == 0
     await add_to_blacklist(token)
     assert await count_blacklisted_tokens() == n + 1
+
+
+@pytest.mark.anyio
+async def test_is_token_blacklisted_bloom_filter(monkeypatch):
+    monkeypatch.setattr(token_blacklist.settings, "TOKEN_BLOOM_FILTER", True)
+    monkeypatch.setattr(token_blacklist, "_blacklist_filter", None)
+
+    await add_to_blacklist(BlacklistToken(access_token="mySecureToken"))
+    clear_blacklist_cache()
+    await load_blacklist_filter()
+
+    assert await is_token_blacklisted("mySecureToken")
+    assert not await is_token_blacklisted("anotherToken")
+
+
+@pytest.mark.anyio
+async def test_is_token_blacklisted_by_other_worker():
+    assert not await is_token_blacklisted("mySecureToken")
+
+    # written by another worker, bypassing the cache of this one
+    await db.token_blacklist.insert_one(
+        {"token_digest": token_digest("mySecureToken"), "expires_at": datetime.utcnow()}
+    )
+    assert await is_token_blacklisted("mySecureToken")
+
+
+@pytest.mark.anyio
+async def test_add_to_blacklist_stores_expiry():
+    expires_at = datetime(2030, 1, 1, 12, 30)
+    token = BlacklistToken(access_token="mySecureToken", expires_at=expires_at)
+
+    await add_to_blacklist(token)
+    res = await get_blacklisted(token.access_token)
+    assert res["expires_at"] == expires_at
+
+
+@pytest.mark.anyio
+async def test_add_to_blacklist_twice():
+    token = BlacklistToken(access_token="mySecureToken")
+
+    await add_to_blacklist(token)
+    await add_to_blacklist(token)
+    assert await count_blacklisted_tokens() == 1
+
+
+@pytest.mark.anyio
+async def test_setup_blacklist():
+    await db.token_blacklist.insert_one({"access_token": "myLegacyToken"})
+
+    await setup_blacklist()
+    clear_blacklist_cache()
+
+    assert await is_token_blacklisted("myLegacyToken")
+    assert await count_blacklisted_tokens() == 1
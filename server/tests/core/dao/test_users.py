@@ -12,6 +12,9 @@ from core.dao.users import (
     update_user_field,
     remove_user_from_workspace,
     get_user_by_username,
+    user_exists,
+    username_exists,
+    get_cached_user_by_username,
 )
 from core.dao.workspaces import (
     get_workspaces_of_user,
@@ -187,3 +190,42 @@ async def test_remove_user_from_workspace_remove_from_models(users, workspaces):
         assert u not in [str(x) for x in m.meta.admins]
         assert u not in [str(x) for x in m.meta.editors]
         assert u not in [str(x) for x in m.meta.viewers]
+
+
+@pytest.mark.anyio
+async def test_user_exists(users, not_an_id):
+    assert await user_exists(users["johndoe@example.com"])
+    assert not await user_exists(not_an_id)
+
+
+@pytest.mark.anyio
+async def test_username_exists():
+    assert await username_exists("johndoe@example.com")
+    assert not await username_exists("nobody@example.com")
+
+
+@pytest.mark.anyio
+async def test_get_cached_user_by_username_invalidated_on_update(users):
+    user = await get_cached_user_by_username("johndoe@example.com")
+    assert user.id == users["johndoe@example.com"]
+
+    await update_user_field(user.id, "first_name", "Jane")
+    user = await get_cached_user_by_username("johndoe@example.com")
+    assert user.first_name == "Jane"
+
+
+@pytest.mark.anyio
+async def test_get_cached_user_by_username_invalidated_on_username_update(users):
+    await get_cached_user_by_username("johndoe@example.com")
+    await update_username(users["johndoe@example.com"], "john@example.com")
+
+    assert await get_cached_user_by_username("johndoe@example.com") is None
+    assert await get_cached_user_by_username("john@example.com") is not None
+
+
+@pytest.mark.anyio
+async def test_get_cached_user_by_username_invalidated_on_delete(users):
+    await get_cached_user_by_username("bob@example.com")
+    await delete_user_full(users["bob@example.com"])
+
+    assert await get_cached_user_by_username("bob@example.com") is None
@@ -13,6 +13,8 @@ from core.dao.workspaces import (
     get_users_of_workspace,
     get_workspace_by_name,
     add_user_to_workspace,
+    workspace_exists,
+    workspace_name_exists,
 )
 from core.exceptions import UniqueConstraintFailedException, DoesNotExistException
 from core.schemas.workspaces import Workspace
@@ -228,3 +230,15 @@ async def test_add_user_to_workspace_idempotent(users, workspaces):
     workspace_after = await get_workspace(wsp)
     assert len(workspace_after.users) - len(workspace_before.users) == 1
     assert len([str(x) for x in workspace_after.users if str(x) == u]) == 1
+
+
+@pytest.mark.anyio
+async def test_workspace_exists(workspaces, not_an_id):
+    assert await workspace_exists(workspaces["ACME Inc."])
+    assert not await workspace_exists(not_an_id)
+
+
+@pytest.mark.anyio
+async def test_workspace_name_exists():
+    assert await workspace_name_exists("ACME Inc.")
+    assert not await workspace_name_exists("Nobody Inc.")
@@ -1,10 +1,18 @@
+import asyncio
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from core.dao.integrations import acquire_integration_lease, set_accounting_cache
+from core.integrations.adapters import adapter
 from core.integrations.adapters.gusto_adapter import GustoFetchAdapter
-from core.schemas.cache import DataBatch
+from core.schemas.cache import DataBatch, DataBatchCache
 from core.integrations.adapters.xero_adapter import XeroFetchAdapter
 from core.schemas.models import Employee
 from core.schemas.utils import DateString
+from core.utils import first_of_same_month
 from tests.factory import _read_json
-from datetime import date
+from datetime import date, datetime, timezone, timedelta
 from copy import deepcopy
 
 
@@ -62,7 +70,7 @@ def test_process_batch():
     batch = _read_json("resources/xero_profitloss.json")
     processed = XeroFetchAdapter("")._process_batch(batch)
     try:
-        DataBatch(**processed)
+        DataBatch.from_dict(**processed)
         assert True
     except ValueError:
         assert False
@@ -72,7 +80,7 @@ def test_process_batch_balance():
     batch = _read_json("resources/xero_balance.json")
     processed = XeroFetchAdapter("")._process_batch(batch)
     try:
-        DataBatch(**processed)
+        DataBatch.from_dict(**processed)
         assert True
     except ValueError:
         assert False
@@ -84,7 +92,7 @@ def test_merge_batches():
     batches = [xfa._process_batch(b) for b in batches]
     merged = xfa._merge_batches(batches)
     try:
-        DataBatch(**merged)
+        DataBatch.from_dict(**merged)
         assert True
     except ValueError:
         assert False
@@ -428,3 +436,281 @@ def test_gusto_process_employees_handle_compensation_hourly_part_time_under_twen
 
     assert len(processed) == 1
     assert processed[0].monthly_salary == 10 * 20 * 4.33
+
+
+@pytest.mark.anyio
+async def test_get_cached_or_fetch_single_flight():
+    xfa = XeroFetchAdapter("62bc5706a40e85213c27ce28")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        data_batch = DataBatch.from_dict([], {"Sales": {}})
+        await xfa.set_cached(data_batch, 123)
+        return data_batch
+
+    results = await asyncio.gather(
+        *[xfa.get_cached_or_fetch(123, fetch) for _ in range(5)]
+    )
+
+    assert len(calls) == 1
+    assert all(r.to_dict() == {"Sales": {}} for r in results)
+
+
+@pytest.mark.anyio
+async def test_get_cached_or_fetch_joined_fetch_does_not_cover():
+    xfa = XeroFetchAdapter("62bc5706a40e85213c27ce28")
+
+    def fetch(title: str):
+        async def _fetch():
+            await asyncio.sleep(0.05)
+            data_batch = DataBatch.from_dict([], {title: {}})
+            await xfa.set_cached(data_batch, 123)
+            return data_batch
+
+        return _fetch
+
+    # e.g. a model with a longer horizon joins the fetch for a shorter one
+    short, long = await asyncio.gather(
+        xfa.get_cached_or_fetch(123, fetch("Short")),
+        xfa.get_cached_or_fetch(
+            123,
+            fetch("Long"),
+            lambda cached: "Long" in cached.to_data_batch().endpoints,
+        ),
+    )
+
+    assert short.to_dict() == {"Short": {}}
+    assert long.to_dict() == {"Long": {}}
+
+
+@pytest.mark.anyio
+async def test_get_cached_or_fetch_waits_for_lease(monkeypatch):
+    monkeypatch.setattr(adapter, "LEASE_POLL_INTERVAL", 0.01)
+    xfa = XeroFetchAdapter("62bc5706a40e85213c27ce28")
+
+    # another worker is fetching the data
+    lease = f"{xfa.workspace_id}:Xero:123"
+    assert await acquire_integration_lease(lease, "other-worker", 60)
+
+    async def fetch():
+        raise AssertionError("Must not fetch while another worker holds the lease")
+
+    async def fetch_other_worker():
+        await asyncio.sleep(0.05)
+        await xfa.set_cached(DataBatch.from_dict([], {"Sales": {}}), 123)
+
+    result, _ = await asyncio.gather(
+        xfa.get_cached_or_fetch(123, fetch), fetch_other_worker()
+    )
+    assert result.to_dict() == {"Sales": {}}
+
+
+@pytest.mark.anyio
+async def test_get_cached_or_fetch_caller_timeout_does_not_cancel_fetch():
+    xfa = XeroFetchAdapter("62bc5706a40e85213c27ce28")
+
+    async def fetch():
+        await asyncio.sleep(0.1)
+        data_batch = DataBatch.from_dict([], {"Sales": {}})
+        await xfa.set_cached(data_batch, 123)
+        return data_batch
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(xfa.get_cached_or_fetch(123, fetch), timeout=0.01)
+
+    await asyncio.sleep(0.2)
+    assert (await xfa.get_cached(123)).to_dict() == {"Sales": {}}
+
+
+def test_cache_state():
+    xfa = XeroFetchAdapter("")
+    fresh, expire = xfa.cache_policy()
+    now = datetime.now(timezone.utc)
+
+    assert xfa.cache_state(now) == "fresh"
+    assert xfa.cache_state(now - timedelta(seconds=fresh + 1)) == "stale"
+    assert xfa.cache_state(now - timedelta(seconds=expire + 1)) == "expired"
+    # naive times are in UTC
+    assert xfa.cache_state(now.replace(tzinfo=None)) == "fresh"
+
+
+async def _set_cache_with_age(xfa: XeroFetchAdapter, age: int, title: str):
+    await set_accounting_cache(
+        DataBatchCache.from_data_batch(
+            DataBatch.from_dict([], {title: {}}),
+            created_at=datetime.now(timezone.utc) - timedelta(seconds=age),
+            workspace_id=xfa.workspace_id,
+            integration=xfa.integration(),
+            from_date=123,
+        )
+    )
+
+
+@pytest.mark.anyio
+async def test_get_cached_or_fetch_stale_refreshes_in_background():
+    xfa = XeroFetchAdapter("62bc5706a40e85213c27ce28")
+    fresh, _ = xfa.cache_policy()
+    await _set_cache_with_age(xfa, fresh + 1, "Old")
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        data_batch = DataBatch.from_dict([], {"New": {}})
+        await xfa.set_cached(data_batch, 123)
+        return data_batch
+
+    result = await xfa.get_cached_or_fetch(123, fetch)
+    assert result.to_dict() == {"Old": {}}
+
+    await asyncio.sleep(0.2)
+    assert (await xfa.get_cached_or_fetch(123, fetch)).to_dict() == {"New": {}}
+
+
+@pytest.mark.anyio
+async def test_get_cached_or_fetch_expired_refreshes():
+    xfa = XeroFetchAdapter("62bc5706a40e85213c27ce28")
+    _, expire = xfa.cache_policy()
+    await _set_cache_with_age(xfa, expire + 1, "Old")
+
+    async def fetch():
+        data_batch = DataBatch.from_dict([], {"New": {}})
+        await xfa.set_cached(data_batch, 123)
+        return data_batch
+
+    result = await xfa.get_cached_or_fetch(123, fetch)
+    assert result.to_dict() == {"New": {}}
+
+
+def _data_batch_cache(data: dict, fetched_at: dict) -> DataBatchCache:
+    dates = sorted({d for timeseries in data.values() for d in timeseries})
+    return DataBatchCache.from_data_batch(
+        DataBatch.from_dict(dates, data),
+        created_at=datetime.now(timezone.utc),
+        workspace_id="62bc5706a40e85213c27ce28",
+        integration="Xero",
+        from_date=123,
+        fetched_at=fetched_at,
+    )
+
+
+def test_months_to_refresh_not_cached():
+    xfa = XeroFetchAdapter("")
+    now = datetime(2022, 3, 15, tzinfo=timezone.utc)
+
+    refresh = xfa._months_to_refresh(None, date(2022, 1, 1), date(2022, 6, 30), now)
+    assert refresh == (date(2022, 1, 1), date(2022, 6, 30))
+
+
+def test_months_to_refresh_only_recent_months():
+    xfa = XeroFetchAdapter("")
+    now = datetime(2022, 3, 15, tzinfo=timezone.utc)
+    fetched_at = {
+        # final, fetched long after the end of the month
+        "2022-01-31": datetime(2022, 3, 14),
+        # the month ended recently
+        "2022-02-28": datetime(2022, 3, 14),
+        # the month has not ended
+        "2022-03-31": datetime(2022, 3, 14),
+        # the month has not started
+        "2022-04-30": datetime(2022, 3, 14),
+    }
+    cached = _data_batch_cache({}, fetched_at)
+
+    refresh = xfa._months_to_refresh(cached, date(2022, 1, 1), date(2022, 4, 30), now)
+    assert refresh == (date(2022, 2, 1), date(2022, 3, 31))
+
+
+def test_months_to_refresh_all_final():
+    xfa = XeroFetchAdapter("")
+    now = datetime(2022, 3, 15, tzinfo=timezone.utc)
+    cached = _data_batch_cache({}, {"2021-12-31": datetime(2022, 3, 1)})
+
+    refresh = xfa._months_to_refresh(cached, date(2021, 12, 1), date(2021, 12, 31), now)
+    assert refresh is None
+
+
+def test_merge_months():
+    cached = _data_batch_cache(
+        {
+            "Sales": {"2022-01-31": 1, "2022-02-28": 2},
+            "Closed": {"2022-01-31": 3, "2022-02-28": 4},
+        },
+        {},
+    )
+    # the batch starts before the refreshed months
+    fetched = DataBatch.from_dict(
+        ["2022-01-31", "2022-02-28", "2022-03-31"],
+        {
+            "Sales": {"2022-01-31": 10, "2022-02-28": 20, "2022-03-31": 30},
+            "New": {"2022-01-31": 4, "2022-02-28": 5, "2022-03-31": 6},
+        },
+    )
+
+    merged = XeroFetchAdapter._merge_months(
+        cached, fetched, (date(2022, 2, 1), date(2022, 3, 31))
+    )
+
+    data = merged.to_dict()
+    assert merged.date_strings() == ["2022-01-31", "2022-02-28", "2022-03-31"]
+    assert data["Sales"] == {"2022-01-31": 1, "2022-02-28": 20, "2022-03-31": 30}
+    # values of refetched months are not kept for rows that no longer exist
+    assert data["Closed"] == {
+        "2022-01-31": 3,
+        "2022-02-28": None,
+        "2022-03-31": None,
+    }
+    assert data["New"] == {"2022-01-31": None, "2022-02-28": 5, "2022-03-31": 6}
+
+
+@pytest.mark.anyio
+async def test_get_batches_requests_only_periods_of_batch(monkeypatch):
+    xfa = XeroFetchAdapter("")
+    requested = []
+
+    async def retrieve_profit_and_loss(from_date, to_date, periods):
+        requested.append(("pl", to_date, periods))
+
+    async def retrieve_balance_sheet(to_date, periods):
+        requested.append(("bs", to_date, periods))
+
+    monkeypatch.setattr(xfa, "_retrieve_profit_and_loss", retrieve_profit_and_loss)
+    monkeypatch.setattr(xfa, "_retrieve_balance_sheet", retrieve_balance_sheet)
+
+    await xfa._get_batches(date(2022, 2, 1), date(2022, 3, 31))
+    await xfa._get_batches(date(2022, 3, 1), date(2023, 2, 28))
+
+    assert requested == [
+        ("pl", date(2022, 3, 31), 2),
+        ("bs", date(2022, 3, 31), 2),
+        ("pl", date(2023, 2, 28), 11),
+        ("bs", date(2023, 2, 28), 11),
+    ]
+
+
+@pytest.mark.anyio
+async def test_fetch_data_requests_only_recent_months(monkeypatch):
+    xfa = XeroFetchAdapter("62bc5706a40e85213c27ce28")
+    today = date.today()
+    from_date = today - relativedelta(months=30)
+
+    # everything but the last two months is final
+    month_ends = xfa._month_ends(from_date, xfa._window_end(from_date))
+    settled = {d: datetime.now(timezone.utc) for d in month_ends[:-2]}
+    data = {"Sales": {d: 1.0 for d in month_ends}}
+    await set_accounting_cache(_data_batch_cache(data, settled))
+
+    requested = []
+
+    async def get_batches(from_date, to_date=None):
+        requested.append((from_date, to_date))
+        return []
+
+    monkeypatch.setattr(xfa, "_get_batches", get_batches)
+    result = await xfa._fetch_data(from_date, 123)
+
+    assert requested == [
+        (first_of_same_month(month_ends[-2].to_date()), month_ends[-1].to_date())
+    ]
+    assert result.to_dict()["Sales"][month_ends[0]] == 1.0
+    assert set((await xfa._get_cache_entry(123)).fetched_at) == set(month_ends)
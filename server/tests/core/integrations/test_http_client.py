@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from core.integrations import http_client
+from core.integrations.http_client import ProviderClient
+from core.schemas.integrations import IntegrationAccess, IntegrationAccessToken
+
+INTEGRATION_ACCESS = IntegrationAccess(
+    workspace_id="62bc5706a40e85213c27ce28",
+    integration="Xero",
+    token=IntegrationAccessToken(
+        access_token="token",
+        expires_in=1800,
+        token_type="Bearer",
+        refresh_token="refresh",
+        expires_at=int(time.time()) + 1800,
+    ),
+    tenant_id="tenant",
+)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(http_client.settings, "INTEGRATION_HTTP_BACKOFF", 0)
+
+
+def _client(handler) -> ProviderClient:
+    return ProviderClient(
+        "Xero", "https://api.example.com/", transport=httpx.MockTransport(handler)
+    )
+
+
+@pytest.mark.anyio
+async def test_get_authorized():
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json={"ok": True})
+
+    client = _client(handler)
+    response = await client.get("api/Reports", INTEGRATION_ACCESS, params={"a": 1})
+    await client.aclose()
+
+    assert response.json() == {"ok": True}
+    assert str(requests[0].url) == "https://api.example.com/api/Reports?a=1"
+    assert requests[0].headers["Authorization"] == "Bearer token"
+    assert client.metrics.count == {200: 1}
+
+
+@pytest.mark.anyio
+async def test_get_retries_server_errors():
+    responses = iter([httpx.Response(503), httpx.Response(502), httpx.Response(200)])
+
+    client = _client(lambda request: next(responses))
+    response = await client.get("api", INTEGRATION_ACCESS)
+    await client.aclose()
+
+    assert response.status_code == 200
+    assert client.metrics.retries == 2
+    assert client.metrics.count == {200: 1, 502: 1, 503: 1}
+
+
+@pytest.mark.anyio
+async def test_get_gives_up_after_retries(monkeypatch):
+    monkeypatch.setattr(http_client.settings, "INTEGRATION_HTTP_RETRIES", 2)
+    calls = []
+
+    def handler(request: httpx.Request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    client = _client(handler)
+    response = await client.get("api", INTEGRATION_ACCESS)
+    await client.aclose()
+
+    assert response.status_code == 500
+    assert len(calls) == 3
+
+
+@pytest.mark.anyio
+async def test_get_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request: httpx.Request):
+        calls.append(request)
+        return httpx.Response(404)
+
+    client = _client(handler)
+    response = await client.get("api", INTEGRATION_ACCESS)
+    await client.aclose()
+
+    assert response.status_code == 404
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_get_retries_transport_errors():
+    responses = iter([httpx.ConnectError("refused"), httpx.Response(200)])
+
+    def handler(request: httpx.Request):
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    client = _client(handler)
+    response = await client.get("api", INTEGRATION_ACCESS)
+    await client.aclose()
+
+    assert response.status_code == 200
+    assert client.metrics.count == {0: 1, 200: 1}
+
+
+@pytest.mark.anyio
+async def test_get_honours_retry_after():
+    responses = iter(
+        [httpx.Response(429, headers={"Retry-After": "0.1"}), httpx.Response(200)]
+    )
+
+    client = _client(lambda request: next(responses))
+    start = time.monotonic()
+    response = await client.get("api", INTEGRATION_ACCESS)
+    await client.aclose()
+
+    assert response.status_code == 200
+    assert time.monotonic() - start >= 0.1
+
+
+@pytest.mark.anyio
+async def test_get_does_not_wait_for_long_retry_after():
+    client = _client(
+        lambda request: httpx.Response(429, headers={"Retry-After": "3600"})
+    )
+    response = await client.get("api", INTEGRATION_ACCESS)
+    await client.aclose()
+
+    assert response.status_code == 429
+    assert client.metrics.retries == 0
+
+
+@pytest.mark.anyio
+async def test_get_limits_concurrency_per_tenant(monkeypatch):
+    monkeypatch.setattr(http_client.settings, "INTEGRATION_HTTP_TENANT_CONCURRENCY", 2)
+    running = 0
+    max_running = 0
+
+    async def handler(request: httpx.Request):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return httpx.Response(200)
+
+    client = _client(handler)
+    await asyncio.gather(*[client.get("api", INTEGRATION_ACCESS) for _ in range(6)])
+    await client.aclose()
+
+    assert max_running == 2
+
+
+def test_retry_after():
+    def response(value: str) -> httpx.Response:
+        return httpx.Response(429, headers={"Retry-After": value})
+
+    assert ProviderClient._retry_after(response("5")) == 5
+    assert ProviderClient._retry_after(response("Wed, 21 Oct 2015 07:28:00 GMT")) == 0
+    assert ProviderClient._retry_after(response("invalid")) is None
+    assert ProviderClient._retry_after(httpx.Response(429)) is None
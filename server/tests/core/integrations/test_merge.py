@@ -1,15 +1,21 @@
+import asyncio
 from datetime import date
 
 import pytest
 from pytest import approx
 
-from core.dao.models import get_revenues_sheet
+from core.dao.models import get_revenues_sheet, get_model_by_id
+from core.integrations import merge
+from core.integrations.adapters.gusto_adapter import GustoFetchAdapter
+from core.integrations.adapters.xero_adapter import XeroFetchAdapter
+from core.integrations.config import ADAPTERS
 from core.schemas.integrations import IntegrationProvider
 from core.schemas.rows import Row, DateValue
 from core.schemas.cache import DataBatch
 from core.integrations.merge import (
     parse_value,
     merge_accounting_integration_data,
+    merge_payroll_integration_data,
     process_row,
     months_list_from_date,
     total_salary_per_month,
@@ -58,6 +64,59 @@ async def test_merge_integration_data():
     assert len(sheet.sections[0].rows[1].integration_values) > 0
 
 
+class SlowXeroFetchAdapter(XeroFetchAdapter):
+    async def get_data(self, from_date: date, horizon_months: int = 24):
+        await asyncio.sleep(10)
+
+
+class FailingXeroFetchAdapter(XeroFetchAdapter):
+    async def get_data(self, from_date: date, horizon_months: int = 24):
+        raise ValueError("Provider not available")
+
+
+class FailingGustoFetchAdapter(GustoFetchAdapter):
+    async def get_data(self, from_date: date, horizon_months: int = 24):
+        raise ValueError("Provider not available")
+
+
+@pytest.mark.anyio
+async def test_merge_integration_data_adapter_timeout(monkeypatch):
+    monkeypatch.setitem(ADAPTERS, "Xero", lambda w: SlowXeroFetchAdapter(w))
+    monkeypatch.setattr(merge.settings, "INTEGRATION_TIMEOUT", 0.01)
+
+    sheet = await get_revenues_sheet("62b488ba433720870b60ec0a")
+    workspace_id = "62bc5706a40e85213c27ce29"
+
+    await merge_accounting_integration_data(sheet, workspace_id, date(2020, 1, 1))
+
+    assert sheet.sections[0].rows[1].integration_values is None
+
+
+@pytest.mark.anyio
+async def test_merge_integration_data_adapter_failure(monkeypatch):
+    monkeypatch.setitem(ADAPTERS, "Xero", lambda w: FailingXeroFetchAdapter(w))
+
+    sheet = await get_revenues_sheet("62b488ba433720870b60ec0a")
+    workspace_id = "62bc5706a40e85213c27ce29"
+
+    await merge_accounting_integration_data(sheet, workspace_id, date(2020, 1, 1))
+
+    assert sheet.sections[0].rows[1].integration_values is None
+
+
+@pytest.mark.anyio
+async def test_merge_payroll_integration_data_adapter_failure(monkeypatch):
+    monkeypatch.setitem(ADAPTERS, "Gusto", lambda w: FailingGustoFetchAdapter(w))
+
+    model = await get_model_by_id("62b488ba433720870b60ec0a")
+    employees = [*model.payroll.employees]
+    workspace_id = "62bc5706a40e85213c27ce29"
+
+    await merge_payroll_integration_data(employees, workspace_id, date(2020, 1, 1))
+
+    assert len(employees) == len(model.payroll.employees)
+
+
 def test_process_row_integration():
     row = Row(
         name="name",
@@ -73,11 +132,9 @@ def test_process_row_integration():
         integration_values=None,
     )
     data_batches: dict[IntegrationProvider, DataBatch] = {
-        "Xero": DataBatch(
-            **{
-                "dates": ["2020-05-31", "2020-06-30"],
-                "data": {"Total Income": {"2020-05-31": "1", "2020-06-30": "2"}},
-            }
+        "Xero": DataBatch.from_dict(
+            ["2020-05-31", "2020-06-30"],
+            {"Total Income": {"2020-05-31": 1, "2020-06-30": 2}},
         )
     }
     process_row(row, data_batches)
@@ -88,6 +145,33 @@ def test_process_row_integration():
     ]
 
 
+def test_process_row_missing_values():
+    row = Row(
+        name="name",
+        val_type="number",
+        editable=True,
+        var_type="integration",
+        time_series=True,
+        starting_at=0,
+        first_value_diff=False,
+        value="100",
+        integration_name="Xero[Total Income]",
+        value_1=None,
+        integration_values=None,
+    )
+    data_batches: dict[IntegrationProvider, DataBatch] = {
+        "Xero": DataBatch.from_dict(
+            ["2020-05-31", "2020-06-30"], {"Total Income": {"2020-06-30": 2}}
+        )
+    }
+    process_row(row, data_batches)
+
+    assert row.integration_values == [
+        DateValue(date=date(2020, 5, 31), value=None),
+        DateValue(date=date(2020, 6, 30), value="2.0"),
+    ]
+
+
 def test_process_row_ignores_formula_row():
     row = Row(
         name="name",
@@ -102,11 +186,9 @@ def test_process_row_ignores_formula_row():
         integration_values=None,
     )
     data_batches: dict[IntegrationProvider, DataBatch] = {
-        "Xero": DataBatch(
-            **{
-                "dates": ["2020-05-31", "2020-06-30"],
-                "data": {"Total Income": {"2020-05-31": "1", "2020-06-30": "2"}},
-            }
+        "Xero": DataBatch.from_dict(
+            ["2020-05-31", "2020-06-30"],
+            {"Total Income": {"2020-05-31": 1, "2020-06-30": 2}},
         )
     }
     process_row(row, data_batches)
@@ -128,11 +210,9 @@ def test_process_row_ignores_value_row():
         integration_values=None,
     )
     data_batches: dict[IntegrationProvider, DataBatch] = {
-        "Xero": DataBatch(
-            **{
-                "dates": ["2020-05-31", "2020-06-30"],
-                "data": {"Total Income": {"2020-05-31": "1", "2020-06-30": "2"}},
-            }
+        "Xero": DataBatch.from_dict(
+            ["2020-05-31", "2020-06-30"],
+            {"Total Income": {"2020-05-31": 1, "2020-06-30": 2}},
         )
     }
     process_row(row, data_batches)
@@ -140,6 +220,24 @@ def test_process_row_ignores_value_row():
     assert row.integration_values is None
 
 
+def test_process_row_clears_values_of_other_rows():
+    row = Row(
+        name="name",
+        val_type="number",
+        editable=True,
+        var_type="value",
+        time_series=True,
+        starting_at=0,
+        first_value_diff=False,
+        value="500.0",
+        value_1=None,
+        integration_values=[DateValue(date=date(2020, 5, 31), value="1.0")],
+    )
+    process_row(row, {})
+
+    assert row.integration_values is None
+
+
 def test_months_list_from_date():
     months = months_list_from_date(date(2022, 1, 1), date(2022, 4, 1))
     assert len(months) == 4
@@ -1,8 +1,11 @@
+import asyncio
 import time
 
 import pytest
 from fastapi import HTTPException
 
+from core.dao.database import db
+from core.dao.integrations import add_integration_for_workspace
 from core.schemas.integrations import IntegrationAccess, IntegrationAccessToken
 from core.integrations.oauth.xero_oauth import (
     xero_integration_oauth,
@@ -92,3 +95,42 @@ def test_integration_access_has_expired_true_in_buffer():
 
 def test_integration_access_has_expired_false(never_expired_xero_token):
     assert not never_expired_xero_token.has_expired()
+
+
+@pytest.mark.anyio
+async def test_get_integration_access_cached(never_expired_xero_token):
+    await add_integration_for_workspace(never_expired_xero_token)
+    workspace_id = never_expired_xero_token.workspace_id
+
+    first = await xero_integration_oauth.get_integration_access(workspace_id)
+
+    # served from the cache without reading the database
+    await db.integration_access.delete_many({})
+    second = await xero_integration_oauth.get_integration_access(workspace_id)
+    assert second == first
+
+
+@pytest.mark.anyio
+async def test_get_integration_access_refreshes_once(
+    monkeypatch, expired_xero_token, never_expired_xero_token
+):
+    await add_integration_for_workspace(expired_xero_token)
+    workspace_id = expired_xero_token.workspace_id
+    refreshes = []
+
+    async def perform_token_refresh(integration_access):
+        refreshes.append(integration_access)
+        await asyncio.sleep(0.05)
+        await add_integration_for_workspace(never_expired_xero_token)
+        return never_expired_xero_token
+
+    monkeypatch.setattr(
+        xero_integration_oauth, "_perform_token_refresh", perform_token_refresh
+    )
+
+    results = await asyncio.gather(
+        *[xero_integration_oauth.get_integration_access(workspace_id) for _ in range(5)]
+    )
+
+    assert len(refreshes) == 1
+    assert all(not r.has_expired() for r in results)
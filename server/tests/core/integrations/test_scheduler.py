@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+
+from core.dao.integrations import set_requires_reconnect
+from core.dao.models import set_starting_month
+from core.integrations import scheduler
+from core.integrations.adapters.gusto_adapter import GustoFetchAdapter
+from core.integrations.adapters.xero_adapter import XeroFetchAdapter
+from core.integrations.config import ADAPTERS
+from core.integrations.scheduler import prewarm_caches, _cache_windows
+
+warmed = []
+
+
+class MockXeroFetchAdapter(XeroFetchAdapter):
+    async def warm_cache(self, from_date: date, horizon_months: int = 24):
+        warmed.append((self.workspace_id, self.integration(), from_date))
+
+
+class FailingGustoFetchAdapter(GustoFetchAdapter):
+    async def warm_cache(self, from_date: date, horizon_months: int = 24):
+        raise ValueError("Provider not available")
+
+
+@pytest.fixture
+def mock_adapters(monkeypatch):
+    warmed.clear()
+    monkeypatch.setitem(ADAPTERS, "Xero", lambda w: MockXeroFetchAdapter(w))
+    monkeypatch.setitem(ADAPTERS, "Gusto", lambda w: FailingGustoFetchAdapter(w))
+    monkeypatch.setattr(scheduler.settings, "INTEGRATION_PREWARM_JITTER", 0)
+
+
+@pytest.mark.anyio
+async def test_prewarm_caches(mock_adapters, workspaces):
+    workspace_id = workspaces["ACME Inc."]
+    await set_requires_reconnect(workspace_id, "Xero", False)
+    await set_requires_reconnect(workspace_id, "Gusto", False)
+
+    await prewarm_caches()
+
+    assert warmed == [(workspace_id, "Xero", date(2020, 1, 1))]
+
+
+@pytest.mark.anyio
+async def test_prewarm_caches_skips_reconnect(mock_adapters, workspaces):
+    workspace_id = workspaces["ACME Inc."]
+    await set_requires_reconnect(workspace_id, "Xero", True)
+
+    await prewarm_caches()
+
+    assert warmed == []
+
+
+@pytest.mark.anyio
+async def test_prewarm_caches_per_cache_date(mock_adapters, workspaces):
+    workspace_id = workspaces["ACME Inc."]
+    await set_requires_reconnect(workspace_id, "Xero", False)
+
+    # same cache date as 2020-01-01
+    await set_starting_month("62b488ba433720870b60ec0a", date(2020, 1, 15))
+    await prewarm_caches()
+    assert len(warmed) == 1
+
+    warmed.clear()
+    await set_starting_month("62b488ba433720870b60ec0a", date(2021, 6, 1))
+    await prewarm_caches()
+    assert warmed == [(workspace_id, "Xero", date(2021, 6, 1))]
+
+
+def test_cache_windows():
+    windows = [
+        (date(2020, 1, 1), 24),
+        # same cache date, longer horizon
+        (date(2020, 1, 15), 36),
+        # same cache date, later start
+        (date(2020, 2, 1), 36),
+        (date(2021, 6, 1), 12),
+    ]
+    assert _cache_windows(windows) == [
+        (date(2020, 1, 1), 37),
+        (date(2021, 6, 1), 12),
+    ]
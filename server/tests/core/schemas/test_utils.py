@@ -1,6 +1,12 @@
+from datetime import date
+
 import pytest
+from pydantic import ValidationError
 
-from core.schemas.utils import DateString
+from core.schemas.models import Model
+from core.schemas.rows import Row
+from core.schemas.utils import DateString, construct_trusted
+from tests.factory import models
 
 
 def test_date_string():
@@ -25,3 +31,39 @@ def test_date_string_leading_zero_year():
 def test_date_string_non_existent_day():
     with pytest.raises(ValueError):
         DateString.validate("2020-02-31")
+
+
+def test_construct_trusted_matches_validation():
+    for document in models:
+        model = construct_trusted(Model, document)
+        assert model == Model(**document)
+        assert isinstance(model.sheets[0].assumptions[0], Row)
+        assert isinstance(model.meta.starting_month, date)
+
+
+def test_construct_trusted_validates_other_types():
+    document = {
+        "_id": "1",
+        "name": "Row",
+        "val_type": "number",
+        "editable": True,
+        "var_type": "integration",
+        "time_series": True,
+        "starting_at": 0,
+        "first_value_diff": False,
+        "value": "",
+        "integration_values": [{"date": "2020-01-31", "value": 1.5}],
+    }
+    row = construct_trusted(Row, document)
+    assert row.id == "1"
+    assert row.integration_name is None
+    assert row.decimal_places == 2
+    assert row.integration_values[0].date == date(2020, 1, 31)
+    assert row.integration_values[0].value == "1.5"
+
+    with pytest.raises(ValidationError):
+        construct_trusted(Row, {**document, "integration_values": [{"date": "x"}]})
+    with pytest.raises(ValidationError):
+        construct_trusted(Row, {**document, "val_type": "date"})
+    with pytest.raises(ValidationError):
+        construct_trusted(Row, {k: v for k, v in document.items() if k != "name"})
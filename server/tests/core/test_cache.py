@@ -0,0 +1,58 @@
+import time
+
+from core.cache import TTLCache, BloomFilter
+
+
+def test_ttl_cache_get_set():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("b", 0) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_cache_expires():
+    cache = TTLCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert list(cache.items()) == []
+
+
+def test_ttl_cache_invalidate():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    cache.invalidate("c")
+    assert list(cache.items()) == [("b", 2)]
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_bloom_filter_no_false_negatives():
+    bloom_filter = BloomFilter(capacity=1000)
+    items = [f"token{i}" for i in range(1000)]
+    for item in items:
+        bloom_filter.add(item)
+    assert all(item in bloom_filter for item in items)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom_filter.add(f"token{i}")
+    false_positives = sum(f"other{i}" in bloom_filter for i in range(10000))
+    assert false_positives < 300
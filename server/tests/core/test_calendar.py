@@ -0,0 +1,66 @@
+from calendar import monthrange
+from datetime import date
+
+import numpy as np
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from core.calendar import (
+    month_bounds,
+    first_of_month,
+    last_of_month,
+    days_in_month,
+    parse_date,
+    to_datetime64,
+    month_ends,
+)
+from core.schemas.utils import DateString
+
+
+def test_month_bounds():
+    assert month_bounds(2020, 2) == (date(2020, 2, 1), date(2020, 2, 29))
+    assert month_bounds(2021, 2) == (date(2021, 2, 1), date(2021, 2, 28))
+    # outside of the table
+    assert month_bounds(1900, 2) == (date(1900, 2, 1), date(1900, 2, 28))
+    assert month_bounds(2200, 12) == (date(2200, 12, 1), date(2200, 12, 31))
+
+
+def test_first_and_last_of_month():
+    assert first_of_month(date(2020, 4, 17)) == date(2020, 4, 1)
+    assert last_of_month(date(2020, 4, 17)) == date(2020, 4, 30)
+    assert days_in_month(2020, 4) == monthrange(2020, 4)[1]
+
+
+def test_parse_date():
+    assert parse_date("2020-01-31") == date(2020, 1, 31)
+    assert parse_date("31 Jan 20", ("%d %b %y", "%d %b %Y")) == date(2020, 1, 31)
+    assert parse_date("31 Jan 2020", ("%d %b %y", "%d %b %Y")) == date(2020, 1, 31)
+
+    with pytest.raises(ValueError):
+        parse_date("2020-02-31")
+    with pytest.raises(ValueError):
+        parse_date("31 Jan 2020")
+
+
+def test_to_datetime64():
+    dates = [date(1969, 12, 31), date(2020, 2, 29), date(2022, 12, 31)]
+    assert np.array_equal(to_datetime64(dates), np.array(dates, dtype="datetime64[D]"))
+    assert len(to_datetime64([])) == 0
+
+
+def test_month_ends():
+    expected, month = [], date(2019, 11, 1)
+    while month <= date(2022, 3, 1):
+        expected.append(last_of_month(month))
+        month += relativedelta(months=1)
+
+    assert month_ends(date(2019, 11, 30), date(2022, 3, 1)) == expected
+    assert month_ends(date(2020, 2, 3), date(2020, 2, 10)) == [date(2020, 2, 29)]
+    assert month_ends(date(2020, 3, 1), date(2020, 2, 1)) == []
+
+
+def test_date_string_interned():
+    date_string = DateString.validate("2020-01-31")
+    assert DateString.validate(date(2020, 1, 31)) is date_string
+    assert date_string.to_date() == date(2020, 1, 31)
+    assert DateString("2020-02-29").to_date() == date(2020, 2, 29)
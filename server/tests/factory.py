@@ -4,9 +4,14 @@ from pydantic import BaseModel
 
 from core.dao.database import db
 import json
-from datetime import datetime
-
-from core.dao.integrations import add_integration_for_workspace
+from datetime import datetime, timezone
+
+from core.dao.integrations import (
+    add_integration_for_workspace,
+    clear_integration_access_cache,
+)
+from core.dao.token_blacklist import clear_blacklist_cache
+from core.dao.users import clear_user_cache
 from core.schemas.cache import DataBatchCache, EmployeeListCache
 from core.schemas.integrations import IntegrationAccess, IntegrationAccessToken
 from core.schemas.models import Model
@@ -61,6 +66,8 @@ async def teardown():
     await teardown_integration_access()
     await teardown_accounting_cache()
     await teardown_payroll_cache()
+    await teardown_calculation_cache()
+    await teardown_integration_leases()
 
 
 def create_demo():
@@ -95,15 +102,15 @@ def create_integration_access():
 
 def create_accounting_cache():
     for element in accounting_cache:
-        element["created_at"] = datetime.now()
+        element["created_at"] = datetime.now(timezone.utc)
     return db.accounting_cache.insert_many(
-        [jsonable_encoder(DataBatchCache(**e)) for e in accounting_cache]
+        [DataBatchCache(**e).dict(by_alias=True) for e in accounting_cache]
     )
 
 
 def create_payroll_cache():
     for element in payroll_cache:
-        element["created_at"] = datetime.now()
+        element["created_at"] = datetime.now(timezone.utc)
     return db.payroll_cache.insert_many(
         [jsonable_encoder(EmployeeListCache(**e)) for e in payroll_cache]
     )
@@ -114,6 +121,7 @@ def teardown_demo():
 
 
 def teardown_users():
+    clear_user_cache()
     return db.users.delete_many({})
 
 
@@ -122,11 +130,14 @@ def teardown_workspaces():
 
 
 def teardown_token_blacklist():
+    clear_blacklist_cache()
     return db.token_blacklist.delete_many({})
 
 
-def teardown_models():
-    return db.models.delete_many({})
+async def teardown_models():
+    await db.model_rows.delete_many({})
+    await db.model_employees.delete_many({})
+    return await db.models.delete_many({})
 
 
 def teardown_invite_codes():
@@ -134,6 +145,7 @@ def teardown_invite_codes():
 
 
 def teardown_integration_access():
+    clear_integration_access_cache()
     return db.integration_access.delete_many({})
 
 
@@ -145,6 +157,14 @@ def teardown_payroll_cache():
     return db.payroll_cache.delete_many({})
 
 
+def teardown_calculation_cache():
+    return db.calculation_cache.delete_many({})
+
+
+def teardown_integration_leases():
+    return db.integration_leases.delete_many({})
+
+
 async def setup_integration_access(workspace_id, integration="Xero"):
     await add_integration_for_workspace(
         IntegrationAccess(